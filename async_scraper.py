@@ -0,0 +1,410 @@
+"""Asyncio scraping engine"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from scraper import YellowPagesScraper
+from config import Config
+
+
+class AsyncYellowPagesScraper(YellowPagesScraper):
+    """Scraper that keeps many listing and website fetches in flight at once.
+
+    Takes the same inputs and produces the same records as YellowPagesScraper,
+    while capping concurrency per host. Request spacing comes from the shared
+    per-host rate limiter, so fetches to different hosts overlap.
+    """
+
+    def __init__(self, progress_callback=None, log_callback=None, delay_settings=None, cache_path=None,
+                 contact_cache_path=None, listing_index_path=None, max_listings_in_flight=None,
+                 worker_threads=None):
+        super().__init__(progress_callback=progress_callback, log_callback=log_callback,
+                         delay_settings=delay_settings, cache_path=cache_path,
+                         contact_cache_path=contact_cache_path, listing_index_path=listing_index_path)
+        self.max_listings_in_flight = max_listings_in_flight or Config.ASYNC_MAX_LISTINGS_IN_FLIGHT
+        self.worker_threads = worker_threads or Config.ASYNC_WORKER_THREADS
+        self.yellowpages_host = urlparse(self.BASE_URL).netloc.lower()
+
+        self._executor = None
+        self._writer = None
+        self._host_semaphores = {}
+        self._completed = 0
+        self._enrichment_slots = None
+        self._enrichment_tasks = []
+        self._listing_jobs = {}  # Listing URL -> batch job that found it (batch runs only)
+
+    def run_scraper(self, category, location, start_page=1, end_page=None, min_age=None, checkpoint_path=None,
+                    sink=None, keep_records=True):
+        """Run the asyncio engine from synchronous code (e.g. the GUI thread)"""
+        return asyncio.run(self.run(category, location, start_page, end_page, min_age, checkpoint_path,
+                                    sink, keep_records))
+
+    async def run(self, category, location, start_page=1, end_page=None, min_age=None, checkpoint_path=None,
+                  sink=None, keep_records=True):
+        """Main scraping coroutine with start/end page support"""
+        all_data = self.open_output(sink, keep_records)
+        journal, resume = self.open_checkpoint(checkpoint_path, category, location, start_page, end_page, min_age,
+                                               all_data)
+        if resume and resume.finished:
+            journal.close()
+            self.sink = None
+            self.log_message(f"Checkpoint {checkpoint_path} is already complete with {self.listings_scraped} listings")
+            return all_data or []
+
+        if end_page is None:
+            self.log_message(f"Starting concurrent scrape for {category} in {location} from page {start_page}...")
+        elif start_page == end_page:
+            self.log_message(f"Scraping only page {start_page} for {category} in {location} (concurrent)...")
+        else:
+            self.log_message(f"Scraping pages {start_page} to {end_page} for {category} in {location} (concurrent)...")
+
+        self._start_engine()
+        tasks = []
+        finished = False
+
+        try:
+            await self._scrape_pages(category, location, start_page, end_page, tasks, min_age, resume,
+                                     keep_tasks=all_data is not None)
+            await self._wait_for_listings(tasks)
+            finished = True
+        finally:
+            self._stop_engine(tasks)
+            self.close_checkpoint(finished)
+            self.sink = None
+
+        return self._finish_run(all_data, tasks)
+
+    def run_batch(self, jobs, sink=None, keep_records=True, min_age=None):
+        """Run several jobs from synchronous code, sharing sessions, caches and rate limits"""
+        return asyncio.run(self.run_jobs(jobs, sink, keep_records, min_age))
+
+    async def run_jobs(self, jobs, sink=None, keep_records=True, min_age=None):
+        """Scrape many category/location jobs in one event loop.
+
+        Each job needs category, location, start_page and end_page attributes, and may
+        have a sink of its own (records of jobs without one go to sink). Up to
+        BATCH_MAX_CONCURRENT_JOBS jobs run side by side, so while one job waits on its
+        search page budget, listings found by the others are being fetched. A listing
+        found by several jobs is scraped once, for the job that found it first.
+        """
+        self.journal = None
+        all_data = self.open_output(sink, keep_records)
+        self.sink = _JobRouter(self._listing_jobs, sink)
+        for job in jobs:
+            job.listings_scraped = 0
+        self.log_message(f"Starting batch of {len(jobs)} jobs...")
+
+        self._start_engine()
+        job_slots = asyncio.Semaphore(Config.BATCH_MAX_CONCURRENT_JOBS)
+        tasks = []
+
+        async def run_job(job):
+            async with job_slots:
+                if self.stop_requested:
+                    return
+                self.log_message(f"Job {job.category} in {job.location}: starting at page {job.start_page}")
+                await self._scrape_pages(job.category, job.location, job.start_page, job.end_page, tasks,
+                                         min_age, keep_tasks=all_data is not None, job=job)
+
+        try:
+            await asyncio.gather(*(run_job(job) for job in jobs))
+            await self._wait_for_listings(tasks)
+        finally:
+            self._stop_engine(tasks)
+            self._listing_jobs.clear()
+            self.sink = None
+
+        for job in jobs:
+            self.log_message(f"Job {job.category} in {job.location}: {job.listings_scraped} listings")
+        return self._finish_run(all_data, tasks)
+
+    def _start_engine(self):
+        """Create the executor and per-run state shared by everything scheduled in this run"""
+        self._executor = ThreadPoolExecutor(max_workers=self.worker_threads)
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._host_semaphores = {}
+        self._completed = self.listings_scraped
+        self._enrichment_slots = asyncio.Semaphore(Config.ENRICHMENT_QUEUE_SIZE)
+        self._enrichment_tasks = []
+
+    async def _wait_for_listings(self, tasks):
+        """Wait for scheduled listings and then their website enrichment.
+
+        A listing whose task failed is logged and left out; it doesn't stop the others.
+        """
+        results = []
+        if tasks:
+            results += await asyncio.gather(*tasks, return_exceptions=True)
+        if self._enrichment_tasks:
+            self.log_message("Waiting for website enrichment to finish...")
+            results += await asyncio.gather(*self._enrichment_tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.log_message(f"  Error scraping listing: {str(result)}")
+
+    def _stop_engine(self, tasks):
+        """Cancel leftover tasks and release the executor and sessions"""
+        for task in tasks + self._enrichment_tasks:
+            task.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._writer.shutdown(wait=True)
+        self._writer = None
+        self.close_sessions()
+
+    def _finish_run(self, all_data, tasks):
+        """Collect kept records, log totals and return the records"""
+        if all_data is None:
+            all_data = []
+        else:
+            all_data += [task.result() for task in tasks
+                         if task.done() and not task.cancelled() and task.exception() is None and task.result()]
+        self.listings_scraped = self._completed
+        self.log_message(f"Scraping complete! Found {self._completed} listings")
+        self.log_cache_stats()
+        return all_data
+
+    async def _scrape_pages(self, category, location, start_page, end_page, tasks, min_age=None, resume=None,
+                            keep_tasks=True, job=None):
+        """Walk search pages and schedule a task per listing (for a batch job, if given)"""
+        in_flight = asyncio.Semaphore(self.max_listings_in_flight)
+        empty_pages = 0
+        page = start_page
+        predicted = False
+        prefetched = None
+
+        async def schedule(listing_url, listing_page):
+            if job is not None:
+                # Jobs of a batch share listings; the first job to find one scrapes it
+                if listing_url in self._listing_jobs:
+                    return True
+                self._listing_jobs[listing_url] = job
+            # Backpressure: don't queue more work than can be in flight
+            await in_flight.acquire()
+            if self.stop_requested:
+                in_flight.release()
+                return False
+            task = asyncio.create_task(self._scrape_listing(listing_url, listing_page, min_age))
+            task.add_done_callback(lambda _task: in_flight.release())
+            tasks.append(task)
+            if not keep_tasks:
+                # Records aren't kept, so don't hold on to finished tasks either
+                task.add_done_callback(tasks.remove)
+            return True
+
+        if resume and resume.last_page is not None:
+            # Finish listings that were found before the interruption, then continue after the last page
+            for listing_url, listing_page in resume.pending_listings:
+                if not await schedule(listing_url, listing_page):
+                    break
+            empty_pages = resume.empty_pages
+            page = resume.last_page + 1
+
+        try:
+            while not self.stop_requested:
+                if end_page is not None and page > end_page:
+                    self.log_message(f"Reached end page {end_page}")
+                    break
+
+                label = f"Page {page}" if job is None else f"{category} in {location}, page {page}"
+                self.log_message(f"{label}: Scraping search results...")
+
+                if prefetched is not None:
+                    try:
+                        listing_urls = await prefetched
+                    except Exception as e:
+                        self.log_message(f"{label}: Prefetch failed ({str(e)}), fetching it again...")
+                        listing_urls = await self._fetch_search_page(category, location, page)
+                    prefetched = None
+                elif end_page is None and self.predict_last_page:
+                    # Plan the page range from the first results page instead of probing for empty pages
+                    listing_urls, last_page = await self._fetch_search_results(category, location, page)
+                    if last_page is not None:
+                        end_page = last_page
+                        predicted = True
+                        self.log_message(f"{label}: Results end at page {last_page}")
+                else:
+                    listing_urls = await self._fetch_search_page(category, location, page)
+
+                if listing_urls is None:
+                    # In a planned range a failed page doesn't mean the results have ended
+                    if not predicted:
+                        empty_pages += 1
+                    self.log_message(f"{label}: Failed to load search results")
+                elif not listing_urls:
+                    empty_pages += 1
+                    self.log_message(f"{label}: No listing URLs found")
+                else:
+                    empty_pages = 0
+                    self.log_message(f"{label}: Found {len(listing_urls)} listing URLs")
+
+                    # Look-ahead: fetch page N+1 while page N's listings are in flight
+                    if self.prefetch_search_pages and (end_page is None or page + 1 <= end_page):
+                        prefetched = asyncio.create_task(self._fetch_search_page(category, location, page + 1))
+
+                if self.journal and not self.stop_requested:
+                    self.journal.page(page, listing_urls or [], empty_pages)
+
+                for listing_url in listing_urls or []:
+                    if not await schedule(listing_url, page):
+                        break
+
+                if (end_page is None or predicted) and empty_pages >= self.EMPTY_PAGE_THRESHOLD:
+                    self.log_message(f"Stopping - {empty_pages} consecutive empty pages")
+                    break
+
+                page += 1
+        finally:
+            if prefetched is not None:
+                prefetched.cancel()
+
+    async def _scrape_listing(self, listing_url, page_num, min_age=None):
+        """Scrape one listing page and hand its websites to the enrichment stage"""
+        try:
+            data = await self._run_blocking(self.reuse_fresh_listing, listing_url, page_num, min_age)
+        except Exception as e:
+            # The index is only a shortcut, scrape the listing instead
+            self.log_message(f"  Error checking the listing index for {listing_url}: {str(e)}")
+            data = None
+        if data is not None:
+            await self._record_completed(data)
+            return data
+
+        data = self.new_listing_record(listing_url, page_num)
+        reused = False
+
+        try:
+            self.log_message(f"  Scraping listing: {listing_url}")
+
+            data, soup = await self._run_in_slot(listing_url, 'listing', self.fetch_listing_page,
+                                                 listing_url, page_num)
+            if soup:
+                await self._run_blocking(self.parse_listing_page, soup, data)
+                unchanged = await self._run_blocking(self.reuse_unchanged_listing, data)
+                if unchanged is not None:
+                    data, reused = unchanged, True
+            self.log_message(f"  ✓ Successfully scraped: {data.get('name', 'Unknown')}")
+
+        except Exception as e:
+            self.log_message(f"  Error extracting listing data: {str(e)}")
+            data['scraping_status'] = f"error: {str(e)}"
+
+        if data['websites'] and not reused and not self.stop_requested:
+            # Websites are scraped in their own task so slow sites don't hold a listing slot;
+            # the bounded number of pending enrichments applies backpressure to the crawl
+            await self._enrichment_slots.acquire()
+            task = asyncio.create_task(self._enrich_listing(data))
+            task.add_done_callback(lambda _task: self._enrichment_slots.release())
+            task.add_done_callback(self._enrichment_tasks.remove)
+            self._enrichment_tasks.append(task)
+        else:
+            await self._record_completed(data)
+        return data
+
+    async def _enrich_listing(self, data):
+        """Scrape all websites of a listing concurrently and merge their contacts"""
+        try:
+            contact_infos = await asyncio.gather(
+                *(self._scrape_website(website) for website in data['websites'])
+            )
+            self.merge_contact_info(data, contact_infos)
+        except Exception as e:
+            self.log_message(f"    Error enriching {data['url']}: {str(e)}")
+        await self._record_completed(data)
+
+    async def _record_completed(self, data):
+        """Log, index and report progress for a finished listing.
+
+        The index, journal and sink writes run on a single writer thread so they
+        stay in completion order without stalling the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self.finish_record, data)
+        self._completed += 1
+        if self.progress_callback:
+            self.progress_callback(data['page_number'], self._completed)
+
+    async def _scrape_website(self, website_url):
+        """Scrape a business website for contacts under its host's limits"""
+        if self.stop_requested:
+            return {'emails': [], 'social_links': {}}
+        host_url = website_url if website_url.startswith(('http://', 'https://')) else f"https://{website_url}"
+        async with self._host_slot(host_url):
+            return await self._run_blocking(self.scrape_website_for_contacts, website_url)
+
+    async def _fetch_search_page(self, category, location, page):
+        """Fetch a search results page and return its listing URLs (None if it failed to load)"""
+        return (await self._fetch_search_results(category, location, page))[0]
+
+    async def _fetch_search_results(self, category, location, page):
+        """Fetch a search results page, returning (listing URLs or None, its predicted last page or None)"""
+        url = self.BASE_URL.format(page=page, category=category, location=location)
+        return await self._run_in_slot(url, 'search', self.fetch_search_results, category, location, page)
+
+    async def _run_in_slot(self, url, page_type, func, *args):
+        """Wait for url's rate budget, then run func under its host's concurrency slot.
+
+        Yellow Pages search and listing requests share the host's few slots, so the
+        rate wait happens before taking one: a job waiting on the search budget must
+        not keep another job's listings from being fetched.
+        """
+        reserved = None
+        if not (self.response_cache and self.response_cache.is_fresh(url, page_type)):
+            wait = await self.rate_limiter.acquire_async(url, page_type)
+            if wait > 0:
+                self.log_message(f"    Waited {wait:.1f} seconds before requesting {page_type} page")
+            reserved = url
+        async with self._host_slot(url):
+            return await self._run_blocking(self.run_with_reserved_slot, reserved, func, *args)
+
+    def _host_slot(self, url):
+        """Acquire a concurrency slot for a URL's host"""
+        return _HostSlot(self, urlparse(url).netloc.lower())
+
+    async def _run_blocking(self, func, *args):
+        """Run blocking fetch/parse work on the worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+
+class _HostSlot:
+    """Async context manager enforcing per-host concurrency caps"""
+
+    def __init__(self, scraper, host):
+        self.scraper = scraper
+        self.host = host
+
+    async def __aenter__(self):
+        scraper = self.scraper
+        semaphore = scraper._host_semaphores.get(self.host)
+        if semaphore is None:
+            if self.host == scraper.yellowpages_host:
+                limit = Config.ASYNC_YELLOWPAGES_CONCURRENCY
+            else:
+                limit = Config.ASYNC_WEBSITE_CONCURRENCY
+            semaphore = scraper._host_semaphores[self.host] = asyncio.Semaphore(limit)
+        await semaphore.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scraper._host_semaphores[self.host].release()
+        return False
+
+
+class _JobRouter:
+    """Sink for batch runs: counts each record for its job and writes it to the job's sink or the default"""
+
+    def __init__(self, listing_jobs, default_sink=None):
+        self.listing_jobs = listing_jobs
+        self.default_sink = default_sink
+
+    def write(self, record):
+        job = self.listing_jobs.get(record.get('url'))
+        sink = self.default_sink
+        if job is not None:
+            job.listings_scraped += 1
+            sink = getattr(job, 'sink', None) or sink
+        if sink:
+            sink.write(record)
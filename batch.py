@@ -0,0 +1,73 @@
+"""Batch mode: many category/location jobs in one run with shared sessions, caches and rate limits"""
+
+import csv
+import json
+import os
+
+from config import Config
+from sinks import open_sink
+
+
+class BatchJob:
+    """One category/location/page range of a batch, optionally with its own output file"""
+
+    def __init__(self, category, location, start_page=None, end_page=None, output=None):
+        if not category or not location:
+            raise ValueError("Batch jobs need a category and a location")
+        self.category = category
+        self.location = location
+        self.start_page = int(start_page) if start_page not in (None, '') else Config.DEFAULT_START_PAGE
+        self.end_page = int(end_page) if end_page not in (None, '') else None
+        if self.start_page < 1 or (self.end_page is not None and self.end_page < self.start_page):
+            raise ValueError(f"Invalid page range for {category} in {location}")
+        self.output = output or None
+        self.sink = None
+        self.listings_scraped = 0
+
+    @classmethod
+    def from_dict(cls, entry):
+        return cls(entry.get('category'), entry.get('location'), entry.get('start_page'),
+                   entry.get('end_page'), entry.get('output'))
+
+
+def load_jobs(path):
+    """Read a job file.
+
+    .json files hold an array of job objects, .jsonl files one job object per line and
+    .csv files a header row; all use the keys category, location, start_page, end_page
+    and output, of which only category and location are required.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8', newline='') as f:
+        if extension == '.json':
+            entries = json.load(f)
+        elif extension == '.jsonl':
+            entries = [json.loads(line) for line in f if line.strip()]
+        elif extension == '.csv':
+            entries = list(csv.DictReader(f))
+        else:
+            raise ValueError(f"Unsupported job file format: {extension or path}")
+    return [BatchJob.from_dict(entry) for entry in entries]
+
+
+def run_batch(jobs, scraper=None, sink=None, keep_records=False, min_age=None):
+    """Run jobs on one asyncio engine and return the kept records.
+
+    Jobs with an output path get their own sink; the others write to sink. The job
+    sinks are closed when the batch ends, sink is left to the caller.
+    """
+    if scraper is None:
+        from async_scraper import AsyncYellowPagesScraper
+        scraper = AsyncYellowPagesScraper()
+    try:
+        for job in jobs:
+            if job.output:
+                job.sink = open_sink(job.output)
+        return scraper.run_batch(jobs, sink=sink, keep_records=keep_records, min_age=min_age)
+    finally:
+        for job in jobs:
+            if job.sink:
+                job.sink.close()
+                for warning in job.sink.warnings():
+                    scraper.log_message(f"Warning: {warning}")
+                job.sink = None
@@ -0,0 +1,168 @@
+"""Append-only run journal for crash-safe checkpoint and resume"""
+
+import json
+import os
+import threading
+import time
+
+from config import Config
+
+
+class ResumeState:
+    """What a journal says about an interrupted run"""
+
+    def __init__(self):
+        self.records = []
+        self.completed_urls = set()
+        self.pages = {}  # page -> listing URLs found on it
+        self.last_page = None
+        self.empty_pages = 0
+        self.finished = False
+
+    @property
+    def pending_listings(self):
+        """(listing_url, page) pairs that were found but never completed"""
+        return [(url, page) for page in sorted(self.pages) for url in self.pages[page]
+                if url not in self.completed_urls]
+
+
+class RunJournal:
+    """JSON Lines journal of a scraping run.
+
+    The first line holds the run parameters. After that, "page" entries record the
+    listing URLs found on each search page (the cursor) and "record" entries hold
+    completed listings. Every entry is flushed to the OS right away, so a crashed
+    process loses nothing; fsync is batched to bound the cost of surviving power loss.
+    """
+
+    def __init__(self, path, sync_every=None, sync_interval=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.sync_every = sync_every or Config.CHECKPOINT_SYNC_EVERY
+        self.sync_interval = sync_interval or Config.CHECKPOINT_SYNC_INTERVAL
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def iter_entries(path):
+        """Yield (entry, valid_bytes up to and including it), stopping at a torn last line"""
+        valid_bytes = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    return
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    return
+                valid_bytes += len(line)
+                yield entry, valid_bytes
+
+    @classmethod
+    def read_entries(cls, path):
+        """Return (entries, valid_bytes), ignoring a torn last line"""
+        entries = []
+        valid_bytes = 0
+        for entry, valid_bytes in cls.iter_entries(path):
+            entries.append(entry)
+        return entries, valid_bytes
+
+    @classmethod
+    def read_run_params(cls, path):
+        """Run parameters stored in a journal's header"""
+        entries, _ = cls.read_entries(path)
+        if not entries or entries[0].get('type') != 'run':
+            raise ValueError(f"{path} is not a scraping checkpoint")
+        return entries[0]['params']
+
+    @classmethod
+    def is_complete(cls, path):
+        """Whether the run journaled at path finished"""
+        entries, _ = cls.read_entries(path)
+        return any(entry.get('type') == 'end' for entry in entries)
+
+    def open_run(self, params, on_record=None):
+        """Open the journal for a run and return the ResumeState of any earlier attempt.
+
+        With on_record, completed records are handed to it one at a time as the journal
+        is read instead of being collected in the state's records list.
+        """
+        state = ResumeState()
+        valid_bytes = 0
+        if os.path.exists(self.path):
+            entries = self.iter_entries(self.path)
+            for entry, valid_bytes in entries:
+                if entry.get('type') != 'run' or entry.get('params') != params:
+                    raise ValueError(f"Checkpoint {self.path} belongs to a different run")
+                break
+            for entry, valid_bytes in entries:
+                self._replay(entry, state, on_record)
+
+        self._file = open(self.path, 'ab')
+        # Drop a line torn by a crash so new entries start on a clean line
+        self._file.truncate(valid_bytes)
+        if not valid_bytes:
+            self._write({'type': 'run', 'params': params})
+            self.sync()
+        return state
+
+    @staticmethod
+    def _replay(entry, state, on_record=None):
+        kind = entry.get('type')
+        if kind == 'record':
+            record = entry['record']
+            if record.get('url') not in state.completed_urls:
+                state.completed_urls.add(record.get('url'))
+                if on_record:
+                    on_record(record)
+                else:
+                    state.records.append(record)
+        elif kind == 'page':
+            state.pages[entry['page']] = entry['listing_urls']
+            state.last_page = entry['page']
+            state.empty_pages = entry['empty_pages']
+        elif kind == 'end':
+            state.finished = True
+
+    def _write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Force journaled entries to disk"""
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._sync()
+
+    def page(self, page, listing_urls, empty_pages):
+        """Record the listing URLs found on a search page"""
+        self._write({'type': 'page', 'page': page, 'listing_urls': list(listing_urls), 'empty_pages': empty_pages})
+
+    def record(self, record):
+        """Record a completed listing"""
+        self._write({'type': 'record', 'record': record})
+
+    def finish(self):
+        """Mark the run as complete"""
+        self._write({'type': 'end'})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                if self._unsynced:
+                    self._sync()
+                self._file.close()
+                self._file = None
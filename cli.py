@@ -0,0 +1,212 @@
+"""Headless command-line entry point (no tkinter or sound modules are imported)"""
+
+import argparse
+import os
+import signal
+import sys
+from datetime import datetime
+
+from batch import load_jobs, run_batch
+from checkpoint import RunJournal
+from config import Config
+from data_handler import DataHandler
+from scraper import YellowPagesScraper
+from sinks import SINK_TYPES, TeeSink, open_sink
+
+
+def build_parser():
+    """Command-line arguments mirroring the GUI's inputs"""
+    parser = argparse.ArgumentParser(
+        description="Scrape yellowpages.ca listings without the GUI, streaming results to files."
+    )
+    parser.add_argument('category', nargs='?', help="Business category, e.g. dentists")
+    parser.add_argument('location', nargs='?', help="Location, e.g. Toronto+ON")
+    parser.add_argument('--start-page', type=int, help=f"First page to scrape (default: {Config.DEFAULT_START_PAGE})")
+    parser.add_argument('--end-page', type=int, help="Last page to scrape (default: until empty pages)")
+    parser.add_argument('-o', '--output', action='append', default=[], metavar='PATH',
+                        help=f"Output file, format from its extension ({', '.join(SINK_TYPES)}); repeatable. "
+                             "Defaults to a timestamped .jsonl file")
+    parser.add_argument('--concurrent', action='store_true', help="Use the concurrent (asyncio) engine")
+    parser.add_argument('--min-age', type=float, metavar='HOURS',
+                        help="Reuse listings from the listing index scraped within this many hours")
+    parser.add_argument('--listing-index', metavar='PATH', help="Listing index for incremental re-scrapes")
+    parser.add_argument('--cache', metavar='PATH', help="HTTP response cache file")
+    parser.add_argument('--contact-cache', metavar='PATH', help="Persistent website contact cache file")
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help="Journal progress here; an interrupted run with the same arguments resumes from it")
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                        help="Resume the run recorded in a checkpoint (category/location/pages come from it)")
+    parser.add_argument('--jobs', metavar='FILE',
+                        help="Run every job in a .json/.jsonl/.csv job file in one concurrent batch")
+    parser.add_argument('--log-file', metavar='PATH', help="Also append log messages to this file")
+    add_delay_arguments(parser)
+    return parser
+
+
+def add_delay_arguments(parser):
+    """Delay, timeout and retry options, shared with the work queue's worker command"""
+    delays = parser.add_argument_group("delays (seconds)")
+    delays.add_argument('--search-delay', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        default=(Config.DEFAULT_SEARCH_PAGE_MIN_DELAY, Config.DEFAULT_SEARCH_PAGE_MAX_DELAY))
+    delays.add_argument('--listing-delay', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        default=(Config.DEFAULT_LISTING_PAGE_MIN_DELAY, Config.DEFAULT_LISTING_PAGE_MAX_DELAY))
+    delays.add_argument('--website-delay', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        default=(Config.DEFAULT_WEBSITE_MIN_DELAY, Config.DEFAULT_WEBSITE_MAX_DELAY))
+    delays.add_argument('--page-load-delay', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        default=(Config.DEFAULT_PAGE_LOAD_MIN_DELAY, Config.DEFAULT_PAGE_LOAD_MAX_DELAY))
+    delays.add_argument('--adaptive', action='store_true',
+                        help="Adapt each host's delay to its responses, between the MIN and MAX delays")
+    delays.add_argument('--website-timeout', type=float, default=Config.DEFAULT_WEBSITE_TIMEOUT)
+    delays.add_argument('--website-retries', type=int, default=Config.DEFAULT_MAX_WEBSITE_RETRIES)
+    delays.add_argument('--page-timeout', type=float, default=Config.DEFAULT_PAGE_LOAD_TIMEOUT)
+    delays.add_argument('--page-retries', type=int, default=Config.DEFAULT_MAX_PAGE_RETRIES)
+
+
+def delay_settings_from_args(args):
+    """Delay settings dict in the format the scraper and GUI use"""
+    return {
+        'search_min': args.search_delay[0], 'search_max': args.search_delay[1],
+        'listing_min': args.listing_delay[0], 'listing_max': args.listing_delay[1],
+        'website_min': args.website_delay[0], 'website_max': args.website_delay[1],
+        'page_load_min': args.page_load_delay[0], 'page_load_max': args.page_load_delay[1],
+        'website_timeout': args.website_timeout, 'website_retries': args.website_retries,
+        'page_timeout': args.page_timeout, 'page_retries': args.page_retries,
+        'adaptive': args.adaptive
+    }
+
+
+def validate_args(parser, args):
+    """Reject argument combinations the scraper can't run"""
+    if not (args.resume or args.jobs) and not (args.category and args.location):
+        parser.error("category and location are required unless --resume or --jobs is given")
+    if args.resume and args.jobs:
+        parser.error("--resume and --jobs can't be combined")
+    if args.jobs:
+        # Page ranges come from the job file, and batches aren't checkpointed
+        for option in ('start_page', 'end_page', 'checkpoint'):
+            if getattr(args, option) is not None:
+                parser.error(f"--{option.replace('_', '-')} can't be combined with --jobs")
+    if args.min_age is not None and not (args.listing_index or Config.LISTING_INDEX_PATH):
+        parser.error("--min-age requires --listing-index")
+    if args.start_page is None:
+        args.start_page = Config.DEFAULT_START_PAGE
+    if args.start_page < 1:
+        parser.error("--start-page must be >= 1")
+    if args.end_page is not None and args.end_page < args.start_page:
+        parser.error("--end-page must be >= --start-page")
+    validate_delay_args(parser, args)
+    for path in args.output:
+        if os.path.splitext(path)[1].lower() not in SINK_TYPES:
+            parser.error(f"unsupported output format: {path}")
+
+
+def validate_delay_args(parser, args):
+    """Reject delay ranges the scraper can't use"""
+    for name in ('search_delay', 'listing_delay', 'website_delay', 'page_load_delay'):
+        low, high = getattr(args, name)
+        if low < 0 or low > high:
+            parser.error(f"--{name.replace('_', '-')} needs 0 <= MIN <= MAX")
+
+
+def log_to_file(path):
+    """Open a log file for appending, returning (file, log_callback), or (None, None) without a path"""
+    if not path:
+        return None, None
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    log_file = open(path, 'a', encoding='utf-8')
+
+    def log_callback(message):
+        log_file.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}\n")
+        log_file.flush()
+    return log_file, log_callback
+
+
+def main(argv=None):
+    """Run a scrape from the command line and return the exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    validate_args(parser, args)
+
+    jobs = None
+    if args.jobs:
+        try:
+            jobs = load_jobs(args.jobs)
+        except (OSError, ValueError) as e:
+            parser.error(f"can't read job file: {str(e)}")
+        for job in jobs:
+            if job.output and os.path.splitext(job.output)[1].lower() not in SINK_TYPES:
+                parser.error(f"unsupported output format: {job.output}")
+
+    if args.concurrent or jobs is not None:
+        from async_scraper import AsyncYellowPagesScraper as scraper_class
+    else:
+        scraper_class = YellowPagesScraper
+
+    log_file, log_callback = log_to_file(args.log_file)
+    scraper = scraper_class(
+        log_callback=log_callback,
+        delay_settings=delay_settings_from_args(args),
+        cache_path=args.cache,
+        contact_cache_path=args.contact_cache,
+        listing_index_path=args.listing_index
+    )
+
+    if args.resume:
+        params = RunJournal.read_run_params(args.resume)
+        category, location = params['category'], params['location']
+    elif jobs is not None:
+        category, location = 'batch', f"{len(jobs)}_jobs"
+    else:
+        category, location = args.category, args.location
+
+    outputs = args.output or [DataHandler.generate_filename(category, location, 'jsonl')]
+    sinks = []
+    try:
+        for path in outputs:
+            sinks.append(open_sink(path))
+    except (RuntimeError, OSError) as e:
+        for sink in sinks:
+            sink.close()
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+    sink = sinks[0] if len(sinks) == 1 else TeeSink(sinks)
+
+    # Ctrl+C / SIGTERM (e.g. docker stop) stop the run gracefully so sinks and checkpoints are closed
+    def request_stop(signum, frame):
+        scraper.log_message(f"Received signal {signum}, stopping...")
+        scraper.stop_scraping()
+    previous_handlers = {signum: signal.signal(signum, request_stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    try:
+        if args.resume:
+            scraper.resume_scraper(args.resume, sink=sink, keep_records=False)
+        elif jobs is not None:
+            run_batch(jobs, scraper, sink=sink, min_age=args.min_age)
+        else:
+            scraper.run_scraper(category, location, args.start_page, args.end_page, min_age=args.min_age,
+                                checkpoint_path=args.checkpoint, sink=sink, keep_records=False)
+    except Exception as e:
+        scraper.log_message(f"Error: {str(e)}")
+        return 1
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        sink.close()
+        if log_file:
+            log_file.close()
+
+    for warning in sink.warnings():
+        print(f"Warning: {warning}", file=sys.stderr)
+    summary = scraper.summary.as_dict()
+    outputs += [job.output for job in jobs or [] if job.output]
+    print(f"Saved {summary.get('total_listings', 0)} listings to {', '.join(outputs)}")
+    print(f"Successful: {summary.get('successful_scrapes', 0)}, failed: {summary.get('failed_scrapes', 0)}, "
+          f"emails: {summary.get('total_emails', 0)}, social platforms: {summary.get('total_social_platforms', 0)}, "
+          f"websites: {summary.get('total_websites', 0)}")
+    return 130 if scraper.stop_requested else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
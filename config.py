@@ -4,6 +4,11 @@ class Config:
     # Scraping settings
     BASE_URL = "https://www.yellowpages.ca/search/si/{page}/{category}/{location}"
     EMPTY_PAGE_THRESHOLD = 2
+    PREFETCH_SEARCH_PAGES = True  # Fetch page N+1 of the search results while page N's listings are scraped
+    # Without an end page, plan the page range from the first results page's pager or result count.
+    # EMPTY_PAGE_THRESHOLD probing is the fallback for pages that show neither.
+    PREDICT_LAST_PAGE = True
+    SEARCH_RESULTS_PER_PAGE = 35  # Upper bound used to turn a result count into pages
     
     # Default delay settings (in seconds)
     DEFAULT_SEARCH_PAGE_MIN_DELAY = 8
@@ -15,20 +20,117 @@ class Config:
     DEFAULT_PAGE_LOAD_MIN_DELAY = 1
     DEFAULT_PAGE_LOAD_MAX_DELAY = 3
     
+    # Burst size of the per-host token buckets built from the delay ranges above.
+    # Third-party websites get a looser budget than yellowpages.ca.
+    RATE_LIMIT_BURSTS = {
+        'search': 1,
+        'listing': 1,
+        'website': 2
+    }
+    
+    # Adaptive delays (AIMD): the min/max delays above become the floor and ceiling of a
+    # per-host delay that shrinks while responses are healthy and grows on signs of overload
+    ADAPTIVE_DELAYS = False
+    ADAPTIVE_INCREASE_STEPS = 20  # Healthy responses to go from the slowest to the fastest rate
+    ADAPTIVE_DECREASE_FACTOR = 0.5  # Rate multiplier on 403/429/5xx, timeouts and latency spikes
+    ADAPTIVE_LATENCY_FACTOR = 2.0  # Recent latency this many times the usual latency counts as overload
+    ADAPTIVE_MIN_SLOW_LATENCY = 1.0  # ...but only once it is above this many seconds
+    ADAPTIVE_JITTER = 0.1  # Random extra wait, as a fraction of the wait
+    
+    # Business website scanning
+    WEBSITE_MAX_BYTES = 2 * 1024 * 1024  # Stop reading a website body after this many bytes
+    WEBSITE_SCAN_CHUNK_SIZE = 64 * 1024
+    
+    # Persistent response cache (None disables it)
+    RESPONSE_CACHE_PATH = None  # e.g. "cache/yp_responses.sqlite3"
+    RESPONSE_CACHE_MAX_BYTES = 500 * 1024 * 1024  # Least recently used entries are evicted above this
+    RESPONSE_CACHE_TTLS = {  # Seconds before a cached page is revalidated
+        'search': 6 * 3600,
+        'listing': 7 * 24 * 3600,
+        'website': 7 * 24 * 3600,
+        'default': 24 * 3600
+    }
+    
+    # Website contact cache keyed by normalized site (chains share one website)
+    CONTACT_CACHE_ENABLED = True
+    CONTACT_CACHE_PATH = None  # Persist results across runs, e.g. "cache/yp_contacts.sqlite3"
+    CONTACT_CACHE_TTL = 30 * 24 * 3600  # Seconds before a persisted result is scraped again
+    
+    # Listing index for incremental re-scrapes (None disables it)
+    LISTING_INDEX_PATH = None  # e.g. "cache/yp_listings.sqlite3"
+    
+    # Streaming CSV columns: rows with more phone numbers or websites than this are truncated
+    CSV_MAX_PHONE_NUMBERS = 5
+    CSV_MAX_WEBSITES = 3
+    
+    # Records per Parquet row group
+    PARQUET_ROW_GROUP_SIZE = 10000
+    
+    # Listings per SQLite storage transaction
+    SQLITE_BATCH_SIZE = 500
+    
+    # Run checkpoints: fsync the journal after this many entries or seconds, whichever comes first
+    CHECKPOINT_SYNC_EVERY = 50
+    CHECKPOINT_SYNC_INTERVAL = 5.0
+    CHECKPOINT_DIR = "checkpoints"  # Where the GUI keeps run journals
+    
+    # Sharded crawls (work_queue.py): a leased unit returns to the queue if not finished in time
+    WORK_QUEUE_LEASE_SECONDS = 300
+    WORK_QUEUE_MAX_ATTEMPTS = 3  # Tries per unit before it is marked failed
+    WORK_QUEUE_POLL_INTERVAL = 2.0  # Seconds an idle worker waits while other workers hold leases
+    WORK_QUEUE_RENEW_FRACTION = 0.3  # Renew a lease after this fraction of it has passed
+    
     # Timeout and retry settings
     DEFAULT_WEBSITE_TIMEOUT = 15
     DEFAULT_MAX_WEBSITE_RETRIES = 2
     DEFAULT_PAGE_LOAD_TIMEOUT = 30
     DEFAULT_MAX_PAGE_RETRIES = 3
     
+    # Retry policy: exponential backoff with full jitter, capped; Retry-After is honoured up to RETRY_AFTER_MAX
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 30.0
+    RETRY_AFTER_MAX = 120  # Longer Retry-After waits give up on the request instead
+    RETRY_BUDGET_INITIAL = 20  # Retries available before any request has succeeded
+    RETRY_BUDGET_RATIO = 0.2  # Retries earned per successful request
+    RETRY_BUDGET_MAX = 100
+    
+    # Per-host circuit breaker: after this many consecutive failures a host is paused for the cool-down
+    CIRCUIT_BREAKER_THRESHOLD = 3
+    CIRCUIT_BREAKER_COOLDOWN = 300
+    CIRCUIT_BREAKER_WAIT_PAGE_TYPES = ('search', 'listing')  # These wait out the cool-down, others fail fast
+    
     # Request settings
     HEADERS = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
+    # HTML parser backend: 'lxml' (fastest), 'html5lib' or 'html.parser'.
+    # Falls back to the next available backend if it is not installed.
+    HTML_PARSER = 'lxml'
+    
+    # Connection pool settings (one keep-alive session per host)
+    POOL_CONNECTIONS = 10  # Per-host connection pools cached per session (bounds open website hosts)
+    POOL_MAXSIZE = 10  # Max connections kept alive per pool
+    POOL_BLOCK = False  # Block instead of opening extra connections when the pool is full
+    
+    # Website enrichment stage (emails/social links scraped off the listing crawl path)
+    ENRICHMENT_WORKERS = 4  # 0 scrapes websites inline with each listing
+    ENRICHMENT_QUEUE_SIZE = 50  # Listings waiting for enrichment before the crawl blocks
+    
+    # Asyncio engine settings
+    ASYNC_MAX_LISTINGS_IN_FLIGHT = 8  # Listings (with their websites) processed at once
+    ASYNC_YELLOWPAGES_CONCURRENCY = 2  # Concurrent requests to yellowpages.ca
+    ASYNC_WEBSITE_CONCURRENCY = 2  # Concurrent requests to any single business website host
+    ASYNC_WORKER_THREADS = 16  # Threads used for blocking fetch/parse work
+    BATCH_MAX_CONCURRENT_JOBS = 4  # Batch jobs walking their search pages at the same time
+    
     # UI settings
     WINDOW_SIZE = "1200x900"  # Increased for delay controls
     WINDOW_TITLE = "Yellow Pages Enhanced Scraper"
+    LOG_DRAIN_INTERVAL_MS = 100  # How often queued log lines are rendered
+    LOG_DRAIN_BATCH = 500  # Max log lines rendered per drain
+    LOG_MAX_LINES = 5000  # Scrollback kept in the log widget; older lines are dropped
+    LOG_FILE_PATH = None  # Also append the full log here, e.g. "logs/yp_scraper.log"
     
     # Default values
     DEFAULT_CATEGORY = "dentists"
@@ -62,3 +164,13 @@ class Config:
         'quora.com',
         'stackoverflow.com'
     ]
+    
+    # Other domains that belong to the platforms above
+    SOCIAL_DOMAIN_ALIASES = {
+        'x.com': 'twitter',
+        'fb.com': 'facebook',
+        'fb.me': 'facebook',
+        'youtu.be': 'youtube',
+        'wa.me': 'whatsapp',
+        't.me': 'telegram'
+    }
@@ -0,0 +1,159 @@
+"""Website contact cache shared by all listings of a run"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+from config import Config
+
+
+REDIRECT_PARAMS = ('redirect', 'url', 'u', 'target', 'dest', 'destination')
+# Query parameters that track the visit without changing the page (plus any utm_* parameter)
+TRACKING_PARAMS = frozenset(['fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', 'ref'])
+
+
+def _is_tracking_param(key):
+    key = key.lower()
+    return key.startswith('utm_') or key in TRACKING_PARAMS
+
+
+def normalize_site_url(url):
+    """Site identity for a website URL: no scheme, www., trailing slash, tracking parameters or redirect wrapper"""
+    url = (url or '').strip()
+    for _ in range(3):
+        parts = urlsplit(url if '://' in url else f"https://{url}")
+        # Unwrap redirect/tracking wrappers such as /gourl?redirect=https%3A%2F%2Fsite.ca
+        wrapped = next((unquote(value) for key, value in parse_qsl(parts.query)
+                        if key.lower() in REDIRECT_PARAMS and unquote(value).startswith(('http://', 'https://'))),
+                       None)
+        if not wrapped:
+            break
+        url = wrapped
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/')
+    if path.lower() in ('/index.html', '/index.htm', '/index.php', '/default.aspx'):
+        path = ''
+    # Other parameters may select a different page (?id=2), so they stay part of the key
+    params = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if not _is_tracking_param(key))
+    return f"{host}{path}?{urlencode(params)}" if params else f"{host}{path}"
+
+
+def _copy_contacts(contacts):
+    return {
+        'emails': list(contacts.get('emails', [])),
+        'social_links': {platform: list(links) for platform, links in contacts.get('social_links', {}).items()}
+    }
+
+
+class ContactCache:
+    """Caches website contact results by normalized site, coalescing concurrent requests.
+
+    Results live in memory for the life of the scraper; successful ones are also
+    written to an optional SQLite file so later runs can reuse them.
+    """
+
+    def __init__(self, path=None, ttl=None):
+        self.ttl = ttl if ttl is not None else Config.CONTACT_CACHE_TTL
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self._results = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS contacts (
+                    site TEXT PRIMARY KEY,
+                    emails TEXT NOT NULL,
+                    social_links TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def _load(self, key):
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT emails, social_links, fetched_at FROM contacts WHERE site = ?", (key,)
+        ).fetchone()
+        if row is None or time.time() - row[2] >= self.ttl:
+            return None
+        return {'emails': json.loads(row[0]), 'social_links': json.loads(row[1])}
+
+    def _save(self, key, contacts):
+        if self._conn is None:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO contacts (site, emails, social_links, fetched_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(contacts['emails']), json.dumps(contacts['social_links']), time.time())
+        )
+        self._conn.commit()
+
+    def get_or_fetch(self, url, fetch):
+        """Return cached contacts for the URL's site, or call fetch(url) exactly once per site.
+
+        fetch must return (contacts, loaded). Contacts of a site that failed to load are
+        only handed to the requests coalesced with that attempt; the next listing with
+        the site tries it again.
+        """
+        key = normalize_site_url(url)
+        with self._lock:
+            contacts = self._results.get(key)
+            if contacts is None:
+                contacts = self._load(key)
+                if contacts is not None:
+                    self._results[key] = contacts
+            if contacts is not None:
+                self.hits += 1
+                return _copy_contacts(contacts)
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return _copy_contacts(future.result())
+
+        try:
+            contacts, loaded = fetch(url)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            if loaded:
+                self._results[key] = contacts
+                self._save(key, contacts)
+        future.set_result(contacts)
+        return _copy_contacts(contacts)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'coalesced': self.coalesced, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
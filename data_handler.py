@@ -2,11 +2,19 @@
 
 import json
 import csv
+import itertools
 import os
+import threading
 from datetime import datetime
 
+from config import Config
+from extractors import SocialMatcher
+
 
 class DataHandler:
+    BASIC_FIELDS = ('name', 'phone', 'website', 'url', 'page_number', 'scraped_at', 'business_hours', 'scraping_status')
+    ADDRESS_FIELDS = ('street', 'city', 'region', 'postal_code')
+    
     @staticmethod
     def save_as_csv(data, file_path):
         """Save data as CSV file"""
@@ -18,67 +26,127 @@ class DataHandler:
         if directory:
             os.makedirs(directory, exist_ok=True)
         
-        # First pass: collect all possible fieldnames
+        # First pass: collect column names only, second pass streams the rows
         all_fieldnames = set()
-        flat_data = []
-        
         for item in data:
-            flat_item = {}
-            
-            # Copy basic fields
-            basic_fields = ['name', 'phone', 'website', 'url', 'page_number', 'scraped_at', 'business_hours', 'scraping_status']
-            for field in basic_fields:
-                flat_item[field] = item.get(field, '')
-            
-            # Handle address fields
-            if 'address' in item and item['address']:
-                for addr_key, addr_value in item['address'].items():
-                    flat_item[f'address_{addr_key}'] = addr_value or ''
-            
-            # Handle categories
-            if 'categories' in item:
-                flat_item['categories'] = '|'.join(item['categories']) if item['categories'] else ''
-            
-            # Handle phone numbers
-            if 'phone_numbers' in item:
-                phone_numbers = item['phone_numbers']
-                for i, phone_info in enumerate(phone_numbers):
-                    flat_item[f'phone_{i+1}_number'] = phone_info.get('number', '')
-                    flat_item[f'phone_{i+1}_type'] = phone_info.get('type', '')
-            
-            # Handle websites
-            if 'websites' in item:
-                websites = item['websites']
-                for i, website in enumerate(websites):
-                    flat_item[f'website_{i+1}'] = website
-            
-            # Handle emails
-            if 'emails' in item:
-                flat_item['emails'] = '|'.join(item['emails']) if item['emails'] else ''
-                flat_item['emails_count'] = len(item['emails'])
-            
-            # Handle social links
-            if 'social_links' in item:
-                social_links = item['social_links']
-                for platform, links in social_links.items():
-                    flat_item[f'social_{platform}'] = '|'.join(links) if links else ''
-                    flat_item[f'social_{platform}_count'] = len(links)
-            
-            flat_data.append(flat_item)
-            all_fieldnames.update(flat_item.keys())
+            all_fieldnames.update(DataHandler.flatten_record(item))
         
-        # Ensure all items have all fieldnames
-        for flat_item in flat_data:
-            for fieldname in all_fieldnames:
-                if fieldname not in flat_item:
-                    flat_item[fieldname] = ''
+        DataHandler._write_csv_rows(data, file_path, sorted(all_fieldnames))
+    
+    @staticmethod
+    def _write_csv_rows(records, file_path, fieldnames):
+        """Flatten and write records one row at a time, padding missing columns.
         
-        # Write CSV
+        Returns the number of rows that had values outside fieldnames, which are left out.
+        """
+        columns = set(fieldnames)
+        truncated = 0
         with open(file_path, 'w', encoding='utf-8', newline='') as f:
-            if flat_data:
-                writer = csv.DictWriter(f, fieldnames=sorted(all_fieldnames))
-                writer.writeheader()
-                writer.writerows(flat_data)
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval='', extrasaction='ignore')
+            writer.writeheader()
+            for item in records:
+                row = DataHandler.flatten_record(item)
+                if not row.keys() <= columns:
+                    truncated += 1
+                writer.writerow(row)
+        return truncated
+    
+    @staticmethod
+    def iter_jsonl(file_path):
+        """Yield records from a JSON Lines file one at a time"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    
+    @staticmethod
+    def export_jsonl_to_csv(jsonl_path, csv_path, fieldnames=None, scan_limit=None):
+        """Stream a JSON Lines file of records into a CSV file in constant memory
+
+        Columns come from fieldnames if given. Otherwise the source is pre-scanned for
+        column names (only the first scan_limit records when set, merged with the known
+        schema); the result then matches save_as_csv on the same records.
+        
+        Returns the number of rows truncated because they had values (e.g. extra phone
+        numbers past the scanned records) without a column; 0 means nothing was lost.
+        """
+        if fieldnames is None:
+            scanned = set()
+            for i, item in enumerate(DataHandler.iter_jsonl(jsonl_path)):
+                if scan_limit is not None and i >= scan_limit:
+                    scanned.update(DataHandler.csv_fieldnames())
+                    break
+                scanned.update(DataHandler.flatten_record(item))
+            if not scanned:
+                raise ValueError("No data to save")
+            fieldnames = sorted(scanned)
+        
+        directory = os.path.dirname(csv_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        return DataHandler._write_csv_rows(DataHandler.iter_jsonl(jsonl_path), csv_path, fieldnames)
+    
+    @staticmethod
+    def flatten_record(item):
+        """Flatten a listing record into a single CSV row"""
+        flat_item = {}
+        
+        # Copy basic fields
+        for field in DataHandler.BASIC_FIELDS:
+            flat_item[field] = item.get(field, '')
+        
+        # Handle address fields
+        if 'address' in item and item['address']:
+            for addr_key, addr_value in item['address'].items():
+                flat_item[f'address_{addr_key}'] = addr_value or ''
+        
+        # Handle categories
+        if 'categories' in item:
+            flat_item['categories'] = '|'.join(item['categories']) if item['categories'] else ''
+        
+        # Handle phone numbers
+        if 'phone_numbers' in item:
+            phone_numbers = item['phone_numbers']
+            for i, phone_info in enumerate(phone_numbers):
+                flat_item[f'phone_{i+1}_number'] = phone_info.get('number', '')
+                flat_item[f'phone_{i+1}_type'] = phone_info.get('type', '')
+        
+        # Handle websites
+        if 'websites' in item:
+            websites = item['websites']
+            for i, website in enumerate(websites):
+                flat_item[f'website_{i+1}'] = website
+        
+        # Handle emails
+        if 'emails' in item:
+            flat_item['emails'] = '|'.join(item['emails']) if item['emails'] else ''
+            flat_item['emails_count'] = len(item['emails'])
+        
+        # Handle social links
+        if 'social_links' in item:
+            social_links = item['social_links']
+            for platform, links in social_links.items():
+                flat_item[f'social_{platform}'] = '|'.join(links) if links else ''
+                flat_item[f'social_{platform}_count'] = len(links)
+        
+        return flat_item
+    
+    @staticmethod
+    def csv_fieldnames(max_phone_numbers=None, max_websites=None):
+        """Known CSV columns of a flattened listing record, for writing rows as they arrive"""
+        max_phone_numbers = max_phone_numbers or Config.CSV_MAX_PHONE_NUMBERS
+        max_websites = max_websites or Config.CSV_MAX_WEBSITES
+        
+        fieldnames = list(DataHandler.BASIC_FIELDS) + ['categories', 'emails', 'emails_count']
+        fieldnames += [f'address_{key}' for key in DataHandler.ADDRESS_FIELDS]
+        for i in range(1, max_phone_numbers + 1):
+            fieldnames += [f'phone_{i}_number', f'phone_{i}_type']
+        fieldnames += [f'website_{i}' for i in range(1, max_websites + 1)]
+        platforms = set(SocialMatcher(Config.SOCIAL_DOMAINS, Config.SOCIAL_DOMAIN_ALIASES).platforms.values())
+        for platform in platforms:
+            fieldnames += [f'social_{platform}', f'social_{platform}_count']
+        return sorted(fieldnames)
     
     @staticmethod
     def save_as_json(data, file_path):
@@ -94,6 +162,47 @@ class DataHandler:
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
     
+    @staticmethod
+    def save_as_parquet(records, file_path, batch_size=None):
+        """Save records as a Parquet file with nested columns, one row group per batch
+
+        records can be any iterable, e.g. iter_jsonl() for a streaming conversion.
+        """
+        from parquet_export import ParquetBatchWriter
+        
+        records = DataHandler._require_records(records)
+        writer = ParquetBatchWriter(file_path, batch_size)
+        try:
+            for record in records:
+                writer.write(record)
+        finally:
+            writer.close()
+    
+    @staticmethod
+    def save_as_sqlite(records, file_path, batch_size=None):
+        """Upsert records into a normalized SQLite database, returning how many were written"""
+        from listing_store import ListingStore
+        
+        records = DataHandler._require_records(records)
+        store = ListingStore(file_path)
+        try:
+            count = store.save(records, batch_size)
+        finally:
+            store.close()
+        if not count:
+            raise ValueError("No data to save")
+        return count
+    
+    @staticmethod
+    def _require_records(records):
+        """Iterate over records, raising before any file is created if there are none"""
+        records = iter(records)
+        try:
+            first = next(records)
+        except StopIteration:
+            raise ValueError("No data to save") from None
+        return itertools.chain([first], records)
+    
     @staticmethod
     def generate_filename(category, location, extension):
         """Generate filename based on category and location"""
@@ -102,43 +211,73 @@ class DataHandler:
         clean_category = category.replace(' ', '_')
         return f"yp_enhanced_{clean_category}_{clean_location}_{timestamp}.{extension}"
     
+    @staticmethod
+    def generate_checkpoint_filename(category, location, start_page, end_page):
+        """Checkpoint filename for a run, stable so an interrupted run can be found again"""
+        clean_location = location.replace('+', '_').replace(' ', '_')
+        clean_category = category.replace(' ', '_')
+        pages = f"{start_page}-{end_page}" if end_page is not None else f"{start_page}-end"
+        return f"yp_checkpoint_{clean_category}_{clean_location}_p{pages}.jsonl"
+    
     @staticmethod
     def get_scraping_summary(data):
         """Get summary statistics of scraped data"""
-        if not data:
-            return {}
-        
-        total_listings = len(data)
-        successful_scrapes = len([item for item in data if item.get('scraping_status') == 'success'])
-        failed_scrapes = total_listings - successful_scrapes
-        
-        total_emails = sum(len(item.get('emails', [])) for item in data)
-        total_social_platforms = sum(len(item.get('social_links', {})) for item in data)
-        total_websites = sum(len(item.get('websites', [])) for item in data)
-        
-        listings_with_emails = len([item for item in data if item.get('emails')])
-        listings_with_social = len([item for item in data if item.get('social_links')])
-        listings_with_websites = len([item for item in data if item.get('websites')])
-        
-        # Additional statistics
-        avg_emails_per_listing = total_emails / total_listings if total_listings > 0 else 0
-        avg_social_per_listing = total_social_platforms / total_listings if total_listings > 0 else 0
-        avg_websites_per_listing = total_websites / total_listings if total_listings > 0 else 0
-        
-        success_rate = (successful_scrapes / total_listings * 100) if total_listings > 0 else 0
-        
-        return {
-            'total_listings': total_listings,
-            'successful_scrapes': successful_scrapes,
-            'failed_scrapes': failed_scrapes,
-            'success_rate': round(success_rate, 2),
-            'total_emails': total_emails,
-            'total_social_platforms': total_social_platforms,
-            'total_websites': total_websites,
-            'listings_with_emails': listings_with_emails,
-            'listings_with_social': listings_with_social,
-            'listings_with_websites': listings_with_websites,
-            'avg_emails_per_listing': round(avg_emails_per_listing, 2),
-            'avg_social_per_listing': round(avg_social_per_listing, 2),
-            'avg_websites_per_listing': round(avg_websites_per_listing, 2)
-        }
+        summary = ScrapingSummary()
+        for item in data or []:
+            summary.add(item)
+        return summary.as_dict()
+
+
+class ScrapingSummary:
+    """Running totals behind get_scraping_summary, updated in O(1) per record"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_listings = 0
+        self.successful_scrapes = 0
+        self.total_emails = 0
+        self.total_social_platforms = 0
+        self.total_websites = 0
+        self.listings_with_emails = 0
+        self.listings_with_social = 0
+        self.listings_with_websites = 0
+    
+    def add(self, item):
+        """Count a finished record"""
+        emails = len(item.get('emails', []))
+        social_platforms = len(item.get('social_links', {}))
+        websites = len(item.get('websites', []))
+        
+        with self._lock:
+            self.total_listings += 1
+            if item.get('scraping_status') == 'success':
+                self.successful_scrapes += 1
+            self.total_emails += emails
+            self.total_social_platforms += social_platforms
+            self.total_websites += websites
+            self.listings_with_emails += bool(emails)
+            self.listings_with_social += bool(social_platforms)
+            self.listings_with_websites += bool(websites)
+    
+    def as_dict(self):
+        """Summary statistics in the shape DataHandler.get_scraping_summary returns"""
+        with self._lock:
+            total_listings = self.total_listings
+            if not total_listings:
+                return {}
+            
+            return {
+                'total_listings': total_listings,
+                'successful_scrapes': self.successful_scrapes,
+                'failed_scrapes': total_listings - self.successful_scrapes,
+                'success_rate': round(self.successful_scrapes / total_listings * 100, 2),
+                'total_emails': self.total_emails,
+                'total_social_platforms': self.total_social_platforms,
+                'total_websites': self.total_websites,
+                'listings_with_emails': self.listings_with_emails,
+                'listings_with_social': self.listings_with_social,
+                'listings_with_websites': self.listings_with_websites,
+                'avg_emails_per_listing': round(self.total_emails / total_listings, 2),
+                'avg_social_per_listing': round(self.total_social_platforms / total_listings, 2),
+                'avg_websites_per_listing': round(self.total_websites / total_listings, 2)
+            }
@@ -0,0 +1,59 @@
+"""Website enrichment stage"""
+
+import queue
+import threading
+
+from config import Config
+
+
+class WebsiteEnricher:
+    """Fills in emails and social links of listing records on a bounded worker pool.
+
+    Records are submitted as soon as their listing page is parsed. submit() blocks
+    while the queue is full, which applies backpressure to the listing crawl
+    without letting slow business websites hold it up otherwise.
+    """
+
+    _STOP = object()
+
+    def __init__(self, scraper, workers=None, queue_size=None, on_complete=None):
+        self.scraper = scraper
+        self.workers = workers or Config.ENRICHMENT_WORKERS
+        self.on_complete = on_complete
+        self._queue = queue.Queue(maxsize=queue_size or Config.ENRICHMENT_QUEUE_SIZE)
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"website-enricher-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, record):
+        """Queue a record for website enrichment, blocking while the queue is full"""
+        self._queue.put(record)
+
+    def join(self):
+        """Wait for all queued records to be enriched and stop the workers"""
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker(self):
+        while True:
+            record = self._queue.get()
+            if record is self._STOP:
+                return
+            try:
+                self.scraper.scrape_listing_websites(record)
+            except Exception as e:
+                self.scraper.log_message(f"    Error enriching {record.get('url')}: {str(e)}")
+            if self.on_complete:
+                try:
+                    self.on_complete(record)
+                except Exception as e:
+                    self.scraper.log_message(f"    Error handling enriched record: {str(e)}")
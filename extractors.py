@@ -0,0 +1,252 @@
+"""Fast extractors that work on raw response bytes instead of a parsed DOM"""
+
+import codecs
+import html
+import re
+from urllib.parse import urljoin, urlsplit
+
+from html_parsing import meta_charset
+
+
+YELLOWPAGES_ROOT = 'https://www.yellowpages.ca'
+
+# Class tokens are matched as whole words inside the class attribute, like BeautifulSoup does
+_LISTING_CONTAINER_RE = re.compile(
+    rb'<div\s[^>]*?\bclass\s*=\s*(["\'])(?:[^"\']*\s)?listing__content(?=[\s"\'])',
+    re.IGNORECASE
+)
+_LISTING_LINK_RE = re.compile(
+    rb'<a\s[^>]*?\bclass\s*=\s*(["\'])(?:[^"\']*\s)?listing__name--link(?=[\s"\'])[^>]*>',
+    re.IGNORECASE
+)
+_HREF_RE = re.compile(rb'\shref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+
+
+def extract_listing_urls_fast(content, encoding=None):
+    """Extract absolute listing URLs from a search results page without building a DOM.
+
+    Mirrors extract_listing_urls_from_search_results: the first listing name link
+    with an href inside each listing__content container. Returns None when the markup
+    doesn't look like a search results page so callers can fall back to BeautifulSoup.
+    """
+    if not content:
+        return None
+
+    starts = [match.start() for match in _LISTING_CONTAINER_RE.finditer(content)]
+    if not starts:
+        return None
+
+    encoding = encoding or 'utf-8'
+    listing_urls = []
+    found_link = False
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(content)
+        link = _LISTING_LINK_RE.search(content, start, end)
+        if not link:
+            continue
+        found_link = True
+        href = _HREF_RE.search(link.group(0))
+        raw_href = next((group for group in href.groups() if group is not None), b'') if href else b''
+        if not raw_href:
+            continue
+        try:
+            href_text = raw_href.decode(encoding, errors='replace')
+        except LookupError:
+            href_text = raw_href.decode('utf-8', errors='replace')
+        listing_urls.append(urljoin(YELLOWPAGES_ROOT, html.unescape(href_text)))
+
+    if not found_link:
+        return None
+    return listing_urls
+
+
+# Search result totals: the pager ("Page 1 / 12") and the result count ("1,234 results").
+# Both are only read just after their container's marker, so counts elsewhere on the
+# page (a sidebar, a "related results" box) are never mistaken for the total.
+_PAGE_COUNT_RE = re.compile(rb'\bpageCount\b', re.IGNORECASE)
+_RESULTS_HEADER_RE = re.compile(rb'\b(?:pageCount|resultCount|resultsCount)\b', re.IGNORECASE)
+_TOTALS_WINDOW = 300
+_PAGE_OF_RE = re.compile(rb'(\d+)\s*(?:/|of|de|sur)\s*(\d+)', re.IGNORECASE)
+_RESULT_COUNT_RE = re.compile(
+    rb'>\s*(\d[\d,\s]{0,12})\s*(?:</[a-z]+>\s*){0,3}(?:results?|r\xc3\xa9sultats?)\b', re.IGNORECASE
+)
+_TAG_RE = re.compile(rb'<[^>]*>')
+
+
+def extract_search_totals(content):
+    """Return (page_count, result_count) from a search results page, each None if not shown"""
+    if not content:
+        return None, None
+
+    page_count = None
+    marker = _PAGE_COUNT_RE.search(content)
+    if marker:
+        text = _TAG_RE.sub(b' ', content[marker.end():marker.end() + _TOTALS_WINDOW])
+        pages = _PAGE_OF_RE.search(text)
+        if pages:
+            page_count = int(pages.group(2))
+
+    result_count = None
+    for header in _RESULTS_HEADER_RE.finditer(content):
+        count = _RESULT_COUNT_RE.search(content, header.end(), header.end() + _TOTALS_WINDOW)
+        if count:
+            digits = re.sub(rb'\D', b'', count.group(1))
+            if digits:
+                result_count = int(digits)
+                break
+    return page_count, result_count
+
+
+# Emails and href values in one precompiled pass. Token lengths are bounded so a
+# scanner only ever needs to keep a fixed-size tail between chunks.
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,253}\.[A-Za-z]{2,24}\b'
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+_CONTACT_RE = re.compile(
+    r'\bhref\s*=\s*["\']?(?P<href>[^"\'\s>]{1,900})|(?P<email>' + EMAIL_PATTERN + ')',
+    re.IGNORECASE
+)
+_MAILTO_RE = re.compile(r'^mailto:\s*(' + EMAIL_PATTERN + ')', re.IGNORECASE)
+_SCAN_CARRY = 1024  # Longer than any token the patterns above can match
+
+EMAIL_SKIP_DOMAINS = frozenset(['example.com', 'test.com', 'dummy.com'])
+EMAIL_SKIP_SUFFIXES = frozenset(['png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'bmp', 'ico'])
+
+
+def is_valid_email(email):
+    """Filter out placeholder addresses and image names like logo@2x.png"""
+    domain = email.rsplit('@', 1)[-1].lower()
+    labels = domain.split('.')
+    if labels[-1] in EMAIL_SKIP_SUFFIXES:
+        return False
+    # Check the domain and each parent domain against the skip set
+    return not any('.'.join(labels[i:]) in EMAIL_SKIP_DOMAINS for i in range(len(labels) - 1))
+
+
+class ContactScanner:
+    """Single-pass scanner collecting emails and candidate social hrefs from raw HTML.
+
+    Bytes are fed in chunks and only a small tail is kept between them, so memory
+    stays flat no matter how large the page is. Without an encoding, the one declared
+    by a <meta> tag in the first chunk is used (UTF-8 if there is none).
+    """
+
+    def __init__(self, encoding=None, is_social_candidate=None):
+        self.encoding = encoding
+        self._decoder = None
+        self.is_social_candidate = is_social_candidate
+        self.emails = set()
+        self.social_hrefs = []
+        self._seen_hrefs = set()
+        self._tail = ''
+        self.bytes_scanned = 0
+
+    def feed(self, chunk):
+        """Scan the next chunk of the body"""
+        if self._decoder is None:
+            self._decoder = self._new_decoder(self.encoding or meta_charset(chunk))
+        self.bytes_scanned += len(chunk)
+        self._scan(self._tail + self._decoder.decode(chunk), final=False)
+
+    def close(self):
+        """Scan whatever is left after the last chunk"""
+        if self._decoder is None:
+            return
+        self._scan(self._tail + self._decoder.decode(b'', final=True), final=True)
+        self._tail = ''
+
+    @staticmethod
+    def _new_decoder(encoding):
+        try:
+            decoder_factory = codecs.getincrementaldecoder(encoding or 'utf-8')
+        except LookupError:
+            decoder_factory = codecs.getincrementaldecoder('utf-8')
+        return decoder_factory(errors='replace')
+
+    def _scan(self, text, final):
+        # Tokens starting in the last _SCAN_CARRY characters are left for the next
+        # round, when they can no longer be cut off by the chunk boundary
+        cut = len(text) if final else max(len(text) - _SCAN_CARRY, 0)
+        if not final:
+            amp = text.rfind('&', max(cut - 10, 0), cut)
+            if amp != -1 and ';' not in text[amp:cut]:
+                cut = amp  # Don't split an entity across the cut
+        head, rest = text[:cut], text[cut:]
+        if '&' in head:
+            head = html.unescape(head)  # e.g. info&#64;site.ca
+
+        text = head + rest
+        consumed = len(head)
+        for match in _CONTACT_RE.finditer(text):
+            if match.start() >= len(head):
+                break
+            href = match.group('href')
+            if href is not None:
+                self._add_href(href)
+            else:
+                self._add_email(match.group('email'))
+            # A token running past the cut is done; don't rescan its end next round
+            consumed = max(consumed, match.end())
+        self._tail = text[consumed:]
+
+    def _add_href(self, href):
+        mailto = _MAILTO_RE.match(href)
+        if mailto:
+            self._add_email(mailto.group(1))
+        elif href not in self._seen_hrefs and (self.is_social_candidate is None or self.is_social_candidate(href)):
+            self._seen_hrefs.add(href)
+            self.social_hrefs.append(href)
+
+    def _add_email(self, email):
+        if is_valid_email(email):
+            self.emails.add(email)
+
+
+class SocialMatcher:
+    """Resolves an href to a social media platform with one host parse and a dict lookup.
+
+    The host and each of its parent domains are looked up, so www./m./mobile.
+    subdomains resolve while look-alikes such as notfacebook.com.example don't.
+    """
+
+    def __init__(self, domains, aliases=None):
+        self.platforms = {}
+        for domain in domains:
+            platform = domain.split('.')[0]
+            self.platforms[domain.lower()] = 'twitter' if platform == 'x' else platform
+        for domain, platform in (aliases or {}).items():
+            self.platforms[domain.lower()] = platform
+
+    @staticmethod
+    def absolute_url(href):
+        """Absolute URL for an href, or None for relative links and other schemes"""
+        href = href.strip()
+        if href.startswith('//'):
+            return f"https:{href}"
+        if '://' in href:
+            return href
+        # Scheme-less links like "facebook.com/page"
+        first_segment = href.split('/', 1)[0]
+        if '.' in first_segment and ':' not in first_segment and not href.startswith(('.', '#', '?')):
+            return f"https://{href}"
+        return None
+
+    def platform_for(self, href):
+        """Platform name for an href, or None if it isn't a social media link"""
+        url = self.absolute_url(href)
+        if not url:
+            return None
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return None
+        if not host:
+            return None
+        labels = host.rstrip('.').split('.')
+        for i in range(len(labels) - 1):
+            platform = self.platforms.get('.'.join(labels[i:]))
+            if platform:
+                return platform
+        return None
+
+    def is_social(self, href):
+        return self.platform_for(href) is not None
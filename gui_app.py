@@ -2,11 +2,15 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import os
+import queue
 import threading
 from datetime import datetime
 
 from scraper import YellowPagesScraper
+from async_scraper import AsyncYellowPagesScraper
 from data_handler import DataHandler
+from checkpoint import RunJournal
 from sound_utils import SoundNotifier
 from config import Config
 
@@ -21,7 +25,17 @@ class YellowPagesApp:
         self.scraped_data = []
         self.scraping_thread = None
         
+        # Log lines and progress from the scraping thread are queued and rendered by the Tk loop
+        self.log_queue = queue.SimpleQueue()
+        self.pending_progress = None
+        self.log_file_path = Config.LOG_FILE_PATH
+        if self.log_file_path:
+            log_directory = os.path.dirname(self.log_file_path)
+            if log_directory:
+                os.makedirs(log_directory, exist_ok=True)
+        
         self.create_widgets()
+        self.root.after(Config.LOG_DRAIN_INTERVAL_MS, self.drain_log_queue)
         
     def create_widgets(self):
         """Create and layout GUI widgets"""
@@ -97,6 +111,13 @@ class YellowPagesApp:
             row=1, column=0, columnspan=4, sticky=tk.W, pady=(5, 0)
         )
         
+        # Engine selection
+        self.concurrent_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            input_frame, text="Concurrent engine (fetch several listings and websites at once)",
+            variable=self.concurrent_var
+        ).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
         # Help text
         help_text = ("Examples:\n"
                     "Category: dentists, restaurants, plumbers, electricians\n"
@@ -104,7 +125,7 @@ class YellowPagesApp:
                     "Pages: Start=1, End=5 (scrape pages 1-5) or Start=3, End=3 (scrape only page 3)\n"
                     "New Flow: Extract only URLs from search results, get all data from individual pages")
         ttk.Label(input_frame, text=help_text, font=("Arial", 8), foreground="gray").grid(
-            row=3, column=0, columnspan=2, sticky=tk.W, pady=(10, 0)
+            row=4, column=0, columnspan=2, sticky=tk.W, pady=(10, 0)
         )
         
         # Configure input frame grid
@@ -130,6 +151,7 @@ class YellowPagesApp:
         self.website_retries_var = tk.StringVar(value=str(Config.DEFAULT_MAX_WEBSITE_RETRIES))
         self.page_timeout_var = tk.StringVar(value=str(Config.DEFAULT_PAGE_LOAD_TIMEOUT))
         self.page_retries_var = tk.StringVar(value=str(Config.DEFAULT_MAX_PAGE_RETRIES))
+        self.adaptive_var = tk.BooleanVar(value=Config.ADAPTIVE_DELAYS)
         
         # First row - Search page delays
         ttk.Label(delay_frame, text="Search Pages:").grid(row=0, column=0, sticky=tk.W, pady=2)
@@ -175,11 +197,16 @@ class YellowPagesApp:
         ttk.Button(delay_frame, text="Reset to Defaults", command=self.reset_delays).grid(
             row=6, column=0, columnspan=2, pady=(10, 0), sticky=tk.W
         )
+        ttk.Checkbutton(
+            delay_frame, text="Adaptive (speed up while the site is healthy, back off on errors)",
+            variable=self.adaptive_var
+        ).grid(row=6, column=2, columnspan=3, pady=(10, 0), sticky=tk.W)
         
         # Help text for delays
-        delay_help = ("Delay ranges help avoid being blocked. Search: between search result pages, "
-                     "Listing: between individual listing pages, Website: between business websites, "
-                     "Page Load: simulated loading time after each request")
+        delay_help = ("Delay ranges help avoid being blocked. Search and Listing set the yellowpages.ca "
+                     "request rate, Website sets a separate rate for each business website, "
+                     "Page Load: simulated loading time after each request. "
+                     "In adaptive mode Min/Max are the fastest and slowest delays allowed")
         ttk.Label(delay_frame, text=delay_help, font=("Arial", 8), foreground="gray", wraplength=600).grid(
             row=7, column=0, columnspan=5, sticky=tk.W, pady=(10, 0)
         )
@@ -198,6 +225,7 @@ class YellowPagesApp:
         self.website_retries_var.set(str(Config.DEFAULT_MAX_WEBSITE_RETRIES))
         self.page_timeout_var.set(str(Config.DEFAULT_PAGE_LOAD_TIMEOUT))
         self.page_retries_var.set(str(Config.DEFAULT_MAX_PAGE_RETRIES))
+        self.adaptive_var.set(Config.ADAPTIVE_DELAYS)
         
     def create_button_section(self, parent):
         """Create button section"""
@@ -235,6 +263,9 @@ class YellowPagesApp:
         self.progress_bar = ttk.Progressbar(progress_frame, mode='indeterminate')
         self.progress_bar.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
         
+        self.rate_label = ttk.Label(progress_frame, text="", font=("Arial", 8), foreground="gray")
+        self.rate_label.grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        
         progress_frame.columnconfigure(0, weight=1)
         
     def create_summary_section(self, parent):
@@ -295,24 +326,74 @@ class YellowPagesApp:
         main_frame.rowconfigure(5, weight=1)
         
     def log_message(self, message):
-        """Add message to log text widget"""
+        """Queue a message for the log widget; safe to call from any thread"""
         timestamp = datetime.now().strftime('%H:%M:%S')
-        log_entry = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.log_queue.put(f"[{timestamp}] {message}\n")
         
     def update_progress(self, page, total_listings):
-        """Update progress display"""
-        self.progress_label.config(text=f"Page {page} - Total listings scraped: {total_listings}")
-        self.update_summary()
+        """Record progress from the scraping thread; rendered by drain_log_queue"""
+        self.pending_progress = (page, total_listings)
+        
+    def drain_log_queue(self):
+        """Render queued log lines and progress in one batch, then reschedule"""
+        entries = []
+        try:
+            while len(entries) < Config.LOG_DRAIN_BATCH:
+                entries.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if entries:
+            text = ''.join(entries)
+            if self.log_file_path:
+                # Opened per batch so no handle outlives a run or the window
+                try:
+                    with open(self.log_file_path, 'a', encoding='utf-8') as log_file:
+                        log_file.write(text)
+                except OSError as e:
+                    text += f"Can't write to log file {self.log_file_path}: {str(e)}\n"
+                    self.log_file_path = None
+            self.log_text.insert(tk.END, text)
+            
+            # Keep a bounded scrollback by dropping the oldest lines
+            line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1  # Text ends with a newline
+            if line_count > Config.LOG_MAX_LINES:
+                self.log_text.delete('1.0', f"{line_count - Config.LOG_MAX_LINES + 1}.0")
+            self.log_text.see(tk.END)
+        
+        progress, self.pending_progress = self.pending_progress, None
+        if progress:
+            page, total_listings = progress
+            self.progress_label.config(text=f"Page {page} - Total listings scraped: {total_listings}")
+            self.update_summary()
+            self.update_rate_label()
+        
+        # Come back sooner while there is a backlog
+        delay = 1 if len(entries) == Config.LOG_DRAIN_BATCH else Config.LOG_DRAIN_INTERVAL_MS
+        self.root.after(delay, self.drain_log_queue)
+        
+    def update_rate_label(self):
+        """Show the current yellowpages.ca request delays"""
+        if not self.scraper:
+            return
+        limiter = self.scraper.rate_limiter
+        delays = limiter.current_delays(limiter.yellowpages_host)
+        if delays:
+            text = ", ".join(f"{page_type} {delay:.1f}s" for (_, page_type), delay in sorted(delays.items()))
+            mode = "adaptive" if self.scraper.ADAPTIVE_DELAYS else "fixed"
+            self.rate_label.config(text=f"Current delays ({mode}): {text}")
+        
+    def current_summary(self):
+        """Summary of the current or last run, kept up to date by the scraper as records finish"""
+        if not self.scraper:
+            return {}
+        return self.scraper.summary.as_dict()
         
     def update_summary(self):
         """Update summary statistics"""
-        if not self.scraped_data:
+        summary = self.current_summary()
+        if not summary:
             return
-            
-        summary = DataHandler.get_scraping_summary(self.scraped_data)
         
         self.summary_labels['total'].config(text=str(summary.get('total_listings', 0)))
         self.summary_labels['successful'].config(text=str(summary.get('successful_scrapes', 0)))
@@ -382,6 +463,7 @@ class YellowPagesApp:
             for key, value in delay_settings.items():
                 if value <= 0:
                     raise ValueError(f"{key} must be positive")
+            delay_settings['adaptive'] = self.adaptive_var.get()
                     
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid delay settings: {str(e)}")
@@ -392,7 +474,8 @@ class YellowPagesApp:
             'location': location,
             'start_page': start_page,
             'end_page': end_page,
-            'delay_settings': delay_settings
+            'delay_settings': delay_settings,
+            'concurrent': self.concurrent_var.get()
         }
         
     def start_scraping(self):
@@ -413,6 +496,16 @@ class YellowPagesApp:
         
         if not messagebox.askyesno("Enhanced Scraping", warning_msg):
             return
+        
+        # Progress is journaled so an interrupted run can be resumed
+        checkpoint_path = os.path.join(Config.CHECKPOINT_DIR, DataHandler.generate_checkpoint_filename(
+            inputs['category'], inputs['location'], inputs['start_page'], inputs['end_page']
+        ))
+        if os.path.exists(checkpoint_path):
+            resume_msg = ("An interrupted run with the same category, location and pages was found.\n\n"
+                          "Resume it? Choose No to start over.")
+            if RunJournal.is_complete(checkpoint_path) or not messagebox.askyesno("Resume Scraping", resume_msg):
+                os.remove(checkpoint_path)
             
         # Update UI
         self.update_ui_for_scraping_start()
@@ -423,7 +516,8 @@ class YellowPagesApp:
         self.update_summary()
         
         # Create scraper instance with delay settings
-        self.scraper = YellowPagesScraper(
+        scraper_class = AsyncYellowPagesScraper if inputs['concurrent'] else YellowPagesScraper
+        self.scraper = scraper_class(
             progress_callback=self.update_progress,
             log_callback=self.log_message,
             delay_settings=inputs['delay_settings']
@@ -432,7 +526,7 @@ class YellowPagesApp:
         # Start scraping in a separate thread
         self.scraping_thread = threading.Thread(
             target=self.run_scraping_thread,
-            args=(inputs['category'], inputs['location'], inputs['start_page'], inputs['end_page'])
+            args=(inputs['category'], inputs['location'], inputs['start_page'], inputs['end_page'], checkpoint_path)
         )
         self.scraping_thread.daemon = True
         self.scraping_thread.start()
@@ -445,10 +539,15 @@ class YellowPagesApp:
         self.save_json_button.config(state=tk.DISABLED)
         self.progress_bar.start()
         
-    def run_scraping_thread(self, category, location, start_page, end_page):
+    def run_scraping_thread(self, category, location, start_page, end_page, checkpoint_path=None):
         """Run scraping in separate thread"""
         try:
-            self.scraped_data = self.scraper.run_scraper(category, location, start_page, end_page)
+            self.scraped_data = self.scraper.run_scraper(category, location, start_page, end_page,
+                                                         checkpoint_path=checkpoint_path)
+            # A finished run has nothing to resume, so don't leave its journal behind
+            if (checkpoint_path and not self.scraper.stop_requested and os.path.exists(checkpoint_path)
+                    and RunJournal.is_complete(checkpoint_path)):
+                os.remove(checkpoint_path)
             self.root.after(0, self.scraping_completed)
         except Exception as e:
             self.root.after(0, lambda: self.scraping_error(str(e)))
@@ -470,7 +569,7 @@ class YellowPagesApp:
         SoundNotifier.play_completion_sound()
         
         # Show detailed completion message
-        summary = DataHandler.get_scraping_summary(self.scraped_data)
+        summary = self.current_summary()
         completion_msg = (f"Scraping completed!\n\n"
                          f"Total listings: {summary.get('total_listings', 0)}\n"
                          f"Successful: {summary.get('successful_scrapes', 0)}\n"
@@ -524,7 +623,7 @@ class YellowPagesApp:
                 self.log_message(f"Data saved to {file_path}")
                 
                 # Show summary in save confirmation
-                summary = DataHandler.get_scraping_summary(self.scraped_data)
+                summary = self.current_summary()
                 save_msg = (f"Data saved successfully to:\n{file_path}\n\n"
                            f"Summary:\n"
                            f"• {summary.get('total_listings', 0)} listings\n"
@@ -564,7 +663,7 @@ class YellowPagesApp:
                 self.log_message(f"Data saved to {file_path}")
                 
                 # Show summary in save confirmation
-                summary = DataHandler.get_scraping_summary(self.scraped_data)
+                summary = self.current_summary()
                 save_msg = (f"Data saved successfully to:\n{file_path}\n\n"
                            f"Summary:\n"
                            f"• {summary.get('total_listings', 0)} listings\n"
@@ -0,0 +1,114 @@
+"""HTML parsing helpers: parser backend selection, targeted parsing and charset handling"""
+
+import re
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+
+PARSER_BACKENDS = ('lxml', 'html5lib', 'html.parser')
+
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+_META_SNIFF_BYTES = 2048
+
+
+def _has_class(value, class_name):
+    """Check a raw class attribute value (string or list) for a class name"""
+    if not value:
+        return False
+    if isinstance(value, str):
+        value = value.split()
+    return class_name in value
+
+
+class ParseTargets(SoupStrainer):
+    """Strainer that only builds the elements a page type actually needs.
+
+    Each rule is (tag name, predicate on the raw attribute dict). Matching elements
+    are kept with their whole subtree; everything else (scripts, ads, layout) is
+    skipped while parsing.
+    """
+
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = rules
+
+    def allows(self, name, attrs):
+        attrs = attrs or {}
+        return any(name == rule_name and predicate(attrs) for rule_name, predicate in self.rules)
+
+    # BeautifulSoup >= 4.13
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.allows(name, attrs)
+
+    # BeautifulSoup < 4.13
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if isinstance(markup_name, str):
+            return markup_name if self.allows(markup_name, dict(markup_attrs)) else None
+        return super().search_tag(markup_name, markup_attrs)
+
+
+PAGE_PARSE_TARGETS = {
+    'search': ParseTargets([
+        ('div', lambda attrs: _has_class(attrs.get('class'), 'listing__content')),
+    ]),
+    'listing': ParseTargets([
+        ('span', lambda attrs: _has_class(attrs.get('class'), 'merchantName')),
+        ('div', lambda attrs: attrs.get('itemprop') == 'address'),
+        ('li', lambda attrs: _has_class(attrs.get('class'), 'mlr__item--phone')),
+        ('li', lambda attrs: _has_class(attrs.get('class'), 'mlr__item--website')),
+        ('a', lambda attrs: _has_class(attrs.get('class'), 'merchant__status-text')),
+        ('a', lambda attrs: '/search/' in (attrs.get('href') or '')),
+    ]),
+}
+
+
+def resolve_parser_backend(preferred):
+    """Return the preferred parser backend if installed, else the next available one"""
+    candidates = [preferred] + [backend for backend in PARSER_BACKENDS if backend != preferred]
+    for backend in candidates:
+        try:
+            BeautifulSoup('', backend)
+            return backend
+        except FeatureNotFound:
+            continue
+    return 'html.parser'
+
+
+def header_encoding(response):
+    """Encoding declared by the Content-Type header, if any (never touches the body)"""
+    content_type = response.headers.get('Content-Type', '')
+    if 'charset=' in content_type.lower():
+        return response.encoding
+    return None
+
+
+def meta_charset(head):
+    """Encoding declared by a <meta> tag in the first bytes of a page, if any"""
+    match = _CHARSET_RE.search(head[:_META_SNIFF_BYTES])
+    if match:
+        return match.group(1).decode('ascii')
+    return None
+
+
+def declared_encoding(response):
+    """Encoding declared by the Content-Type header or a <meta> tag, if any.
+
+    Reads response.content, so don't use it on streamed responses (see header_encoding).
+    """
+    return header_encoding(response) or meta_charset(response.content)
+
+
+def parse_html(response, parser='html.parser', page_type=None):
+    """Parse a response, restricted to the elements its page type needs"""
+    parse_only = PAGE_PARSE_TARGETS.get(page_type)
+
+    # Fast charset path: decode with the declared encoding instead of sniffing
+    markup = response.content
+    encoding = declared_encoding(response)
+    if encoding:
+        try:
+            markup = markup.decode(encoding, errors='replace')
+        except LookupError:
+            pass
+
+    return BeautifulSoup(markup, parser, parse_only=parse_only)
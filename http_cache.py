@@ -0,0 +1,167 @@
+"""Persistent HTTP response cache"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+from config import Config
+
+
+class CachedResponse:
+    """Response served from the cache, with the parts of requests.Response the scraper uses"""
+
+    def __init__(self, url, content, headers=None, status_code=200, from_cache=True):
+        self.url = url
+        self.content = content
+        # Header names are case-insensitive, whatever capitalisation the server used
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.status_code = status_code
+        self.from_cache = from_cache
+        content_type = self.headers.get('Content-Type', '')
+        self.encoding = None
+        if 'charset=' in content_type.lower():
+            self.encoding = content_type.lower().split('charset=')[-1].split(';')[0].strip().strip('"\'')
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class ResponseCache:
+    """SQLite-backed response cache with per-page-type TTLs, conditional
+    revalidation (ETag / Last-Modified) and size-bounded LRU eviction."""
+
+    _KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def __init__(self, path, max_bytes=None, ttls=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes or Config.RESPONSE_CACHE_MAX_BYTES
+        self.ttls = ttls or Config.RESPONSE_CACHE_TTLS
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                page_type TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _ttl(self, page_type):
+        return self.ttls.get(page_type, self.ttls.get('default', 0))
+
+    def lookup(self, url, page_type=None):
+        """Return (response, is_fresh) for a cached URL, or (None, False)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            now = time.time()
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+        headers, body, fetched_at = row
+        response = CachedResponse(url, body, json.loads(headers))
+        is_fresh = now - fetched_at < self._ttl(page_type)
+        if is_fresh:
+            with self._lock:
+                self.hits += 1
+        return response, is_fresh
+
+    def is_fresh(self, url, page_type=None):
+        """Whether a fresh copy of url is cached, without counting a hit"""
+        with self._lock:
+            row = self._conn.execute("SELECT fetched_at FROM responses WHERE url = ?", (url,)).fetchone()
+        return row is not None and time.time() - row[0] < self._ttl(page_type)
+
+    @staticmethod
+    def conditional_headers(cached):
+        """Validator headers for revalidating a stale cached response"""
+        headers = {}
+        if cached.headers.get('ETag'):
+            headers['If-None-Match'] = cached.headers['ETag']
+        if cached.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        return headers
+
+    def mark_revalidated(self, url):
+        """Record a 304 Not Modified: the cached body is fresh again"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE responses SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+            self.revalidations += 1
+
+    def record_miss(self):
+        """Count a request that had to go to the network"""
+        with self._lock:
+            self.misses += 1
+
+    def store(self, url, page_type, content, headers):
+        """Store a successful response body and evict least recently used entries if needed"""
+        headers = CaseInsensitiveDict(headers or {})
+        kept_headers = {name: headers[name] for name in self._KEPT_HEADERS if headers.get(name)}
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, page_type, headers, body, size, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, page_type, json.dumps(kept_headers), sqlite3.Binary(content), size, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT url, size FROM responses ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for url, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'revalidations': self.revalidations,
+                'misses': self.misses,
+                'size_bytes': self._total_bytes
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
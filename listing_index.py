@@ -0,0 +1,87 @@
+"""Persistent index of scraped listings for incremental re-scrapes"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Record fields that differ between runs without the listing itself changing
+_RUN_FIELDS = ('url', 'page_number', 'scraped_at')
+
+
+def content_hash(record):
+    """Stable hash of a listing's parsed fields.
+
+    Hashing what was extracted rather than the page bytes means ads, tokens and
+    timestamps in the markup don't make an unchanged listing look changed.
+    """
+    fields = {key: value for key, value in record.items() if key not in _RUN_FIELDS}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ListingIndex:
+    """SQLite store of listing URL -> last scraped time, content hash and record"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                url TEXT PRIMARY KEY,
+                scraped_at REAL NOT NULL,
+                content_hash TEXT,
+                record TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        """Return (scraped_at, content_hash, record) for a listing URL, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scraped_at, content_hash, record FROM listings WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def get_fresh(self, url, max_age_seconds):
+        """Return the stored record if it was scraped less than max_age_seconds ago"""
+        entry = self.get(url)
+        if entry is None or time.time() - entry[0] >= max_age_seconds:
+            return None
+        return entry[2]
+
+    def get_unchanged(self, url, page_hash):
+        """Return the stored record if the listing page still has the same content hash"""
+        entry = self.get(url)
+        if entry is None or not page_hash or entry[1] != page_hash:
+            return None
+        return entry[2]
+
+    def put(self, url, record, page_hash=None):
+        """Store a finished listing record"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings (url, scraped_at, content_hash, record) VALUES (?, ?, ?, ?)",
+                (url, time.time(), page_hash, json.dumps(record, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """Mark an unchanged listing as checked now"""
+        with self._lock:
+            self._conn.execute("UPDATE listings SET scraped_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
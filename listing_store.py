@@ -0,0 +1,226 @@
+"""Normalized SQLite storage of scraped listings"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from config import Config
+from contact_cache import normalize_site_url
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    name TEXT,
+    phone TEXT,
+    website TEXT,
+    street TEXT,
+    city TEXT,
+    region TEXT,
+    postal_code TEXT,
+    page_number INTEGER,
+    scraped_at TEXT,
+    business_hours TEXT,
+    scraping_status TEXT
+);
+CREATE TABLE IF NOT EXISTS categories (
+    listing_id INTEGER NOT NULL REFERENCES listings(id) ON DELETE CASCADE,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phones (
+    listing_id INTEGER NOT NULL REFERENCES listings(id) ON DELETE CASCADE,
+    number TEXT NOT NULL,
+    digits TEXT NOT NULL,
+    type TEXT
+);
+CREATE TABLE IF NOT EXISTS websites (
+    listing_id INTEGER NOT NULL REFERENCES listings(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS emails (
+    listing_id INTEGER NOT NULL REFERENCES listings(id) ON DELETE CASCADE,
+    email TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS social_links (
+    listing_id INTEGER NOT NULL REFERENCES listings(id) ON DELETE CASCADE,
+    platform TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_listings_postal_code ON listings (postal_code);
+CREATE INDEX IF NOT EXISTS idx_categories_category ON categories (category, listing_id);
+CREATE INDEX IF NOT EXISTS idx_phones_digits ON phones (digits, listing_id);
+CREATE INDEX IF NOT EXISTS idx_websites_domain ON websites (domain, listing_id);
+CREATE INDEX IF NOT EXISTS idx_emails_email ON emails (email, listing_id);
+CREATE INDEX IF NOT EXISTS idx_categories_listing ON categories (listing_id);
+CREATE INDEX IF NOT EXISTS idx_phones_listing ON phones (listing_id);
+CREATE INDEX IF NOT EXISTS idx_websites_listing ON websites (listing_id);
+CREATE INDEX IF NOT EXISTS idx_emails_listing ON emails (listing_id);
+CREATE INDEX IF NOT EXISTS idx_social_links_listing ON social_links (listing_id);
+"""
+
+CHILD_TABLES = ('categories', 'phones', 'websites', 'emails', 'social_links')
+
+_NON_DIGITS_RE = re.compile(r'\D')
+
+
+def phone_digits(number):
+    """Digits of a phone number, without a leading North American country code"""
+    digits = _NON_DIGITS_RE.sub('', number or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+
+def website_domain(url):
+    """Domain of a website URL, without www."""
+    return normalize_site_url(url).split('/', 1)[0]
+
+
+class ListingStore:
+    """Listings in normalized SQLite tables, indexed for "who shares this contact" lookups.
+
+    Records are upserted by listing URL, so re-scrapes replace a listing's rows
+    instead of duplicating them.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def save(self, records, batch_size=None):
+        """Upsert records in batched transactions, returning how many were written"""
+        batch_size = batch_size or Config.SQLITE_BATCH_SIZE
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                count += self._save_batch(batch)
+                batch = []
+        if batch:
+            count += self._save_batch(batch)
+        return count
+
+    def _save_batch(self, records):
+        # The last copy of a URL within a batch wins, like it does across batches
+        records = list({record['url']: record for record in records if record.get('url')}.values())
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO listings (url, name, phone, website, street, city, region, postal_code,
+                                      page_number, scraped_at, business_hours, scraping_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    name = excluded.name, phone = excluded.phone, website = excluded.website,
+                    street = excluded.street, city = excluded.city, region = excluded.region,
+                    postal_code = excluded.postal_code, page_number = excluded.page_number,
+                    scraped_at = excluded.scraped_at, business_hours = excluded.business_hours,
+                    scraping_status = excluded.scraping_status
+                """,
+                [self._listing_row(record) for record in records]
+            )
+
+            ids = {}
+            urls = [record['url'] for record in records]
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for row in self._conn.execute(f"SELECT id, url FROM listings WHERE url IN ({placeholders})", chunk):
+                    ids[row['url']] = row['id']
+
+            id_rows = [(listing_id,) for listing_id in ids.values()]
+            for table in CHILD_TABLES:
+                self._conn.executemany(f"DELETE FROM {table} WHERE listing_id = ?", id_rows)
+
+            categories, phones, websites, emails, social_links = [], [], [], [], []
+            for record in records:
+                listing_id = ids[record['url']]
+                categories += [(listing_id, category) for category in record.get('categories') or []]
+                phones += [(listing_id, phone.get('number'), phone_digits(phone.get('number')), phone.get('type'))
+                           for phone in record.get('phone_numbers') or [] if phone.get('number')]
+                websites += [(listing_id, url, website_domain(url)) for url in record.get('websites') or []]
+                emails += [(listing_id, email.lower()) for email in record.get('emails') or []]
+                social_links += [(listing_id, platform, url)
+                                 for platform, urls in (record.get('social_links') or {}).items() for url in urls]
+
+            self._conn.executemany("INSERT INTO categories (listing_id, category) VALUES (?, ?)", categories)
+            self._conn.executemany("INSERT INTO phones (listing_id, number, digits, type) VALUES (?, ?, ?, ?)", phones)
+            self._conn.executemany("INSERT INTO websites (listing_id, url, domain) VALUES (?, ?, ?)", websites)
+            self._conn.executemany("INSERT INTO emails (listing_id, email) VALUES (?, ?)", emails)
+            self._conn.executemany("INSERT INTO social_links (listing_id, platform, url) VALUES (?, ?, ?)",
+                                   social_links)
+        return len(records)
+
+    @staticmethod
+    def _listing_row(record):
+        address = record.get('address') or {}
+        return (
+            record['url'], record.get('name'), record.get('phone'), record.get('website'),
+            address.get('street'), address.get('city'), address.get('region'), address.get('postal_code'),
+            record.get('page_number'), record.get('scraped_at'), record.get('business_hours'),
+            record.get('scraping_status')
+        )
+
+    def _listings_where(self, join, condition, value):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT listings.* FROM listings JOIN {join} ON {join}.listing_id = listings.id "
+                f"WHERE {condition} ORDER BY listings.name",
+                (value,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_by_phone(self, number):
+        """Listings with this phone number, in any formatting"""
+        return self._listings_where('phones', 'phones.digits = ?', phone_digits(number))
+
+    def find_by_email(self, email):
+        """Listings where this email address was found"""
+        return self._listings_where('emails', 'emails.email = ?', email.lower())
+
+    def find_by_domain(self, domain_or_url):
+        """Listings whose websites are on this domain"""
+        return self._listings_where('websites', 'websites.domain = ?', website_domain(domain_or_url))
+
+    def find_by_category(self, category):
+        """Listings in this category"""
+        return self._listings_where('categories', 'categories.category = ?', category)
+
+    def find_by_postal_code(self, postal_code):
+        """Listings at this postal code"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM listings WHERE postal_code = ? ORDER BY name", (postal_code,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def shared_contacts(self, kind='phone', min_listings=2):
+        """Phones, emails or domains used by at least min_listings listings, with their listing URLs"""
+        table, column = {'phone': ('phones', 'digits'), 'email': ('emails', 'email'),
+                         'domain': ('websites', 'domain')}[kind]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {table}.{column} AS value, json_group_array(DISTINCT listings.url) AS urls "
+                f"FROM {table} JOIN listings ON listings.id = {table}.listing_id "
+                f"GROUP BY {table}.{column} HAVING COUNT(DISTINCT listings.id) >= ? ORDER BY value",
+                (min_listings,)
+            ).fetchall()
+        return {row['value']: json.loads(row['urls']) for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
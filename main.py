@@ -1,11 +1,18 @@
 """Main entry point for Yellow Pages Scraper Application"""
 
-import tkinter as tk
-from gui_app import YellowPagesApp
+import sys
 
 
 def main():
     """Main function to start the application"""
+    # With command-line arguments, run headless without importing Tk
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
+    
+    import tkinter as tk
+    from gui_app import YellowPagesApp
+    
     root = tk.Tk()
     app = YellowPagesApp(root)
     
@@ -0,0 +1,106 @@
+"""Columnar Parquet export of listing records (requires pyarrow)"""
+
+import os
+from datetime import datetime
+
+from config import Config
+from data_handler import DataHandler
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed for Parquet export
+    pa = None
+    pq = None
+
+
+def require_pyarrow():
+    """Raise a helpful error when pyarrow isn't installed"""
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def listing_schema():
+    """Arrow schema of a listing record with native nested types"""
+    require_pyarrow()
+    return pa.schema([
+        ('name', pa.string()),
+        ('phone', pa.string()),
+        ('website', pa.string()),
+        ('url', pa.string()),
+        ('address', pa.struct([(field, pa.string()) for field in DataHandler.ADDRESS_FIELDS])),
+        ('categories', pa.list_(pa.string())),
+        ('page_number', pa.int32()),
+        ('scraped_at', pa.timestamp('us')),
+        ('phone_numbers', pa.list_(pa.struct([('number', pa.string()), ('type', pa.string())]))),
+        ('websites', pa.list_(pa.string())),
+        ('business_hours', pa.string()),
+        ('emails', pa.list_(pa.string())),
+        ('social_links', pa.map_(pa.string(), pa.list_(pa.string()))),
+        ('scraping_status', pa.string()),
+    ])
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_arrow_row(record):
+    """Shape a listing record for the Arrow schema"""
+    address = record.get('address') or {}
+    return {
+        'name': record.get('name'),
+        'phone': record.get('phone'),
+        'website': record.get('website'),
+        'url': record.get('url'),
+        'address': {field: address.get(field) for field in DataHandler.ADDRESS_FIELDS},
+        'categories': record.get('categories') or [],
+        'page_number': record.get('page_number'),
+        'scraped_at': _parse_timestamp(record.get('scraped_at')),
+        'phone_numbers': [{'number': phone.get('number'), 'type': phone.get('type')}
+                          for phone in record.get('phone_numbers') or []],
+        'websites': record.get('websites') or [],
+        'business_hours': record.get('business_hours'),
+        'emails': record.get('emails') or [],
+        'social_links': list((record.get('social_links') or {}).items()),
+        'scraping_status': record.get('scraping_status'),
+    }
+
+
+class ParquetBatchWriter:
+    """Writes records to a Parquet file one row group per batch"""
+
+    def __init__(self, path, batch_size=None, compression='zstd'):
+        require_pyarrow()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size or Config.PARQUET_ROW_GROUP_SIZE
+        self.schema = listing_schema()
+        self.count = 0
+        self._batch = []
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, record):
+        self._batch.append(to_arrow_row(record))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records as a row group"""
+        if self._batch:
+            self._writer.write_table(pa.Table.from_pylist(self._batch, schema=self.schema))
+            self.count += len(self._batch)
+            self._batch = []
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
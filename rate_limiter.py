@@ -0,0 +1,283 @@
+"""Per-host request rate limiting"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import Config
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now=None):
+        """Take one token and return how long the caller must wait for it"""
+        if now is None:
+            now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class HostRateLimiter:
+    """Keeps a separate rate budget per host so different hosts never wait on each other.
+
+    Budgets are given per page type as (min_delay, max_delay) ranges. Yellow Pages
+    search and listing pages each get their own bucket on the yellowpages.ca host,
+    while every third-party website host gets its own 'website' bucket.
+    """
+
+    def __init__(self, budgets, bursts=None, yellowpages_host=None):
+        self.budgets = budgets
+        self.bursts = bursts or {}
+        self.yellowpages_host = yellowpages_host
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_key(self, url, page_type):
+        """Bucket key for a URL: (host, page type)"""
+        host = urlparse(url).netloc.lower()
+        if host != self.yellowpages_host:
+            page_type = 'website'
+        return host, page_type
+
+    def _new_bucket(self, page_type):
+        min_delay, max_delay = self.budgets[page_type]
+        mean_delay = max((min_delay + max_delay) / 2.0, 0.001)
+        return TokenBucket(1.0 / mean_delay, self.bursts.get(page_type, 1))
+
+    def _get_bucket(self, key):
+        # Callers hold self._lock
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = self._new_bucket(key[1])
+        return bucket
+
+    def reserve(self, url, page_type):
+        """Reserve a request slot and return the wait in seconds (with jitter)"""
+        key = self.bucket_key(url, page_type)
+        with self._lock:
+            wait = self._get_bucket(key).reserve()
+        return self._jitter(key[1], wait)
+
+    def _jitter(self, page_type, wait):
+        if wait > 0:
+            # Keep the randomness of the configured delay range
+            min_delay, max_delay = self.budgets[page_type]
+            wait += random.uniform(0, max(max_delay - min_delay, 0) / 2.0)
+        return wait
+
+    def acquire(self, url, page_type):
+        """Block the calling thread until a slot for the URL's host is available"""
+        wait = self.reserve(url, page_type)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url, page_type):
+        """Wait for a slot without blocking the event loop"""
+        wait = self.reserve(url, page_type)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def observe(self, url, page_type, status=None, latency=None):
+        """Report how a request went (status None for a timeout or connection error); fixed budgets ignore it"""
+
+    def current_delays(self, host=None):
+        """Mean delay in seconds of each (host, page type) bucket used so far, optionally for one host"""
+        with self._lock:
+            return {key: 1.0 / bucket.rate for key, bucket in self._buckets.items()
+                    if host is None or key[0] == host}
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """HostRateLimiter whose per-host rates follow the responses (AIMD).
+
+    Each bucket starts in the middle of its (min_delay, max_delay) range. Every healthy
+    response adds a fixed step to its rate, while 403/429/5xx responses, timeouts,
+    connection errors and latency well above the host's usual latency cut the rate by
+    ADAPTIVE_DECREASE_FACTOR. The delay never leaves the configured range, so min and
+    max act as floor and ceiling.
+    """
+
+    def __init__(self, budgets, bursts=None, yellowpages_host=None, log_callback=None):
+        super().__init__(budgets, bursts, yellowpages_host)
+        self.log_callback = log_callback
+        self._latency = {}  # key -> (recent latency, usual latency), both moving averages
+        self._last_decrease = {}
+        self._logged_rates = {}
+
+    def _rate_bounds(self, page_type):
+        min_delay, max_delay = self.budgets[page_type]
+        return 1.0 / max(max_delay, 0.001), 1.0 / max(min_delay, 0.001)
+
+    def _jitter(self, page_type, wait):
+        if wait > 0:
+            # The range is taken by the controller, keep a little randomness on top
+            wait += random.uniform(0, wait * Config.ADAPTIVE_JITTER)
+        return wait
+
+    def observe(self, url, page_type, status=None, latency=None):
+        """Raise the host's rate after a healthy response, back off after signs of overload"""
+        key = self.bucket_key(url, page_type)
+        slowest, fastest = self._rate_bounds(key[1])
+        with self._lock:
+            bucket = self._get_bucket(key)
+            if status is None:
+                reason = "timeout or connection error"
+            elif status in (403, 429) or status >= 500:
+                reason = f"HTTP {status}"
+            elif status >= 400:
+                return  # e.g. a 404 says nothing about the host's load
+            else:
+                reason = self._latency_reason(key, latency)
+
+            if reason:
+                # A burst of failures from requests already in flight counts as one signal
+                now = time.monotonic()
+                if now - self._last_decrease.get(key, float('-inf')) < 1.0 / bucket.rate:
+                    return
+                self._last_decrease[key] = now
+                bucket.rate = max(slowest, bucket.rate * Config.ADAPTIVE_DECREASE_FACTOR)
+            else:
+                bucket.rate = min(fastest, bucket.rate + (fastest - slowest) / Config.ADAPTIVE_INCREASE_STEPS)
+            rate = bucket.rate
+
+            # Log backoffs, and speed-ups once they add up to 10%
+            logged = self._logged_rates.get(key)
+            if not reason and logged is not None and abs(rate - logged) < logged * 0.1:
+                return
+            self._logged_rates[key] = rate
+
+        if self.log_callback:
+            host, page_type = key
+            if reason:
+                self.log_callback(f"    Slowing down {host} ({page_type}): {reason}, "
+                                  f"delay now {1.0 / rate:.1f}s")
+            else:
+                self.log_callback(f"    Speeding up {host} ({page_type}): delay now {1.0 / rate:.1f}s")
+
+    def _latency_reason(self, key, latency):
+        # Callers hold self._lock
+        if latency is None:
+            return None
+        recent, usual = self._latency.get(key, (latency, latency))
+        recent += (latency - recent) * 0.3
+        usual += (latency - usual) * 0.05
+        self._latency[key] = (recent, usual)
+        if recent > usual * Config.ADAPTIVE_LATENCY_FACTOR and recent > Config.ADAPTIVE_MIN_SLOW_LATENCY:
+            return f"latency up to {recent:.1f}s from {usual:.1f}s"
+        return None
+
+
+class SharedRateLimiter(HostRateLimiter):
+    """HostRateLimiter whose buckets live in a SQLite file shared by several processes.
+
+    Every worker pointing at the same file draws from the same per-host budgets, so
+    adding workers adds parallelism without raising the request rate to any host.
+    Bucket times are wall-clock, so workers on different machines need synced clocks.
+    """
+
+    shared_rates = False  # Whether bucket rates come from the file instead of the local budgets
+
+    def __init__(self, path, budgets, bursts=None, yellowpages_host=None):
+        super().__init__(budgets, bursts, yellowpages_host)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                host TEXT NOT NULL,
+                page_type TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                rate REAL,
+                PRIMARY KEY (host, page_type)
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(rate_buckets)")}
+        if 'rate' not in columns:
+            self._conn.execute("ALTER TABLE rate_buckets ADD COLUMN rate REAL")
+
+    def reserve(self, url, page_type):
+        """Reserve a request slot in the shared bucket and return the wait in seconds (with jitter)"""
+        host, page_type = self.bucket_key(url, page_type)
+        bucket = self._new_bucket(page_type)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front so reservations never interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated, rate FROM rate_buckets WHERE host = ? AND page_type = ?",
+                    (host, page_type)
+                ).fetchone()
+                now = time.time()
+                if row is not None:
+                    bucket.tokens, bucket.updated = row[0], min(row[1], now)
+                    if self.shared_rates and row[2]:
+                        bucket.rate = row[2]
+                else:
+                    bucket.updated = now
+                wait = bucket.reserve(now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (host, page_type, tokens, updated, rate) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (host, page_type, bucket.tokens, bucket.updated, bucket.rate)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._jitter(page_type, wait)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedAdaptiveRateLimiter(SharedRateLimiter, AdaptiveRateLimiter):
+    """SharedRateLimiter whose rates follow the responses seen by every worker (AIMD).
+
+    Each worker applies its observations to the rate stored in the shared file, so one
+    worker's 429 slows down all of them. Concurrent updates may occasionally overwrite
+    each other, which only loses a single step of the controller.
+    """
+
+    shared_rates = True
+
+    def __init__(self, path, budgets, bursts=None, yellowpages_host=None, log_callback=None):
+        super().__init__(path, budgets, bursts, yellowpages_host)
+        self.log_callback = log_callback
+
+    def observe(self, url, page_type, status=None, latency=None):
+        """Adjust the host's shared rate after a response"""
+        key = self.bucket_key(url, page_type)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rate FROM rate_buckets WHERE host = ? AND page_type = ?", key
+            ).fetchone()
+            if row is not None and row[0]:
+                self._get_bucket(key).rate = row[0]
+        super().observe(url, page_type, status, latency)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rate_buckets SET rate = ? WHERE host = ? AND page_type = ?",
+                (self._get_bucket(key).rate,) + key
+            )
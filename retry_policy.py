@@ -0,0 +1,137 @@
+"""Retry policy: jittered backoff, Retry-After, a global retry budget and per-host circuit breakers"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from config import Config
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), None if absent or invalid"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryBudget:
+    """Retries allowed across all requests: each retry spends a token, each success earns a fraction of one.
+
+    When a host or the network is failing everywhere, the budget runs dry and requests
+    fail on their first error instead of multiplying the load with retries.
+    """
+
+    def __init__(self, initial=None, ratio=None, maximum=None):
+        self.ratio = Config.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.maximum = maximum or Config.RETRY_BUDGET_MAX
+        self.tokens = min(self.maximum, Config.RETRY_BUDGET_INITIAL if initial is None else initial)
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend a token for a retry, returning False when the budget is exhausted"""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After threshold consecutive failures a host's circuit opens and requests to it are
+    refused for cooldown seconds. Then a single probe request is let through: success
+    closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold=None, cooldown=None):
+        self.threshold = threshold or Config.CIRCUIT_BREAKER_THRESHOLD
+        self.cooldown = Config.CIRCUIT_BREAKER_COOLDOWN if cooldown is None else cooldown
+        self._hosts = {}  # host -> [consecutive failures, opened at (or None), probe started at (or None)]
+        self._lock = threading.Lock()
+
+    def check(self, host):
+        """Seconds until a request to host may be sent; 0 means send it now"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return 0.0
+            remaining = state[1] + self.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining
+            now = time.monotonic()
+            if state[2] is not None and now - state[2] < self.cooldown:
+                return 1.0  # Another request is probing the host, check back shortly
+            state[2] = now
+            return 0.0
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host):
+        """Count a failure, returning True if it opened the host's circuit"""
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, None, None])
+            state[0] += 1
+            if state[2] is not None or (state[1] is None and state[0] >= self.threshold):
+                state[1] = time.monotonic()
+                state[2] = None
+                return True
+            return False
+
+    def open_hosts(self):
+        """Hosts whose circuit is currently open"""
+        now = time.monotonic()
+        with self._lock:
+            return sorted(host for host, state in self._hosts.items()
+                          if state[1] is not None and now - state[1] < self.cooldown)
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a failed request"""
+
+    def __init__(self, base_delay=None, max_delay=None, max_retry_after=None, budget=None, breaker=None):
+        self.base_delay = Config.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.max_retry_after = Config.RETRY_AFTER_MAX if max_retry_after is None else max_retry_after
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+
+    def record_success(self, host):
+        self.budget.record_success()
+        self.breaker.record_success(host)
+
+    def record_failure(self, host):
+        """Count a failure against the host, returning True if it opened the host's circuit"""
+        return self.breaker.record_failure(host)
+
+    def retry_delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt + 1, or None if the request shouldn't be retried.
+
+        A server's Retry-After is honoured up to max_retry_after; otherwise the wait is
+        exponential backoff with full jitter, so clients that failed together don't
+        retry together.
+        """
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        if not self.budget.withdraw():
+            return None
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -1,23 +1,45 @@
 """Core scraping functionality"""
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import time
 import random
-import re
+import html
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 from config import Config
+from rate_limiter import AdaptiveRateLimiter, HostRateLimiter
+from retry_policy import RetryPolicy, parse_retry_after
+from enrichment import WebsiteEnricher
+from html_parsing import declared_encoding, header_encoding, parse_html, resolve_parser_backend
+from http_cache import CachedResponse, ResponseCache
+from contact_cache import ContactCache
+from listing_index import ListingIndex, content_hash
+from checkpoint import RunJournal
+from data_handler import ScrapingSummary
+from extractors import (ContactScanner, EMAIL_RE, SocialMatcher, extract_listing_urls_fast,
+                        extract_search_totals, is_valid_email)
 
 
 class YellowPagesScraper:
-    def __init__(self, progress_callback=None, log_callback=None, delay_settings=None):
+    def __init__(self, progress_callback=None, log_callback=None, delay_settings=None, cache_path=None,
+                 contact_cache_path=None, listing_index_path=None):
         self.headers = Config.HEADERS
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.progress_callback = progress_callback
         self.log_callback = log_callback
         self.stop_requested = False
         
+        # Keep-alive sessions, one per host
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        
+        # URL whose rate slot the calling thread already holds (see run_with_reserved_slot)
+        self._reserved_slot = threading.local()
+        
         # Use custom delay settings or defaults
         if delay_settings:
             self.SEARCH_PAGE_MIN_DELAY = delay_settings.get('search_min', Config.DEFAULT_SEARCH_PAGE_MIN_DELAY)
@@ -32,6 +54,7 @@ class YellowPagesScraper:
             self.MAX_WEBSITE_RETRIES = delay_settings.get('website_retries', Config.DEFAULT_MAX_WEBSITE_RETRIES)
             self.PAGE_LOAD_TIMEOUT = delay_settings.get('page_timeout', Config.DEFAULT_PAGE_LOAD_TIMEOUT)
             self.MAX_PAGE_RETRIES = delay_settings.get('page_retries', Config.DEFAULT_MAX_PAGE_RETRIES)
+            self.ADAPTIVE_DELAYS = delay_settings.get('adaptive', Config.ADAPTIVE_DELAYS)
         else:
             self.SEARCH_PAGE_MIN_DELAY = Config.DEFAULT_SEARCH_PAGE_MIN_DELAY
             self.SEARCH_PAGE_MAX_DELAY = Config.DEFAULT_SEARCH_PAGE_MAX_DELAY
@@ -45,11 +68,53 @@ class YellowPagesScraper:
             self.MAX_WEBSITE_RETRIES = Config.DEFAULT_MAX_WEBSITE_RETRIES
             self.PAGE_LOAD_TIMEOUT = Config.DEFAULT_PAGE_LOAD_TIMEOUT
             self.MAX_PAGE_RETRIES = Config.DEFAULT_MAX_PAGE_RETRIES
+            self.ADAPTIVE_DELAYS = Config.ADAPTIVE_DELAYS
         
         # Configuration
         self.BASE_URL = Config.BASE_URL
         self.EMPTY_PAGE_THRESHOLD = Config.EMPTY_PAGE_THRESHOLD
         self.SOCIAL_DOMAINS = Config.SOCIAL_DOMAINS
+        self.social_matcher = SocialMatcher(self.SOCIAL_DOMAINS, Config.SOCIAL_DOMAIN_ALIASES)
+        self.prefetch_search_pages = Config.PREFETCH_SEARCH_PAGES
+        self.predict_last_page = Config.PREDICT_LAST_PAGE
+        self.enrichment_workers = Config.ENRICHMENT_WORKERS
+        self.html_parser = resolve_parser_backend(Config.HTML_PARSER)
+        
+        # Optional persistent response cache
+        cache_path = cache_path or Config.RESPONSE_CACHE_PATH
+        self.response_cache = ResponseCache(cache_path) if cache_path else None
+        
+        # Website contacts by site, kept for this scraper and optionally on disk
+        self.contact_cache = None
+        if Config.CONTACT_CACHE_ENABLED:
+            self.contact_cache = ContactCache(contact_cache_path or Config.CONTACT_CACHE_PATH)
+        
+        # Index of scraped listings (URL -> last scraped time, content hash, record)
+        listing_index_path = listing_index_path or Config.LISTING_INDEX_PATH
+        self.listing_index = ListingIndex(listing_index_path) if listing_index_path else None
+        self._listing_hashes = {}
+        
+        # Journal and output sink of the current run
+        self.journal = None
+        self.sink = None
+        self.listings_scraped = 0
+        self.summary = ScrapingSummary()
+        
+        # Jittered backoff, Retry-After, a global retry budget and per-host circuit breakers
+        self.retry_policy = RetryPolicy()
+        
+        # Per-host rate budgets built from the delay settings, fixed or adapting to the responses
+        budgets = {
+            'search': (self.SEARCH_PAGE_MIN_DELAY, self.SEARCH_PAGE_MAX_DELAY),
+            'listing': (self.LISTING_PAGE_MIN_DELAY, self.LISTING_PAGE_MAX_DELAY),
+            'website': (self.WEBSITE_MIN_DELAY, self.WEBSITE_MAX_DELAY)
+        }
+        yellowpages_host = urlparse(self.BASE_URL).netloc.lower()
+        if self.ADAPTIVE_DELAYS:
+            self.rate_limiter = AdaptiveRateLimiter(budgets, Config.RATE_LIMIT_BURSTS, yellowpages_host,
+                                                    log_callback=self.log_message)
+        else:
+            self.rate_limiter = HostRateLimiter(budgets, Config.RATE_LIMIT_BURSTS, yellowpages_host)
     
     def clean_text(self, text):
         """Clean and normalize text"""
@@ -74,61 +139,236 @@ class YellowPagesScraper:
             self.log_callback(message)
         print(message)
 
-    def scrape_page_with_retry(self, url, timeout=None, max_retries=None):
+    def get_session(self, url):
+        """Get the pooled keep-alive session for a URL.
+
+        yellowpages.ca gets a session of its own; business websites share one session,
+        whose pool_connections bounds how many per-host pools (and their sockets) stay
+        open, least recently used hosts being dropped first.
+        """
+        host = urlparse(url).netloc.lower()
+        key = 'yellowpages' if host == urlparse(self.BASE_URL).netloc.lower() else 'websites'
+        with self._sessions_lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(
+                    pool_connections=Config.POOL_CONNECTIONS,
+                    pool_maxsize=Config.POOL_MAXSIZE,
+                    pool_block=Config.POOL_BLOCK
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[key] = session
+            return session
+
+    def close_sessions(self):
+        """Close all pooled sessions and their connections"""
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+    def wait_for_rate_limit(self, url, page_type):
+        """Wait until the rate budget of the URL's host allows another request"""
+        if getattr(self._reserved_slot, 'url', None) == url:
+            # The caller already waited for this request's slot
+            self._reserved_slot.url = None
+            return
+        wait = self.rate_limiter.reserve(url, page_type)
+        if wait > 0:
+            self.log_message(f"    Waiting {wait:.1f} seconds before requesting {page_type} page...")
+            time.sleep(wait)
+
+    def run_with_reserved_slot(self, url, func, *args):
+        """Call func on this thread, letting its first request to url skip the rate limit wait.
+
+        Used when the caller has already waited for url's rate slot itself, so the wait
+        doesn't happen while the caller holds other resources.
+        """
+        self._reserved_slot.url = url
+        try:
+            return func(*args)
+        finally:
+            self._reserved_slot.url = None
+
+    def scrape_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None):
         """Scrape a single page with retry logic and error handling"""
+        response = self.fetch_page_with_retry(url, timeout=timeout, max_retries=max_retries, page_type=page_type)
+        if response is None:
+            return None
+        try:
+            return parse_html(response, self.html_parser, page_type)
+        except Exception as e:
+            self.log_message(f"    Error parsing {url}: {str(e)}")
+            return None
+
+    def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+        """Fetch a single page with retry logic and error handling, returning the response
+
+        When page_type ('search', 'listing' or 'website') is given, every attempt
+        waits for the rate budget of the URL's host first. With stream=True the body
+        is not downloaded yet and the caller must close the response.
+        """
         if timeout is None:
             timeout = self.PAGE_LOAD_TIMEOUT
         if max_retries is None:
             max_retries = self.MAX_PAGE_RETRIES
+        
+        # Answer from the response cache when possible, revalidate stale entries
+        cached = None
+        request_headers = None
+        if self.response_cache:
+            cached, is_fresh = self.response_cache.lookup(url, page_type)
+            if is_fresh:
+                self.log_message(f"    Cache hit: {url}")
+                return cached
+            if cached is not None:
+                request_headers = ResponseCache.conditional_headers(cached) or None
             
+        host = urlparse(url).netloc.lower()
         for attempt in range(max_retries):
+            if not self.wait_for_circuit(url, host, page_type):
+                return None
+            if page_type:
+                self.wait_for_rate_limit(url, page_type)
+            # Sessions are closed once a stop is requested, don't reopen them
+            if self.stop_requested and (attempt > 0 or page_type):
+                return None
+            retry_after = None
             try:
                 self.log_message(f"    Attempting to load: {url} (Attempt {attempt + 1}/{max_retries})")
                 
-                response = requests.get(url, headers=self.headers, timeout=timeout)
+                started = time.monotonic()
+                response = self.get_session(url).get(url, timeout=timeout, stream=stream, headers=request_headers)
+                if page_type:
+                    self.rate_limiter.observe(url, page_type, response.status_code, time.monotonic() - started)
                 
-                if response.status_code == 404:
+                if response.status_code == 304 and cached is not None:
+                    response.close()
+                    self.retry_policy.record_success(host)
+                    self.response_cache.mark_revalidated(url)
+                    self.log_message(f"    Not modified, using cached copy: {url}")
+                    return cached
+                elif response.status_code == 404:
+                    response.close()
+                    self.retry_policy.record_success(host)
                     self.log_message(f"    404 Not Found: {url}")
                     return None
                 elif response.status_code == 403:
+                    response.close()
+                    self.retry_policy.breaker.record_success(host)  # The host is up, it just refused
                     self.log_message(f"    403 Forbidden: {url}")
                     return None
-                elif response.status_code >= 500:
-                    self.log_message(f"    Server error {response.status_code}: {url}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)  # Exponential backoff
+                elif response.status_code == 429 or response.status_code >= 500:
+                    response.close()
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if response.status_code == 429:
+                        self.log_message(f"    429 Too Many Requests: {url}")
+                    else:
+                        self.log_message(f"    Server error {response.status_code}: {url}")
+                        self.record_host_failure(host)
+                    if self.backoff_before_retry(attempt, max_retries, retry_after):
                         continue
                     return None
                 
-                response.raise_for_status()
+                if response.status_code >= 400:
+                    response.close()
+                    response.raise_for_status()
+                self.retry_policy.record_success(host)
                 
                 # Wait for page to "load" (simulate loading time)
                 page_load_delay = self.get_random_delay('page_load')
                 time.sleep(page_load_delay)
                 
-                return BeautifulSoup(response.content, 'html.parser')
+                if self.response_cache:
+                    return self._store_in_cache(url, page_type, response, stream)
+                return response
                 
             except requests.exceptions.Timeout:
                 self.log_message(f"    Timeout error for {url}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                return None
+                if page_type:
+                    self.rate_limiter.observe(url, page_type)
+                self.record_host_failure(host)
             except requests.exceptions.ConnectionError:
                 self.log_message(f"    Connection error for {url}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                return None
+                if page_type:
+                    self.rate_limiter.observe(url, page_type)
+                self.record_host_failure(host)
             except Exception as e:
                 self.log_message(f"    Error scraping {url}: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+            if not self.backoff_before_retry(attempt, max_retries):
                 return None
         
         return None
 
+    def wait_for_circuit(self, url, host, page_type):
+        """Check the host's circuit breaker, returning False if the request should fail fast.
+
+        Business websites fail fast while their circuit is open. Yellow Pages pages are
+        what the run is for, so those wait out the cool-down instead.
+        """
+        remaining = self.retry_policy.breaker.check(host)
+        if remaining <= 0:
+            return True
+        if page_type not in Config.CIRCUIT_BREAKER_WAIT_PAGE_TYPES:
+            self.log_message(f"    Skipping {url}: {host} is failing, retrying it in {remaining:.0f}s")
+            return False
+        self.log_message(f"    {host} is failing, waiting {remaining:.0f} seconds before trying it again...")
+        while remaining > 0 and not self.stop_requested:
+            time.sleep(min(remaining, 1.0))
+            remaining = self.retry_policy.breaker.check(host)
+        return not self.stop_requested
+
+    def record_host_failure(self, host):
+        """Count a failed request against the host's circuit breaker"""
+        if self.retry_policy.record_failure(host):
+            self.log_message(f"    {host} keeps failing, pausing requests to it for "
+                             f"{self.retry_policy.breaker.cooldown:.0f} seconds")
+
+    def backoff_before_retry(self, attempt, max_retries, retry_after=None):
+        """Sleep before the next attempt, returning False if the request shouldn't be retried"""
+        if attempt >= max_retries - 1 or self.stop_requested:
+            return False
+        delay = self.retry_policy.retry_delay(attempt, retry_after)
+        if delay is None:
+            if retry_after is not None and retry_after > self.retry_policy.max_retry_after:
+                self.log_message(f"    Not retrying: server asked to wait {retry_after:.0f} seconds")
+            else:
+                self.log_message("    Not retrying: retry budget exhausted")
+            return False
+        if delay > 0:
+            self.log_message(f"    Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+        return True
+
+    def _store_in_cache(self, url, page_type, response, stream):
+        """Store a fetched response in the cache and return a response to use instead"""
+        self.response_cache.record_miss()
+        if not stream:
+            self.response_cache.store(url, page_type, response.content, response.headers)
+            return response
+        
+        # Streamed bodies are read up to the website size cap so the cached copy stays bounded
+        chunks = []
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size=Config.WEBSITE_SCAN_CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= Config.WEBSITE_MAX_BYTES:
+                    break
+        finally:
+            response.close()
+        content = b''.join(chunks)
+        self.response_cache.store(url, page_type, content, response.headers)
+        return CachedResponse(url, content, response.headers, response.status_code, from_cache=False)
+
     def extract_listing_urls_from_search_results(self, soup):
         """Extract ONLY listing URLs from search results page"""
         listing_urls = []
@@ -152,14 +392,24 @@ class YellowPagesScraper:
         """Extract email addresses from text"""
         if not text:
             return []
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
         # Filter out common false positives
-        filtered_emails = []
-        for email in emails:
-            if not any(skip in email.lower() for skip in ['example.com', 'test.com', 'dummy.com']):
-                filtered_emails.append(email)
-        return list(set(filtered_emails))
+        return list(set(email for email in EMAIL_RE.findall(text) if is_valid_email(email)))
+
+    def add_social_link(self, social_links, original_href):
+        """Add an href to social_links under its platform if it is a social media link"""
+        platform = self.social_matcher.platform_for(original_href)
+        if not platform:
+            return
+        
+        if platform not in social_links:
+            social_links[platform] = []
+        
+        # Clean the URL
+        full_url = self.social_matcher.absolute_url(original_href)
+        
+        # Avoid duplicates
+        if full_url not in social_links[platform]:
+            social_links[platform].append(full_url)
 
     def extract_social_links(self, soup):
         """Extract social media links from a webpage"""
@@ -170,28 +420,31 @@ class YellowPagesScraper:
         
         # Find all links
         for link in soup.find_all('a', href=True):
-            href = link['href'].lower()
-            for domain in self.SOCIAL_DOMAINS:
-                if domain in href:
-                    platform = domain.split('.')[0]
-                    if platform == 'x':
-                        platform = 'twitter'
-                    elif platform == 'threads':
-                        platform = 'threads'
-                    
-                    if platform not in social_links:
-                        social_links[platform] = []
-                    
-                    # Clean the URL
-                    original_href = link['href']
-                    full_url = original_href if original_href.startswith(('http://', 'https://')) else f"https://{original_href}"
-                    
-                    # Avoid duplicates
-                    if full_url not in social_links[platform]:
-                        social_links[platform].append(full_url)
+            self.add_social_link(social_links, link['href'])
         
         return social_links
 
+    def scan_website_response(self, response):
+        """Stream a website body (up to WEBSITE_MAX_BYTES) through a single-pass contact scanner"""
+        # Only the header is checked here: a <meta> charset is found in the first chunk without reading the body
+        scanner = ContactScanner(header_encoding(response), is_social_candidate=self.social_matcher.is_social)
+        try:
+            for chunk in response.iter_content(chunk_size=Config.WEBSITE_SCAN_CHUNK_SIZE):
+                scanner.feed(chunk)
+                if scanner.bytes_scanned >= Config.WEBSITE_MAX_BYTES:
+                    break
+        except requests.exceptions.RequestException as e:
+            # Keep whatever was found before the connection dropped
+            self.log_message(f"    Error reading website body: {str(e)}")
+        finally:
+            response.close()
+        scanner.close()
+        
+        social_links = {}
+        for href in scanner.social_hrefs:
+            self.add_social_link(social_links, html.unescape(href))
+        return list(scanner.emails), social_links
+
     def scrape_website_for_contacts(self, website_url):
         """Scrape website for social media links and emails"""
         if not website_url:
@@ -201,30 +454,35 @@ class YellowPagesScraper:
         if not website_url.startswith(('http://', 'https://')):
             website_url = f"https://{website_url}"
         
+        # Chains and franchises share websites: scrape each site once per run
+        if self.contact_cache:
+            return self.contact_cache.get_or_fetch(website_url, self._scrape_website_uncached)
+        return self._scrape_website_uncached(website_url)[0]
+
+    def _scrape_website_uncached(self, website_url):
+        """Scrape a website, returning (contacts, loaded)"""
         self.log_message(f"    Scraping website: {website_url}")
         
-        soup = self.scrape_page_with_retry(website_url, timeout=self.WEBSITE_TIMEOUT, max_retries=self.MAX_WEBSITE_RETRIES)
-        if not soup:
+        response = self.fetch_page_with_retry(website_url, timeout=self.WEBSITE_TIMEOUT,
+                                              max_retries=self.MAX_WEBSITE_RETRIES, page_type='website',
+                                              stream=True)
+        if response is None:
             self.log_message(f"    Failed to load website: {website_url}")
-            return {'emails': [], 'social_links': {}}
-        
-        # Extract emails from page text
-        page_text = soup.get_text()
-        emails = self.extract_emails_from_text(page_text)
+            return {'emails': [], 'social_links': {}}, False
         
-        # Extract social media links
-        social_links = self.extract_social_links(soup)
+        # Extract emails (page text and mailto: links) and social media links in one pass
+        emails, social_links = self.scan_website_response(response)
         
         self.log_message(f"    Found {len(emails)} emails and {len(social_links)} social platforms")
         
         return {
             'emails': emails,
             'social_links': social_links
-        }
+        }, True
 
-    def extract_listing_data_from_individual_page(self, listing_url, page_num):
-        """Extract complete data from individual listing page"""
-        data = {
+    def new_listing_record(self, listing_url, page_num):
+        """Create an empty listing record"""
+        return {
             "name": None,
             "phone": None,
             "website": None,
@@ -240,153 +498,235 @@ class YellowPagesScraper:
             "scraped_at": datetime.now().isoformat(),
             "phone_numbers": [],
             "websites": [],
-                        "business_hours": None,
+            "business_hours": None,
             "emails": [],
             "social_links": {},
             "scraping_status": "success"
         }
+
+    def parse_listing_page(self, soup, data):
+        """Fill a listing record from a parsed individual listing page"""
+        # Extract business name
+        name_elem = soup.find('span', class_='merchantName')
+        if name_elem:
+            data['name'] = self.clean_text(name_elem.text)
         
-        try:
-            self.log_message(f"  Scraping listing: {listing_url}")
-            
-            soup = self.scrape_page_with_retry(listing_url)
-            if not soup:
-                data['scraping_status'] = "failed_to_load"
-                return data
+        # Extract address
+        address_elem = soup.find('div', {'itemprop': 'address'})
+        if address_elem:
+            street_elem = address_elem.find('span', {'itemprop': 'streetAddress'})
+            city_elem = address_elem.find('span', {'itemprop': 'addressLocality'})
+            region_elem = address_elem.find('span', {'itemprop': 'addressRegion'})
+            postal_elem = address_elem.find('span', {'itemprop': 'postalCode'})
             
-            # Extract business name
-            name_elem = soup.find('span', class_='merchantName')
-            if name_elem:
-                data['name'] = self.clean_text(name_elem.text)
-            
-            # Extract address
-            address_elem = soup.find('div', {'itemprop': 'address'})
-            if address_elem:
-                street_elem = address_elem.find('span', {'itemprop': 'streetAddress'})
-                city_elem = address_elem.find('span', {'itemprop': 'addressLocality'})
-                region_elem = address_elem.find('span', {'itemprop': 'addressRegion'})
-                postal_elem = address_elem.find('span', {'itemprop': 'postalCode'})
-                
-                if street_elem:
-                    data['address']['street'] = self.clean_text(street_elem.text)
-                if city_elem:
-                    data['address']['city'] = self.clean_text(city_elem.text)
-                if region_elem:
-                    data['address']['region'] = self.clean_text(region_elem.text)
-                if postal_elem:
-                    data['address']['postal_code'] = self.clean_text(postal_elem.text)
-            
-            # Extract phone numbers
-            phone_section = soup.find('li', class_='mlr__item--phone')
-            if phone_section:
-                phone_submenu = phone_section.find('ul', class_='mlr__submenu')
-                if phone_submenu:
-                    for phone_item in phone_submenu.find_all('li'):
-                        phone_span = phone_item.find('span', class_='mlr__sub-text')
-                        label_span = phone_item.find('span', class_='mlr__label')
-                        if phone_span and label_span:
-                            phone_number = self.clean_text(phone_span.text)
-                            phone_type = self.clean_text(label_span.text)
-                            data['phone_numbers'].append({
-                                'number': phone_number,
-                                'type': phone_type
-                            })
-                            # Set primary phone
-                            if phone_type and phone_type.lower() == 'primary' and not data['phone']:
-                                data['phone'] = phone_number
-            
-            # Extract website URLs
-            website_section = soup.find('li', class_='mlr__item--website')
-            if website_section:
-                website_submenu = website_section.find('ul', class_='mlr__submenu')
-                if website_submenu:
-                    for website_item in website_submenu.find_all('li'):
-                        website_link = website_item.find('a')
-                        if website_link and website_link.get('href'):
-                            href = website_link['href']
-                            # Extract the actual URL from the redirect
-                            if 'redirect=' in href:
-                                actual_url = href.split('redirect=')[1].split('&')[0]
-                                from urllib.parse import unquote
-                                actual_url = unquote(actual_url)
-                                data['websites'].append(actual_url)
-                        else:
-                            # For print items, extract from text
-                            website_span = website_item.find('span', class_='mlr__sub-text')
-                            if website_span:
-                                website_text = self.clean_text(website_span.text)
-                                if website_text:
-                                    if not website_text.startswith(('http://', 'https://')):
-                                        website_text = f"https://{website_text}"
-                                    data['websites'].append(website_text)
+            if street_elem:
+                data['address']['street'] = self.clean_text(street_elem.text)
+            if city_elem:
+                data['address']['city'] = self.clean_text(city_elem.text)
+            if region_elem:
+                data['address']['region'] = self.clean_text(region_elem.text)
+            if postal_elem:
+                data['address']['postal_code'] = self.clean_text(postal_elem.text)
+        
+        # Extract phone numbers
+        phone_section = soup.find('li', class_='mlr__item--phone')
+        if phone_section:
+            phone_submenu = phone_section.find('ul', class_='mlr__submenu')
+            if phone_submenu:
+                for phone_item in phone_submenu.find_all('li'):
+                    phone_span = phone_item.find('span', class_='mlr__sub-text')
+                    label_span = phone_item.find('span', class_='mlr__label')
+                    if phone_span and label_span:
+                        phone_number = self.clean_text(phone_span.text)
+                        phone_type = self.clean_text(label_span.text)
+                        data['phone_numbers'].append({
+                            'number': phone_number,
+                            'type': phone_type
+                        })
+                        # Set primary phone
+                        if phone_type and phone_type.lower() == 'primary' and not data['phone']:
+                            data['phone'] = phone_number
+        
+        # Extract website URLs
+        website_section = soup.find('li', class_='mlr__item--website')
+        if website_section:
+            website_submenu = website_section.find('ul', class_='mlr__submenu')
+            if website_submenu:
+                for website_item in website_submenu.find_all('li'):
+                    website_link = website_item.find('a')
+                    if website_link and website_link.get('href'):
+                        href = website_link['href']
+                        # Extract the actual URL from the redirect
+                        if 'redirect=' in href:
+                            actual_url = href.split('redirect=')[1].split('&')[0]
+                            from urllib.parse import unquote
+                            actual_url = unquote(actual_url)
+                            data['websites'].append(actual_url)
+                    else:
+                        # For print items, extract from text
+                        website_span = website_item.find('span', class_='mlr__sub-text')
+                        if website_span:
+                            website_text = self.clean_text(website_span.text)
+                            if website_text:
+                                if not website_text.startswith(('http://', 'https://')):
+                                    website_text = f"https://{website_text}"
+                                data['websites'].append(website_text)
+        
+        # Remove duplicates from websites
+        data['websites'] = list(dict.fromkeys(data['websites']))
+        
+        # Set primary website
+        if data['websites'] and not data['website']:
+            data['website'] = data['websites'][0]
+        
+        # Extract business hours
+        hours_link = soup.find('a', class_='merchant__status-text')
+        if hours_link:
+            data['business_hours'] = self.clean_text(hours_link.text)
+        
+        # Extract categories from breadcrumbs or other elements
+        breadcrumbs = soup.find_all('a', href=True)
+        for breadcrumb in breadcrumbs:
+            if '/search/' in breadcrumb.get('href', ''):
+                category_text = self.clean_text(breadcrumb.text)
+                if category_text and category_text not in data['categories']:
+                    data['categories'].append(category_text)
+
+    def merge_contact_info(self, data, contact_infos):
+        """Merge website contact results into a listing record"""
+        all_emails = []
+        all_social_links = {}
+        
+        for contact_info in contact_infos:
+            # Merge emails
+            all_emails.extend(contact_info.get('emails', []))
             
-            # Remove duplicates from websites
-            data['websites'] = list(set(data['websites']))
+            # Merge social links
+            for platform, links in contact_info.get('social_links', {}).items():
+                if platform not in all_social_links:
+                    all_social_links[platform] = []
+                all_social_links[platform].extend(links)
+        
+        # Remove duplicates
+        data['emails'] = list(set(all_emails))
+        for platform in all_social_links:
+            all_social_links[platform] = list(set(all_social_links[platform]))
+        data['social_links'] = all_social_links
+
+    def scrape_listing_websites(self, data):
+        """Scrape the websites of a listing for social media and emails"""
+        if not data['websites'] or self.stop_requested:
+            return
+        
+        contact_infos = []
+        for website in data['websites']:
+            if self.stop_requested:
+                break
             
-            # Set primary website
-            if data['websites'] and not data['website']:
-                data['website'] = data['websites'][0]
+            contact_infos.append(self.scrape_website_for_contacts(website))
+        
+        self.merge_contact_info(data, contact_infos)
+
+    def reuse_fresh_listing(self, listing_url, page_num, min_age=None):
+        """Return the indexed record of a listing scraped less than min_age hours ago, if any"""
+        if not self.listing_index or not min_age:
+            return None
+        stored = self.listing_index.get_fresh(listing_url, min_age * 3600)
+        if stored is None:
+            return None
+        self.log_message(f"  Reusing listing scraped within the last {min_age:g} hours: {listing_url}")
+        return dict(stored, page_number=page_num)
+
+    def fetch_listing_page(self, listing_url, page_num):
+        """Fetch and parse a listing page, returning (data, soup); soup is None if it failed to load"""
+        data = self.new_listing_record(listing_url, page_num)
+        
+        response = self.fetch_page_with_retry(listing_url, page_type='listing')
+        if response is None:
+            data['scraping_status'] = "failed_to_load"
+            return data, None
+        
+        return data, parse_html(response, self.html_parser, 'listing')
+
+    def reuse_unchanged_listing(self, data):
+        """Return the indexed record of a just-parsed listing whose fields haven't changed, or None.
+
+        Otherwise the fields' hash is kept so finish_record can index the new record.
+        """
+        if not self.listing_index:
+            return None
+        listing_url = data['url']
+        page_hash = content_hash(data)
+        stored = self.listing_index.get_unchanged(listing_url, page_hash)
+        if stored is not None and stored.get('scraping_status') == 'success':
+            self.listing_index.touch(listing_url)
+            self.log_message(f"  Listing unchanged since it was last scraped, reusing: {listing_url}")
+            return dict(stored, page_number=data['page_number'])
+        self._listing_hashes[listing_url] = page_hash
+        return None
+
+    def extract_listing_data_from_individual_page(self, listing_url, page_num, scrape_websites=True):
+        """Extract complete data from individual listing page
+
+        With scrape_websites=False the emails/social_links are left empty so a
+        separate enrichment stage can fill them in later.
+        """
+        return self._extract_listing(listing_url, page_num, scrape_websites)[0]
+
+    def _extract_listing(self, listing_url, page_num, scrape_websites=True, min_age=None):
+        """Extract a listing, returning (data, complete); complete is False while websites are pending"""
+        reused = self.reuse_fresh_listing(listing_url, page_num, min_age)
+        if reused is not None:
+            return reused, True
+        
+        data = self.new_listing_record(listing_url, page_num)
+        
+        try:
+            self.log_message(f"  Scraping listing: {listing_url}")
             
-            # Extract business hours
-            hours_link = soup.find('a', class_='merchant__status-text')
-            if hours_link:
-                data['business_hours'] = self.clean_text(hours_link.text)
+            data, soup = self.fetch_listing_page(listing_url, page_num)
+            if not soup:
+                return data, True
             
-            # Extract categories from breadcrumbs or other elements
-            breadcrumbs = soup.find_all('a', href=True)
-            for breadcrumb in breadcrumbs:
-                if '/search/' in breadcrumb.get('href', ''):
-                    category_text = self.clean_text(breadcrumb.text)
-                    if category_text and category_text not in data['categories']:
-                        data['categories'].append(category_text)
+            self.parse_listing_page(soup, data)
+            unchanged = self.reuse_unchanged_listing(data)
+            if unchanged is not None:
+                return unchanged, True
             
             # Now scrape websites for social media and emails
-            if data['websites'] and not self.stop_requested:
-                all_emails = []
-                all_social_links = {}
-                
-                for website in data['websites']:
-                    if self.stop_requested:
-                        break
-                    
-                    # Add delay before visiting website
-                    delay = self.get_random_delay('website')
-                    self.log_message(f"    Waiting {delay:.1f} seconds before visiting website...")
-                    time.sleep(delay)
-                    
-                    contact_info = self.scrape_website_for_contacts(website)
-                    
-                    # Merge emails
-                    all_emails.extend(contact_info.get('emails', []))
-                    
-                    # Merge social links
-                    for platform, links in contact_info.get('social_links', {}).items():
-                        if platform not in all_social_links:
-                            all_social_links[platform] = []
-                        all_social_links[platform].extend(links)
-                
-                # Remove duplicates
-                data['emails'] = list(set(all_emails))
-                for platform in all_social_links:
-                    all_social_links[platform] = list(set(all_social_links[platform]))
-                data['social_links'] = all_social_links
+            if scrape_websites:
+                self.scrape_listing_websites(data)
+                return data, True
             
-            return data
+            return data, False
             
         except Exception as e:
             self.log_message(f"  Error extracting listing data: {str(e)}")
             data['scraping_status'] = f"error: {str(e)}"
-            return data
+            return data, True
 
-    def run_scraper(self, category, location, start_page=1, end_page=None):
-        """Main scraping method with start/end page support"""
-        all_data = []
-        empty_pages = 0
+    def run_scraper(self, category, location, start_page=1, end_page=None, min_age=None, checkpoint_path=None,
+                    sink=None, keep_records=True):
+        """Main scraping method with start/end page support
+
+        With min_age (hours), listings indexed within that window are reused from the
+        listing index instead of being fetched again. With checkpoint_path, progress is
+        journaled there and an interrupted run with the same parameters is resumed.
+        Finished records are written to sink as they complete; with keep_records=False
+        they are not kept in memory and an empty list is returned.
+        """
+        all_data = self.open_output(sink, keep_records)
+        journal, resume = self.open_checkpoint(checkpoint_path, category, location, start_page, end_page, min_age,
+                                               all_data)
+        if resume and resume.finished:
+            journal.close()
+            self.sink = None
+            self.log_message(f"Checkpoint {checkpoint_path} is already complete with {self.listings_scraped} listings")
+            return all_data or []
         
         # Determine page range
         if end_page is None:
             # Original behavior - scrape until empty pages
-            page = start_page
             use_empty_page_logic = True
             self.log_message(f"Starting scrape for {category} in {location} from page {start_page}...")
         else:
@@ -397,80 +737,265 @@ class YellowPagesScraper:
             else:
                 self.log_message(f"Scraping pages {start_page} to {end_page} for {category} in {location}...")
         
+        # Website contacts are scraped on their own worker pool so slow sites don't block listings
+        enricher = None
+        if self.enrichment_workers > 0:
+            enricher = WebsiteEnricher(self, workers=self.enrichment_workers,
+                                       on_complete=self.finish_record).start()
+        
+        finished = False
+        try:
+            self._scrape_pages(category, location, start_page, end_page, use_empty_page_logic, all_data,
+                               enricher, min_age, resume)
+            finished = True
+        finally:
+            if enricher:
+                self.log_message("Waiting for website enrichment to finish...")
+                enricher.join()
+            self.close_sessions()
+            self.close_checkpoint(finished)
+            self.sink = None
+        
+        self.log_message(f"Scraping complete! Found {self.listings_scraped} listings")
+        self.log_cache_stats()
+        return all_data if all_data is not None else []
+
+    def resume_scraper(self, checkpoint_path, sink=None, keep_records=True):
+        """Continue an interrupted run from its checkpoint without refetching completed work"""
+        params = RunJournal.read_run_params(checkpoint_path)
+        return self.run_scraper(params['category'], params['location'], params['start_page'], params['end_page'],
+                                params['min_age'], checkpoint_path=checkpoint_path, sink=sink,
+                                keep_records=keep_records)
+
+    def open_checkpoint(self, checkpoint_path, category, location, start_page, end_page, min_age, all_data=None):
+        """Open the run journal, returning (journal, ResumeState or None).
+
+        Listings an earlier attempt completed go to the output opened by open_output as
+        the journal is read, and are only kept in memory if all_data is a list.
+        """
+        self.journal = None
+        if not checkpoint_path:
+            return None, None
+        
+        def resumed(record):
+            self.listings_scraped += 1
+            self.summary.add(record)
+            if self.sink:
+                self.sink.write(record)
+            if all_data is not None:
+                all_data.append(record)
+        
+        params = {'category': category, 'location': location, 'start_page': start_page,
+                  'end_page': end_page, 'min_age': min_age}
+        journal = RunJournal(checkpoint_path)
+        resume = journal.open_run(params, resumed)
+        if resume.last_page is not None and not resume.finished:
+            self.log_message(f"Resuming from checkpoint: {self.listings_scraped} listings done, "
+                             f"{len(resume.pending_listings)} pending, continuing after page {resume.last_page}")
+        self.journal = journal
+        return journal, resume
+
+    def open_output(self, sink, keep_records):
+        """Set up where finished records go, returning the list that keeps them in memory (or None)"""
+        self.sink = sink
+        self.listings_scraped = 0
+        self.summary = ScrapingSummary()
+        return [] if keep_records else None
+
+    def close_checkpoint(self, finished):
+        """Close the run journal, marking it complete if the run finished without being stopped"""
+        if self.journal:
+            if finished and not self.stop_requested:
+                self.journal.finish()
+            self.journal.close()
+            self.journal = None
+
+    def fetch_search_page(self, category, location, page):
+        """Fetch a search results page and return its listing URLs (None if it failed to load)"""
+        return self.fetch_search_results(category, location, page)[0]
+
+    def fetch_search_results(self, category, location, page):
+        """Fetch a search results page, returning (listing URLs or None, its predicted last page or None)"""
+        url = self.BASE_URL.format(page=page, category=category, location=location)
+        response = self.fetch_page_with_retry(url, page_type='search')
+        if response is None:
+            return None, None
+        
+        # Fast path: pull the listing links straight out of the raw bytes
+        listing_urls = extract_listing_urls_fast(response.content, declared_encoding(response))
+        if listing_urls is None:
+            # Markup didn't match the fast path, extract only listing URLs from the parsed page
+            try:
+                soup = parse_html(response, self.html_parser, 'search')
+            except Exception as e:
+                self.log_message(f"    Error parsing {url}: {str(e)}")
+                return None, None
+            listing_urls = self.extract_listing_urls_from_search_results(soup)
+        return listing_urls, self.estimate_last_page(response.content, page, listing_urls)
+
+    def estimate_last_page(self, content, page, listing_urls):
+        """Last search results page according to a results page's pager or result count, or None"""
+        page_count, result_count = extract_search_totals(content)
+        if page_count:
+            return max(page_count, page)
+        if result_count is not None and listing_urls:
+            if result_count < len(listing_urls):
+                # This page alone shows more listings, so the count can't be the total
+                self.log_message(f"    Ignoring a result count of {result_count} on page {page}, "
+                                 f"which shows {len(listing_urls)} listings")
+                return None
+            # Never assume more listings per page than this page shows, so the estimate can't fall short
+            per_page = min(len(listing_urls), Config.SEARCH_RESULTS_PER_PAGE)
+            return max(math.ceil(result_count / per_page), page)
+        return None
+
+    def log_record_summary(self, record):
+        """Log a summary of the contact data found for a listing"""
+        emails_count = len(record.get('emails', []))
+        social_count = len(record.get('social_links', {}))
+        websites_count = len(record.get('websites', []))
+        
+        self.log_message(f"    Data summary for {record.get('name', 'Unknown')}: {emails_count} emails, "
+                         f"{social_count} social platforms, {websites_count} websites")
+
+    def finish_record(self, record):
+        """Handle a listing record whose websites have been scraped"""
+        self.log_record_summary(record)
+        self.summary.add(record)
+        
+        # Index freshly scraped listings for incremental re-scrapes
+        page_hash = self._listing_hashes.pop(record.get('url'), None)
+        if self.listing_index and page_hash and record.get('scraping_status') == 'success':
+            self.listing_index.put(record['url'], record, page_hash)
+        
+        if self.journal:
+            self.journal.record(record)
+        
+        if self.sink:
+            self.sink.write(record)
+
+    def _scrape_pages(self, category, location, start_page, end_page, use_empty_page_logic, all_data,
+                      enricher=None, min_age=None, resume=None):
+        """Scrape search pages and their listings into all_data"""
+        empty_pages = 0
         page = start_page
+        predicted = False
         
-        while not self.stop_requested:
-            # Check if we've reached the end page
-            if end_page is not None and page > end_page:
-                self.log_message(f"Reached end page {end_page}")
-                break
+        if resume and resume.last_page is not None:
+            # Finish listings that were found before the interruption, then continue after the last page
+            pending = resume.pending_listings
+            for i, (listing_url, listing_page) in enumerate(pending):
+                if self.stop_requested:
+                    break
+                self.log_message(f"  Processing pending listing {i+1}/{len(pending)}: {listing_url}")
+                self._scrape_listing(listing_url, listing_page, all_data, enricher, min_age)
+            empty_pages = resume.empty_pages
+            page = resume.last_page + 1
+        
+        # Look-ahead: page N+1 is fetched in the background while page N's listings are scraped
+        prefetcher = ThreadPoolExecutor(max_workers=1) if self.prefetch_search_pages else None
+        prefetched = None
+        
+        try:
+            while not self.stop_requested:
+                # Check if we've reached the end page
+                if end_page is not None and page > end_page:
+                    self.log_message(f"Reached end page {end_page}")
+                    break
+                    
+                self.log_message(f"Page {page}: Scraping search results...")
                 
-            url = self.BASE_URL.format(page=page, category=category, location=location)
-            self.log_message(f"Page {page}: Scraping search results...")
-            
-            soup = self.scrape_page_with_retry(url)
-            if not soup:
-                empty_pages += 1
-                self.log_message(f"Page {page}: Failed to load search results")
-            else:
-                # Extract only listing URLs from search results
-                listing_urls = self.extract_listing_urls_from_search_results(soup)
+                if prefetched is not None:
+                    try:
+                        listing_urls = prefetched.result()
+                    except Exception as e:
+                        self.log_message(f"Page {page}: Prefetch failed ({str(e)}), fetching it again...")
+                        listing_urls = self.fetch_search_page(category, location, page)
+                    prefetched = None
+                elif end_page is None and self.predict_last_page:
+                    # Plan the page range from the first results page instead of probing for empty pages
+                    listing_urls, last_page = self.fetch_search_results(category, location, page)
+                    if last_page is not None:
+                        end_page = last_page
+                        predicted = True
+                        self.log_message(f"Page {page}: Results end at page {last_page}")
+                else:
+                    listing_urls = self.fetch_search_page(category, location, page)
                 
-                if not listing_urls:
+                if listing_urls is None:
+                    # In a planned range a failed page doesn't mean the results have ended
+                    if not predicted:
+                        empty_pages += 1
+                    self.log_message(f"Page {page}: Failed to load search results")
+                elif not listing_urls:
                     empty_pages += 1
                     self.log_message(f"Page {page}: No listing URLs found")
                 else:
                     empty_pages = 0
                     self.log_message(f"Page {page}: Found {len(listing_urls)} listing URLs")
                     
-                    # Process each listing URL
-                    for i, listing_url in enumerate(listing_urls):
-                        if self.stop_requested:
-                            break
-                            
-                        self.log_message(f"  Processing listing {i+1}/{len(listing_urls)}: {listing_url}")
-                        
-                        # Add delay before visiting listing page
-                        delay = self.get_random_delay('listing')
-                        self.log_message(f"  Waiting {delay:.1f} seconds before visiting listing page...")
-                        time.sleep(delay)
-                        
-                        # Extract detailed data from individual listing page
-                        detailed_data = self.extract_listing_data_from_individual_page(listing_url, page)
+                    if prefetcher and (end_page is None or page + 1 <= end_page):
+                        self.log_message(f"Page {page + 1}: Prefetching search results in the background...")
+                        prefetched = prefetcher.submit(self.fetch_search_page, category, location, page + 1)
+                
+                if self.journal and not self.stop_requested:
+                    self.journal.page(page, listing_urls or [], empty_pages)
+                
+                # Process each listing URL
+                for i, listing_url in enumerate(listing_urls or []):
+                    if self.stop_requested:
+                        break
                         
-                        if detailed_data:
-                            all_data.append(detailed_data)
-                            self.log_message(f"  ✓ Successfully scraped: {detailed_data.get('name', 'Unknown')}")
-                            
-                            # Log summary of extracted data
-                            emails_count = len(detailed_data.get('emails', []))
-                            social_count = len(detailed_data.get('social_links', {}))
-                            websites_count = len(detailed_data.get('websites', []))
-                            
-                            self.log_message(f"    Data summary: {emails_count} emails, {social_count} social platforms, {websites_count} websites")
-                        else:
-                            self.log_message(f"  ✗ Failed to scrape listing: {listing_url}")
-            
-            # Update progress
-            if self.progress_callback:
-                self.progress_callback(page, len(all_data))
-            
-            # Stop if we hit empty page threshold (only when not using fixed range)
-            if use_empty_page_logic and empty_pages >= self.EMPTY_PAGE_THRESHOLD:
-                self.log_message(f"Stopping - {empty_pages} consecutive empty pages")
-                break
-            
-            page += 1
-            
-            # Polite delay between search result pages (except for the last page)
-            if not self.stop_requested and (end_page is None or page <= end_page):
-                delay = self.get_random_delay('search')
-                self.log_message(f"Waiting {delay:.1f} seconds before next search page...")
-                time.sleep(delay)
+                    self.log_message(f"  Processing listing {i+1}/{len(listing_urls)}: {listing_url}")
+                    self._scrape_listing(listing_url, page, all_data, enricher, min_age)
+                
+                # Update progress
+                if self.progress_callback:
+                    self.progress_callback(page, self.listings_scraped)
+                
+                # Stop if we hit empty page threshold (only when not using fixed range)
+                if use_empty_page_logic and empty_pages >= self.EMPTY_PAGE_THRESHOLD:
+                    self.log_message(f"Stopping - {empty_pages} consecutive empty pages")
+                    break
+                
+                page += 1
+        finally:
+            if prefetcher:
+                prefetcher.shutdown(wait=False, cancel_futures=True)
+
+    def _scrape_listing(self, listing_url, page, all_data, enricher=None, min_age=None):
+        """Scrape one listing into all_data (unless it's None), handing its websites to the enricher if any"""
+        # Extract detailed data from individual listing page
+        detailed_data, complete = self._extract_listing(
+            listing_url, page, scrape_websites=enricher is None, min_age=min_age
+        )
         
-        self.log_message(f"Scraping complete! Found {len(all_data)} listings")
-        return all_data
+        if detailed_data:
+            self.listings_scraped += 1
+            if all_data is not None:
+                all_data.append(detailed_data)
+            self.log_message(f"  ✓ Successfully scraped: {detailed_data.get('name', 'Unknown')}")
+            
+            # Emails and social links are filled in by the enrichment stage
+            if enricher and not complete:
+                enricher.submit(detailed_data)
+            else:
+                self.finish_record(detailed_data)
+        else:
+            self.log_message(f"  ✗ Failed to scrape listing: {listing_url}")
+
+    def log_cache_stats(self):
+        """Log response and contact cache hit/miss counters"""
+        if self.contact_cache:
+            stats = self.contact_cache.stats()
+            self.log_message(f"Website contact cache: {stats['hits']} hits, {stats['coalesced']} coalesced, "
+                             f"{stats['misses']} websites scraped")
+        if self.response_cache:
+            stats = self.response_cache.stats()
+            self.log_message(f"Response cache: {stats['hits']} hits, {stats['revalidations']} revalidated, "
+                             f"{stats['misses']} misses ({stats['size_bytes'] / 1024 / 1024:.1f} MB cached)")
 
     def stop_scraping(self):
         """Stop the scraping process"""
         self.stop_requested = True
+        self.close_sessions()
@@ -0,0 +1,209 @@
+"""Record sinks that write listings to disk as they are scraped"""
+
+import csv
+import json
+import os
+import threading
+
+from config import Config
+from data_handler import DataHandler
+
+
+class RecordSink:
+    """Destination for finished listing records.
+
+    write() may be called from several enrichment threads at once; subclasses
+    implement _write_record and are serialized by the sink's lock.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record):
+        """Write one finished record"""
+        with self._lock:
+            self._write_record(record)
+            self._file.flush()
+            self.count += 1
+
+    def _write_record(self, record):
+        raise NotImplementedError
+
+    def warnings(self):
+        """Problems with the written output worth telling the user about"""
+        return []
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._close_file()
+                self._file = None
+
+    def _close_file(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class JsonLinesSink(RecordSink):
+    """One JSON object per line"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write_record(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class CsvSink(RecordSink):
+    """Flattened CSV rows in DataHandler's layout, over a known set of columns.
+
+    Values without a column (e.g. more phone numbers than CSV_MAX_PHONE_NUMBERS) are
+    left out of the row; such rows are counted and reported by warnings().
+    """
+
+    def __init__(self, path, fieldnames=None):
+        super().__init__(path)
+        self.fieldnames = fieldnames or DataHandler.csv_fieldnames()
+        self.truncated_rows = 0
+        self.dropped_columns = set()
+        self._columns = set(self.fieldnames)
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, restval='', extrasaction='ignore')
+        self._writer.writeheader()
+
+    def _write_record(self, record):
+        row = DataHandler.flatten_record(record)
+        dropped = row.keys() - self._columns
+        if dropped:
+            self.truncated_rows += 1
+            self.dropped_columns.update(dropped)
+        self._writer.writerow(row)
+
+    def warnings(self):
+        if not self.truncated_rows:
+            return []
+        return [f"{self.truncated_rows} rows in {self.path} were truncated, dropping "
+                f"{', '.join(sorted(self.dropped_columns))}; raise CSV_MAX_PHONE_NUMBERS / "
+                f"CSV_MAX_WEBSITES or use a .jsonl output to keep every value"]
+
+
+class JsonArraySink(RecordSink):
+    """A JSON array laid out exactly like DataHandler.save_as_json"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('[')
+
+    def _write_record(self, record):
+        body = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+        self._file.write((',\n  ' if self.count else '\n  ') + body)
+
+    def _close_file(self):
+        self._file.write('\n]' if self.count else ']')
+        self._file.close()
+
+
+class ParquetSink(RecordSink):
+    """Parquet file written one row group per batch of records"""
+
+    def __init__(self, path, batch_size=None):
+        from parquet_export import ParquetBatchWriter
+
+        super().__init__(path)
+        self._file = ParquetBatchWriter(path, batch_size)
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(record)
+            self.count += 1
+
+
+class SqliteSink(RecordSink):
+    """Normalized SQLite database, written in batched transactions"""
+
+    def __init__(self, path, batch_size=None):
+        from listing_store import ListingStore
+
+        super().__init__(path)
+        self.batch_size = batch_size or Config.SQLITE_BATCH_SIZE
+        self._store = ListingStore(path)
+        self._batch = []
+
+    def write(self, record):
+        with self._lock:
+            self._batch.append(record)
+            self.count += 1
+            if len(self._batch) >= self.batch_size:
+                self._store.save(self._batch)
+                self._batch = []
+
+    def close(self):
+        with self._lock:
+            if self._store is not None:
+                if self._batch:
+                    self._store.save(self._batch)
+                    self._batch = []
+                self._store.close()
+                self._store = None
+
+
+class TeeSink:
+    """Writes each record to several sinks"""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    @property
+    def count(self):
+        return self.sinks[0].count if self.sinks else 0
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def warnings(self):
+        return [warning for sink in self.sinks for warning in sink.warnings()]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+SINK_TYPES = {
+    '.jsonl': JsonLinesSink,
+    '.csv': CsvSink,
+    '.json': JsonArraySink,
+    '.parquet': ParquetSink,
+    '.sqlite': SqliteSink,
+    '.sqlite3': SqliteSink,
+    '.db': SqliteSink,
+}
+
+
+def open_sink(path):
+    """Open the sink matching a file's extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINK_TYPES:
+        raise ValueError(f"Unsupported output format: {extension or path}")
+    return SINK_TYPES[extension](path)
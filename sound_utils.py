@@ -1,7 +1,6 @@
 """Sound notification utilities"""
 
 import sys
-import winsound
 
 
 class SoundNotifier:
@@ -11,6 +10,7 @@ class SoundNotifier:
         try:
             # For Windows
             if sys.platform == "win32":
+                import winsound  # Windows only, so imported when needed
                 winsound.MessageBeep(winsound.MB_OK)
             else:
                 # For Unix/Linux/Mac - using system bell
@@ -23,6 +23,7 @@ class SoundNotifier:
         """Play error sound"""
         try:
             if sys.platform == "win32":
+                import winsound
                 winsound.MessageBeep(winsound.MB_ICONHAND)
             else:
                 print('\a')  # Bell character
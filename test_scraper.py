@@ -1,9 +1,109 @@
 """Test script for the Yellow Pages Scraper"""
 
 from scraper import YellowPagesScraper
+from async_scraper import AsyncYellowPagesScraper
 from data_handler import DataHandler
+from bs4 import BeautifulSoup
 import json
 
+# Offline fixtures mirroring the yellowpages.ca markup the scraper relies on
+SEARCH_PAGE_HTML = """
+<html><body>
+<div class="listing__content"><a class="listing__name--link listing__link" href="/bus/Ontario/Toronto/Smile-Dental/1001.html">Smile Dental</a></div>
+<div class="listing__content"><a href="/bus/Ontario/Toronto/Bright-Teeth/1002.html" class="listing__name--link">Bright Teeth</a></div>
+<div class="listing__content"><span>No link here</span></div>
+</body></html>
+"""
+
+LISTING_PAGE_HTML = """
+<html><body>
+<span class="merchantName">Smile  Dental</span>
+<div itemprop="address">
+  <span itemprop="streetAddress">1 King St W</span>
+  <span itemprop="addressLocality">Toronto</span>
+  <span itemprop="addressRegion">ON</span>
+  <span itemprop="postalCode">M5H 1A1</span>
+</div>
+<ul>
+<li class="mlr__item--phone"><ul class="mlr__submenu">
+  <li><span class="mlr__label">Primary</span><span class="mlr__sub-text">416-555-0100</span></li>
+  <li><span class="mlr__label">Fax</span><span class="mlr__sub-text">416-555-0101</span></li>
+</ul></li>
+<li class="mlr__item--website"><ul class="mlr__submenu">
+  <li><a href="/gourl/abc?redirect=https%3A%2F%2Fsmiledental.example.ca%2F&amp;x=1">Website</a></li>
+</ul></li>
+</ul>
+<a class="merchant__status-text">Open today</a>
+<a href="/search/si/1/Dentists/Toronto+ON">Dentists</a>
+</body></html>
+"""
+
+MULTI_WEBSITE_LISTING_HTML = LISTING_PAGE_HTML.replace(
+    '<li><a href="/gourl/abc?redirect=https%3A%2F%2Fsmiledental.example.ca%2F&amp;x=1">Website</a></li>',
+    '<li><a href="/gourl/abc?redirect=https%3A%2F%2Fsmiledental.example.ca%2F&amp;x=1">Website</a></li>'
+    '<li><a href="/gourl/def?redirect=https%3A%2F%2Fbook.smiledental.example.ca%2F">Booking</a></li>'
+    '<li><a href="/gourl/ghi?redirect=https%3A%2F%2Fsmiledental-kids.example.ca%2F">Kids</a></li>'
+    '<li><span class="mlr__sub-text">smiledental-west.example.ca</span></li>'
+)
+
+WEBSITE_HTML = """
+<html><body>
+<p>Contact us: info@smiledental.ca or test@example.com</p>
+<a href="https://www.facebook.com/smiledental">Facebook</a>
+<a href="https://x.com/smiledental">X</a>
+<a href="mailto:bookings@smiledental.ca">Book</a>
+</body></html>
+"""
+
+FAST_DELAYS = {
+    'search_min': 0.001, 'search_max': 0.002,
+    'listing_min': 0.001, 'listing_max': 0.002,
+    'website_min': 0.001, 'website_max': 0.002,
+    'page_load_min': 0.0, 'page_load_max': 0.0,
+    'website_timeout': 1, 'website_retries': 1,
+    'page_timeout': 1, 'page_retries': 1
+}
+
+
+def fixture_page(url):
+    """Return fixture markup for a URL"""
+    if '/search/si/1/' in url:
+        return SEARCH_PAGE_HTML
+    if '/search/si/' in url:
+        return "<html><body></body></html>"
+    if '/bus/' in url:
+        return LISTING_PAGE_HTML
+    return WEBSITE_HTML
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+    def __init__(self, text, url=None, status_code=200, headers=None):
+        self.content = text.encode('utf-8')
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {'Content-Type': 'text/html; charset=utf-8'}
+        self.encoding = 'utf-8'
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+
+class OfflineMixin:
+    """Serve fixture pages instead of hitting the network"""
+    def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+        if page_type:
+            self.wait_for_rate_limit(url, page_type)
+        return FakeResponse(fixture_page(url), url)
+
 def test_basic_scraping():
     """Test basic scraping functionality"""
     print("Testing Enhanced Yellow Pages Scraper...")
@@ -116,6 +216,1078 @@ def test_delay_settings():
     
     return True
 
+def test_session_pooling():
+    """Test that yellowpages.ca has its own session, websites share one, and both close on shutdown"""
+    scraper = YellowPagesScraper()
+    first = scraper.get_session("https://www.yellowpages.ca/search/si/1/dentists/Toronto+ON")
+    second = scraper.get_session("https://www.yellowpages.ca/bus/Ontario/Toronto/x/123.html")
+    other = scraper.get_session("https://example-dental.ca/")
+    assert first is second
+    assert first is not other
+    for i in range(50):
+        assert scraper.get_session(f"https://dental-{i}.example.com/") is other
+    assert len(scraper._sessions) == 2
+    
+    scraper.stop_scraping()
+    assert scraper.get_session("https://www.yellowpages.ca/") is not first
+    scraper.close_sessions()
+
+def test_async_engine_matches_sequential():
+    """Test that the asyncio engine produces the same records as run_scraper"""
+    class OfflineScraper(OfflineMixin, YellowPagesScraper):
+        pass
+
+    class OfflineAsyncScraper(OfflineMixin, AsyncYellowPagesScraper):
+        pass
+
+    progress = []
+    sequential = OfflineScraper(delay_settings=FAST_DELAYS).run_scraper("dentists", "Toronto+ON", 1, 2)
+    concurrent = OfflineAsyncScraper(
+        delay_settings=FAST_DELAYS, progress_callback=lambda page, total: progress.append(total)
+    ).run_scraper("dentists", "Toronto+ON", 1, 2)
+
+    def comparable(records):
+        return [{k: v for k, v in record.items() if k != 'scraped_at'} for record in records]
+
+    assert len(concurrent) == 2
+    assert comparable(concurrent) == comparable(sequential)
+    assert concurrent[0]['name'] == "Smile Dental"
+    assert concurrent[0]['phone'] == "416-555-0100"
+    assert sorted(concurrent[0]['emails']) == ["bookings@smiledental.ca", "info@smiledental.ca"]
+    assert sorted(concurrent[0]['social_links']) == ["facebook", "twitter"]
+    assert progress[-1] == 2
+
+def test_rate_limiter_per_host():
+    """Test that rate budgets are kept separately per host"""
+    from rate_limiter import HostRateLimiter
+    limiter = HostRateLimiter(
+        budgets={'search': (10, 10), 'listing': (5, 5), 'website': (2, 2)},
+        yellowpages_host="www.yellowpages.ca"
+    )
+    listing_url = "https://www.yellowpages.ca/bus/Ontario/Toronto/x/1.html"
+    assert limiter.reserve(listing_url, 'listing') == 0
+    assert limiter.reserve(listing_url, 'listing') > 4
+    # Search pages and third-party sites don't queue behind listing pages
+    assert limiter.reserve("https://www.yellowpages.ca/search/si/1/a/b", 'search') == 0
+    assert limiter.reserve("https://dentist-one.example.ca/", 'website') == 0
+    assert limiter.reserve("https://dentist-two.example.ca/", 'website') == 0
+
+def test_targeted_parsing_matches_full_parse():
+    """Test that restricted parse targets extract the same data as a full parse"""
+    from html_parsing import PAGE_PARSE_TARGETS, resolve_parser_backend
+    scraper = YellowPagesScraper()
+    parser = resolve_parser_backend('lxml')
+    
+    full = BeautifulSoup(SEARCH_PAGE_HTML, parser)
+    targeted = BeautifulSoup(SEARCH_PAGE_HTML, parser, parse_only=PAGE_PARSE_TARGETS['search'])
+    assert scraper.extract_listing_urls_from_search_results(targeted) == \
+        scraper.extract_listing_urls_from_search_results(full)
+    
+    full_record = scraper.new_listing_record("https://www.yellowpages.ca/bus/1.html", 1)
+    targeted_record = dict(full_record, address=dict(full_record['address']), phone_numbers=[],
+                           websites=[], categories=[])
+    scraper.parse_listing_page(BeautifulSoup(LISTING_PAGE_HTML, parser), full_record)
+    scraper.parse_listing_page(
+        BeautifulSoup(LISTING_PAGE_HTML, parser, parse_only=PAGE_PARSE_TARGETS['listing']), targeted_record
+    )
+    assert targeted_record == full_record
+
+SEARCH_PAGE_CORPUS = [
+    SEARCH_PAGE_HTML,
+    # Single quotes, extra classes, entities and other attributes before the class
+    """<div id='l1' class='listing listing__content listing__content--premium'>
+    <a data-analytics='name' class='listing__name--link jsListingName' href='/bus/Ontario/Toronto/A-%26-B/2001.html?what=dentists&amp;where=Toronto'>A &amp; B</a>
+    </div>
+    <div class="listing__content"><a class="listing__name--link" href="">Empty</a><a class="listing__name--link" href="/bus/2.html">Second</a></div>
+    <div class="listing__content"><a class="listing__name--linkish" href="/bus/3.html">Not a name link</a></div>
+    <div class="listing__content"><a class="listing__name--link" href="https://www.yellowpages.ca/bus/4.html">Absolute</a></div>""",
+    # Not a search results page
+    "<html><body><p>No results</p></body></html>",
+]
+
+
+def test_fast_listing_url_extraction_matches_soup():
+    """Test that the zero-DOM extractor returns the same URLs as the BeautifulSoup path"""
+    from extractors import extract_listing_urls_fast
+    scraper = YellowPagesScraper()
+    for html_text in SEARCH_PAGE_CORPUS:
+        expected = scraper.extract_listing_urls_from_search_results(BeautifulSoup(html_text, 'html.parser'))
+        fast = extract_listing_urls_fast(html_text.encode('utf-8'))
+        # None means "fall back to BeautifulSoup"
+        assert fast == expected or (fast is None and expected == [])
+
+
+def benchmark_listing_url_extraction(repeat=50):
+    """Compare the zero-DOM extractor with the BeautifulSoup path on a large search page"""
+    import time
+    from extractors import extract_listing_urls_fast
+    scraper = YellowPagesScraper()
+    listing = ("<div class='listing__content'><div class='ad'><img src='x.png'><p>Ad text</p></div>"
+               "<a class='listing__name--link' href='/bus/Ontario/Toronto/Dentist/{0}.html'>Dentist {0}</a>"
+               "<span class='listing__address'>1 King St</span></div>")
+    page = ("<html><head><script>var x = 1;</script></head><body>" +
+            "".join(listing.format(i) for i in range(40)) + "<footer>" + "<p>filler</p>" * 2000 +
+            "</footer></body></html>").encode('utf-8')
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        soup_urls = scraper.extract_listing_urls_from_search_results(BeautifulSoup(page, 'html.parser'))
+    soup_time = (time.perf_counter() - start) / repeat
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fast_urls = extract_listing_urls_fast(page)
+    fast_time = (time.perf_counter() - start) / repeat
+    
+    assert fast_urls == soup_urls
+    print(f"BeautifulSoup: {soup_time * 1000:.2f} ms/page, fast path: {fast_time * 1000:.2f} ms/page "
+          f"({soup_time / fast_time:.0f}x faster)")
+
+def test_contact_scanner_across_chunks():
+    """Test that the streaming scanner finds contacts regardless of chunk boundaries"""
+    from extractors import ContactScanner
+    body = ("<html><body>" + "<p>filler</p>" * 500 +
+            "<p>Write to info&#64;smiledental.ca or office@smiledental.ca, not logo@2x.png or a@example.com</p>"
+            "<a href='mailto:bookings@smiledental.ca?subject=Hi'>Book</a>"
+            "<a href=\"https://www.instagram.com/smiledental\">IG</a><a href=\"/about\">About</a>"
+            "</body></html>").encode('utf-8')
+    
+    for chunk_size in (7, 100, 4096, len(body)):
+        scanner = ContactScanner('utf-8', is_social_candidate=lambda href: 'instagram' in href)
+        for i in range(0, len(body), chunk_size):
+            scanner.feed(body[i:i + chunk_size])
+        scanner.close()
+        assert scanner.emails == {"info@smiledental.ca", "office@smiledental.ca", "bookings@smiledental.ca"}
+        assert scanner.social_hrefs == ["https://www.instagram.com/smiledental"]
+    
+    # Tokens straddling the cut between what is scanned and what is carried to the next
+    # chunk are found once, whole: with 4096-byte chunks the cuts fall at 3072 and 7168
+    first = "<p>reach joe@smiledental.ca today</p>"
+    second = "<a href='mailto:front.desk@smiledental.ca'>Mail</a>"
+    body = (" " * 3061 + first).ljust(7148) + second
+    body = body.ljust(12000).encode('utf-8')
+    scanner = ContactScanner('utf-8')
+    for i in range(0, len(body), 4096):
+        scanner.feed(body[i:i + 4096])
+    scanner.close()
+    assert scanner.emails == {"joe@smiledental.ca", "front.desk@smiledental.ca"}
+
+def test_social_matcher():
+    """Test host-based social platform matching"""
+    scraper = YellowPagesScraper()
+    matcher = scraper.social_matcher
+    assert matcher.platform_for("https://www.facebook.com/smiledental") == "facebook"
+    assert matcher.platform_for("https://m.facebook.com/smiledental") == "facebook"
+    assert matcher.platform_for("//instagram.com/smiledental") == "instagram"
+    assert matcher.platform_for("linkedin.com/company/smiledental") == "linkedin"
+    assert matcher.platform_for("https://x.com/smiledental") == "twitter"
+    assert matcher.platform_for("https://notfacebook.com.example/page") is None
+    assert matcher.platform_for("https://smiledental.ca/facebook.com") is None
+    assert matcher.platform_for("/about") is None
+    
+    soup = BeautifulSoup(WEBSITE_HTML, 'html.parser')
+    assert scraper.extract_social_links(soup) == {
+        "facebook": ["https://www.facebook.com/smiledental"],
+        "twitter": ["https://x.com/smiledental"]
+    }
+
+def test_response_cache_hit_and_revalidation():
+    """Test fresh cache hits and ETag revalidation of stale entries"""
+    import tempfile
+    import os
+    from requests.structures import CaseInsensitiveDict
+    from http_cache import CachedResponse, ResponseCache
+    
+    # Header lookups don't depend on how the server capitalised the names
+    cached = CachedResponse("https://smiledental.ca/", b"", {'content-type': 'text/html; charset=ISO-8859-1',
+                                                           'etag': '"v2"', 'last-modified': 'Mon, 05 Oct 2026'})
+    assert cached.encoding == 'iso-8859-1'
+    assert ResponseCache.conditional_headers(cached) == {'If-None-Match': '"v2"',
+                                                         'If-Modified-Since': 'Mon, 05 Oct 2026'}
+    
+    class FakeSession:
+        def __init__(self):
+            self.requests = []
+        
+        def get(self, url, timeout=None, stream=False, headers=None):
+            self.requests.append(headers)
+            if headers and headers.get('If-None-Match') == '"v1"':
+                return FakeResponse("", url, status_code=304)
+            return FakeResponse(LISTING_PAGE_HTML, url, headers=CaseInsensitiveDict({
+                'content-type': 'text/html; charset=utf-8', 'etag': '"v1"'
+            }))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        scraper = YellowPagesScraper(delay_settings=FAST_DELAYS, cache_path=os.path.join(tmp, "cache.sqlite3"))
+        session = FakeSession()
+        scraper.get_session = lambda url: session
+        url = "https://www.yellowpages.ca/bus/Ontario/Toronto/Smile-Dental/1001.html"
+        
+        first = scraper.scrape_page_with_retry(url, page_type='listing')
+        second = scraper.scrape_page_with_retry(url, page_type='listing')
+        assert len(session.requests) == 1
+        assert first.find('span', class_='merchantName').text == second.find('span', class_='merchantName').text
+        
+        # Expire the entry: the next request revalidates with the stored ETag
+        scraper.response_cache.ttls = {'listing': 0}
+        third = scraper.scrape_page_with_retry(url, page_type='listing')
+        assert session.requests[-1] == {'If-None-Match': '"v1"'}
+        assert third.find('span', class_='merchantName') is not None
+        assert scraper.response_cache.stats()['hits'] == 1
+        assert scraper.response_cache.stats()['revalidations'] == 1
+        assert scraper.response_cache.stats()['misses'] == 1
+        scraper.response_cache.close()
+
+def test_contact_cache_normalizes_and_coalesces():
+    """Test that listings sharing a website trigger a single website fetch"""
+    import threading
+    import time
+    from contact_cache import ContactCache, normalize_site_url
+    
+    assert normalize_site_url("https://www.SmileDental.ca/") == "smiledental.ca"
+    assert normalize_site_url("http://smiledental.ca") == "smiledental.ca"
+    assert normalize_site_url(
+        "https://www.yellowpages.ca/gourl/abc?redirect=https%3A%2F%2Fwww.smiledental.ca%2F"
+    ) == "smiledental.ca"
+    assert normalize_site_url("https://smiledental.ca/locations/") != "smiledental.ca"
+    assert normalize_site_url("https://smiledental.ca/?utm_source=yp&fbclid=x") == "smiledental.ca"
+    assert normalize_site_url("https://smiledental.ca/page?id=1") != normalize_site_url("smiledental.ca/page?id=2")
+    assert normalize_site_url("smiledental.ca/page?b=2&a=1&utm_medium=cpc") == "smiledental.ca/page?a=1&b=2"
+    
+    cache = ContactCache()
+    calls = []
+    
+    def fetch(url):
+        calls.append(url)
+        time.sleep(0.05)
+        return {'emails': ["info@smiledental.ca"], 'social_links': {}}, True
+    
+    results = []
+    urls = ["https://www.smiledental.ca/", "http://smiledental.ca", "smiledental.ca/"]
+    threads = [threading.Thread(target=lambda u=u: results.append(cache.get_or_fetch(u, fetch))) for u in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert all(result['emails'] == ["info@smiledental.ca"] for result in results)
+    assert cache.get_or_fetch("https://smiledental.ca/index.html", fetch)['emails'] == ["info@smiledental.ca"]
+    assert len(calls) == 1
+    
+    # A site that failed to load is tried again by the next listing instead of staying empty
+    attempts = []
+    
+    def flaky_fetch(url):
+        attempts.append(url)
+        if len(attempts) == 1:
+            return {'emails': [], 'social_links': {}}, False
+        return {'emails': ["hello@brightteeth.ca"], 'social_links': {}}, True
+    
+    assert cache.get_or_fetch("https://brightteeth.ca/", flaky_fetch)['emails'] == []
+    assert cache.get_or_fetch("https://brightteeth.ca/", flaky_fetch)['emails'] == ["hello@brightteeth.ca"]
+    assert cache.get_or_fetch("https://brightteeth.ca/", flaky_fetch)['emails'] == ["hello@brightteeth.ca"]
+    assert len(attempts) == 2
+
+def test_listing_index_reuses_fresh_and_unchanged_listings():
+    """Test that re-scrapes reuse indexed listings instead of fetching them again"""
+    import tempfile
+    import os
+    import subprocess
+    import sys
+    
+    fetched = []
+    
+    class CountingScraper(OfflineMixin, YellowPagesScraper):
+        rewrite = None  # Applied to listing page bodies
+        
+        def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+            fetched.append(page_type)
+            response = super().fetch_page_with_retry(url, timeout, max_retries, page_type, stream)
+            if page_type == 'listing' and self.rewrite:
+                response.content = self.rewrite(response.content)
+            return response
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "listings.sqlite3")
+        first = CountingScraper(delay_settings=FAST_DELAYS, listing_index_path=index_path).run_scraper(
+            "dentists", "Toronto+ON", 1, 1)
+        assert fetched.count('listing') == 2
+        
+        # Within the freshness window: no listing or website fetches at all
+        del fetched[:]
+        scraper = CountingScraper(delay_settings=FAST_DELAYS, listing_index_path=index_path)
+        fresh = scraper.run_scraper("dentists", "Toronto+ON", 1, 1, min_age=24)
+        assert fetched == ['search']
+        assert fresh == first
+        
+        # Outside the window the listing is fetched, but an unchanged listing skips its websites,
+        # even when markup that isn't part of the listing (tokens, timestamps) differs
+        del fetched[:]
+        scraper = CountingScraper(delay_settings=FAST_DELAYS, listing_index_path=index_path)
+        scraper.rewrite = lambda content: content.replace(b"</body>", b"<!-- token 8f3a2c --></body>")
+        unchanged = scraper.run_scraper("dentists", "Toronto+ON", 1, 1)
+        assert fetched == ['search', 'listing', 'listing']
+        assert [record['emails'] for record in unchanged] == [record['emails'] for record in first]
+        scraper.listing_index.close()
+        
+        # A changed field means the listing is scraped again, websites included
+        del fetched[:]
+        scraper = CountingScraper(delay_settings=FAST_DELAYS, listing_index_path=index_path)
+        scraper.rewrite = lambda content: content.replace(b"416-555-0100", b"416-555-0199")
+        changed = scraper.run_scraper("dentists", "Toronto+ON", 1, 1)
+        assert fetched.count('website') == 1 and changed[0]['phone'] == "416-555-0199"
+        scraper.listing_index.close()
+    
+    # A listing with several websites hashes the same in every process, so it is recognised
+    # as unchanged on later runs whatever the interpreter's hash seed
+    script = (
+        "from bs4 import BeautifulSoup\n"
+        "from listing_index import content_hash\n"
+        "from scraper import YellowPagesScraper\n"
+        "from test_scraper import MULTI_WEBSITE_LISTING_HTML\n"
+        "scraper = YellowPagesScraper()\n"
+        "data = scraper.new_listing_record('https://www.yellowpages.ca/bus/1.html', 1)\n"
+        "scraper.parse_listing_page(BeautifulSoup(MULTI_WEBSITE_LISTING_HTML, 'html.parser'), data)\n"
+        "print(data['websites'][0], content_hash(data))\n"
+    )
+    outputs = set()
+    for seed in ("1", "2", "3", "4"):
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=dict(os.environ, PYTHONHASHSEED=seed))
+        assert result.returncode == 0, result.stderr
+        outputs.add(result.stdout.strip())
+    assert len(outputs) == 1
+    assert outputs.pop().startswith("https://smiledental.example.ca/ ")
+
+def test_checkpoint_resume_skips_completed_listings():
+    """Test that a stopped run resumes from its journal without refetching finished listings"""
+    import tempfile
+    import os
+    from checkpoint import RunJournal
+    from sinks import JsonLinesSink
+    
+    fetched = []
+    
+    class InterruptedScraper(OfflineMixin, YellowPagesScraper):
+        stop_after = None
+        
+        def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+            fetched.append(url)
+            return super().fetch_page_with_retry(url, timeout, max_retries, page_type, stream)
+        
+        def finish_record(self, record):
+            super().finish_record(record)
+            if self.stop_after is not None and len(fetched) >= self.stop_after:
+                self.stop_requested = True
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint_path = os.path.join(tmp, "run.jsonl")
+        scraper = InterruptedScraper(delay_settings=FAST_DELAYS)
+        scraper.enrichment_workers = 0
+        scraper.prefetch_search_pages = False
+        scraper.stop_after = 1
+        first = scraper.run_scraper("dentists", "Toronto+ON", 1, 2, checkpoint_path=checkpoint_path)
+        assert len(first) == 1
+        done_url = first[0]['url']
+        
+        # Simulate a torn write from a crash
+        with open(checkpoint_path, 'ab') as f:
+            f.write(b'{"type": "rec')
+        
+        del fetched[:]
+        resumed = InterruptedScraper(delay_settings=FAST_DELAYS).resume_scraper(checkpoint_path)
+        assert [record['url'] for record in resumed][0] == done_url
+        assert len(resumed) == 2
+        assert done_url not in fetched
+        assert not any('/search/si/1/' in url for url in fetched)
+        
+        # A finished checkpoint just returns its records
+        del fetched[:]
+        again = InterruptedScraper(delay_settings=FAST_DELAYS).resume_scraper(checkpoint_path)
+        assert again == resumed
+        assert fetched == []
+        
+        # Without keep_records the journaled listings are streamed to the sink, not held in memory
+        with JsonLinesSink(os.path.join(tmp, "resumed.jsonl")) as sink:
+            streamed = InterruptedScraper(delay_settings=FAST_DELAYS).resume_scraper(
+                checkpoint_path, sink=sink, keep_records=False)
+        assert streamed == [] and sink.count == 2
+        with open(os.path.join(tmp, "resumed.jsonl"), encoding='utf-8') as f:
+            assert [json.loads(line) for line in f] == resumed
+        seen = []
+        journal = RunJournal(checkpoint_path)
+        state = journal.open_run(RunJournal.read_run_params(checkpoint_path), seen.append)
+        journal.close()
+        assert state.records == [] and seen == resumed
+
+def test_streaming_sinks_match_batch_output():
+    """Test that records streamed to sinks match the batch DataHandler output"""
+    import tempfile
+    import os
+    import csv
+    from sinks import open_sink
+    
+    class OfflineScraper(OfflineMixin, YellowPagesScraper):
+        pass
+    
+    class OfflineAsyncScraper(OfflineMixin, AsyncYellowPagesScraper):
+        pass
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        with open_sink(os.path.join(tmp, "stream.json")) as json_sink:
+            records = OfflineScraper(delay_settings=FAST_DELAYS).run_scraper(
+                "dentists", "Toronto+ON", 1, 1, sink=json_sink)
+        assert json_sink.count == 2
+        DataHandler.save_as_json(records, os.path.join(tmp, "batch.json"))
+        with open(os.path.join(tmp, "stream.json"), encoding='utf-8') as f:
+            streamed = f.read()
+        with open(os.path.join(tmp, "batch.json"), encoding='utf-8') as f:
+            assert streamed == f.read()
+        
+        # CSV rows match the batch export column for column
+        with open_sink(os.path.join(tmp, "stream.csv")) as csv_sink:
+            for record in records:
+                csv_sink.write(record)
+        DataHandler.save_as_csv(records, os.path.join(tmp, "batch.csv"))
+        with open(os.path.join(tmp, "stream.csv"), encoding='utf-8') as f:
+            streamed_rows = list(csv.DictReader(f))
+        with open(os.path.join(tmp, "batch.csv"), encoding='utf-8') as f:
+            batch_rows = list(csv.DictReader(f))
+        assert [{k: row[k] for k in batch} for row, batch in zip(streamed_rows, batch_rows)] == batch_rows
+        assert csv_sink.warnings() == []
+        
+        # Values beyond the fixed columns are reported rather than dropped silently
+        crowded = dict(records[0], websites=[f"https://site-{i}.example.com/" for i in range(5)])
+        with open_sink(os.path.join(tmp, "crowded.csv")) as csv_sink:
+            csv_sink.write(records[1])
+            csv_sink.write(crowded)
+        assert csv_sink.truncated_rows == 1
+        assert csv_sink.dropped_columns == {'website_4', 'website_5'}
+        assert "website_4, website_5" in csv_sink.warnings()[0]
+        
+        # Without keeping records, everything still reaches the sink
+        for scraper_class in (OfflineScraper, OfflineAsyncScraper):
+            path = os.path.join(tmp, f"{scraper_class.__name__}.jsonl")
+            with open_sink(path) as jsonl_sink:
+                kept = scraper_class(delay_settings=FAST_DELAYS).run_scraper(
+                    "dentists", "Toronto+ON", 1, 1, sink=jsonl_sink, keep_records=False)
+            assert kept == []
+            with open(path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+            assert sorted(line['url'] for line in lines) == sorted(record['url'] for record in records)
+            assert all(line['emails'] for line in lines)
+
+def test_jsonl_to_csv_export_matches_save_as_csv():
+    """Test that the streaming JSONL to CSV export produces the same file as save_as_csv"""
+    import tempfile
+    import os
+    
+    records = [
+        {'name': "Smile Dental", 'url': "https://www.yellowpages.ca/bus/1.html",
+         'address': {'street': "1 King St W", 'city': "Toronto", 'region': "ON", 'postal_code': None},
+         'categories': ["Dentists"], 'phone_numbers': [{'number': "416-555-0100", 'type': "Primary"}],
+         'websites': ["https://smiledental.ca"], 'emails': ["info@smiledental.ca"],
+         'social_links': {'facebook': ["https://facebook.com/smiledental"]}, 'scraping_status': "success"},
+        {'name': "Bright Teeth", 'url': "https://www.yellowpages.ca/bus/2.html", 'address': {},
+         'categories': [], 'phone_numbers': [{'number': "1", 'type': "Primary"}, {'number': "2", 'type': "Fax"}],
+         'websites': [], 'emails': [], 'social_links': {'instagram': ["https://instagram.com/bright"]},
+         'scraping_status': "failed_to_load"},
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "records.jsonl")
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        
+        DataHandler.save_as_csv(records, os.path.join(tmp, "batch.csv"))
+        assert DataHandler.export_jsonl_to_csv(jsonl_path, os.path.join(tmp, "streamed.csv")) == 0
+        with open(os.path.join(tmp, "batch.csv"), encoding='utf-8') as f:
+            batch = f.read()
+        with open(os.path.join(tmp, "streamed.csv"), encoding='utf-8') as f:
+            assert f.read() == batch
+        
+        # A bounded pre-scan falls back to the known schema for the rest of the file
+        DataHandler.export_jsonl_to_csv(jsonl_path, os.path.join(tmp, "scanned.csv"), scan_limit=1)
+        with open(os.path.join(tmp, "scanned.csv"), encoding='utf-8') as f:
+            header = f.readline().strip().split(',')
+        assert 'phone_2_type' in header and 'social_instagram' in header
+        
+        # ...and rows with values past those columns are counted, not dropped silently
+        with open(jsonl_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(records[0], websites=["https://a.ca", "https://b.ca",
+                                                           "https://c.ca", "https://d.ca"])) + '\n')
+        truncated = DataHandler.export_jsonl_to_csv(jsonl_path, os.path.join(tmp, "scanned.csv"), scan_limit=1)
+        assert truncated == 1
+
+def test_parquet_export_nested_columns():
+    """Test the Parquet export keeps address, phone numbers and social links as nested columns"""
+    import tempfile
+    import os
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow not installed, skipping Parquet export test")
+        return
+    
+    record = {
+        'name': "Smile Dental", 'phone': "416-555-0100", 'website': None, 'url': "https://www.yellowpages.ca/bus/1.html",
+        'address': {'street': "1 King St W", 'city': "Toronto", 'region': "ON", 'postal_code': "M5H 1A1"},
+        'categories': ["Dentists"], 'page_number': 1, 'scraped_at': "2024-05-01T12:30:00",
+        'phone_numbers': [{'number': "416-555-0100", 'type': "Primary"}], 'websites': ["https://smiledental.ca"],
+        'business_hours': None, 'emails': ["info@smiledental.ca"],
+        'social_links': {'facebook': ["https://facebook.com/smiledental"]}, 'scraping_status': "success"
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.parquet")
+        DataHandler.save_as_parquet((dict(record, page_number=i) for i in range(5)), path, batch_size=2)
+        parquet_file = pq.ParquetFile(path)
+        assert parquet_file.metadata.num_row_groups == 3
+        rows = parquet_file.read().to_pylist()
+        assert len(rows) == 5
+        assert rows[0]['address']['postal_code'] == "M5H 1A1"
+        assert rows[0]['phone_numbers'] == [{'number': "416-555-0100", 'type': "Primary"}]
+        assert rows[0]['social_links'] == [('facebook', ["https://facebook.com/smiledental"])]
+        assert rows[4]['page_number'] == 4
+
+def test_sqlite_store_shared_contact_lookups():
+    """Test the SQLite backend upserts listings and finds listings sharing a phone, email or domain"""
+    import tempfile
+    import os
+    from listing_store import ListingStore
+    
+    def listing(number, name, phone, website, email):
+        return {
+            'url': f"https://www.yellowpages.ca/bus/{number}.html", 'name': name, 'phone': phone,
+            'address': {'street': "1 King St W", 'city': "Toronto", 'region': "ON", 'postal_code': "M5H 1A1"},
+            'categories': ["Dentists"], 'phone_numbers': [{'number': phone, 'type': "Primary"}],
+            'websites': [website], 'emails': [email], 'social_links': {'facebook': [f"https://facebook.com/{number}"]},
+            'scraping_status': "success"
+        }
+    
+    records = [
+        listing(1, "Smile Dental King", "416-555-0100", "https://www.smiledental.ca/king", "info@smiledental.ca"),
+        listing(2, "Smile Dental Queen", "(416) 555-0100", "http://smiledental.ca/queen", "queen@smiledental.ca"),
+        listing(3, "Bright Teeth", "416-555-0199", "https://brightteeth.ca", "INFO@smiledental.ca"),
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.sqlite3")
+        assert DataHandler.save_as_sqlite(records, path, batch_size=2) == 3
+        # A re-scrape replaces the listing's rows instead of duplicating them
+        assert DataHandler.save_as_sqlite(records[:1], path) == 1
+        
+        store = ListingStore(path)
+        assert [row['name'] for row in store.find_by_phone("+1 416 555 0100")] == [
+            "Smile Dental King", "Smile Dental Queen"]
+        assert [row['name'] for row in store.find_by_domain("smiledental.ca")] == [
+            "Smile Dental King", "Smile Dental Queen"]
+        assert [row['name'] for row in store.find_by_email("info@smiledental.ca")] == [
+            "Bright Teeth", "Smile Dental King"]
+        assert len(store.find_by_postal_code("M5H 1A1")) == 3
+        assert len(store.find_by_category("Dentists")) == 3
+        assert store.shared_contacts('phone') == {"4165550100": [records[0]['url'], records[1]['url']]}
+        store.close()
+        
+        # Nothing to save leaves no file behind, in either binary format
+        for save, name in ((DataHandler.save_as_sqlite, "empty.sqlite3"), (DataHandler.save_as_parquet, "empty.parquet")):
+            try:
+                save(iter([]), os.path.join(tmp, name))
+                assert False, "expected ValueError"
+            except ValueError as e:
+                assert str(e) == "No data to save"
+            assert not os.path.exists(os.path.join(tmp, name))
+
+def test_running_summary_matches_full_summary():
+    """Test that the scraper's running summary matches get_scraping_summary over the records"""
+    class OfflineScraper(OfflineMixin, YellowPagesScraper):
+        pass
+    
+    class OfflineAsyncScraper(OfflineMixin, AsyncYellowPagesScraper):
+        pass
+    
+    for scraper_class in (OfflineScraper, OfflineAsyncScraper):
+        scraper = scraper_class(delay_settings=FAST_DELAYS)
+        records = scraper.run_scraper("dentists", "Toronto+ON", 1, 2)
+        failed = dict(records[0], scraping_status="failed_to_load", emails=[], social_links={})
+        scraper.summary.add(failed)
+        expected = DataHandler.get_scraping_summary(records + [failed])
+        assert scraper.summary.as_dict() == expected
+        assert expected['total_listings'] == 3 and expected['failed_scrapes'] == 1
+        assert expected['listings_with_emails'] == 2
+
+def test_cli_streams_results_without_tk():
+    """Test the headless CLI writes its outputs and never imports tkinter or winsound"""
+    import tempfile
+    import os
+    import subprocess
+    import sys
+    import cli
+    
+    check = "import cli, sys; print('tkinter' in sys.modules, 'winsound' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == "False False"
+    
+    original_fetch = YellowPagesScraper.fetch_page_with_retry
+    YellowPagesScraper.fetch_page_with_retry = OfflineMixin.fetch_page_with_retry
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            jsonl_path = os.path.join(tmp, "out.jsonl")
+            csv_path = os.path.join(tmp, "out.csv")
+            exit_code = cli.main([
+                "dentists", "Toronto+ON", "--end-page", "1", "-o", jsonl_path, "-o", csv_path,
+                "--search-delay", "0", "0.001", "--listing-delay", "0", "0.001",
+                "--website-delay", "0", "0.001", "--page-load-delay", "0", "0"
+            ])
+            assert exit_code == 0
+            with open(jsonl_path, encoding='utf-8') as f:
+                assert len(f.readlines()) == 2
+            with open(csv_path, encoding='utf-8') as f:
+                assert len(f.readlines()) == 3
+    finally:
+        YellowPagesScraper.fetch_page_with_retry = original_fetch
+    
+    # Options a run would silently ignore are rejected up front
+    parser = cli.build_parser()
+    
+    def rejected(argv):
+        try:
+            cli.validate_args(parser, parser.parse_args(argv))
+        except SystemExit as e:
+            return e.code == 2
+        return False
+    
+    for option in (["--checkpoint", "run.jsonl"], ["--start-page", "2"], ["--end-page", "3"]):
+        assert rejected(["--jobs", "jobs.csv"] + option), option
+    assert not rejected(["--jobs", "jobs.csv"])
+    assert not rejected(["dentists", "Toronto+ON", "--start-page", "2"])
+    assert rejected(["dentists", "Toronto+ON", "--min-age", "24"])
+    assert not rejected(["dentists", "Toronto+ON", "--min-age", "24", "--listing-index", "listings.sqlite3"])
+
+def test_work_queue_shards_jobs_across_workers():
+    """Test workers sharing a queue dedupe units, re-lease expired units and drain the queue"""
+    import tempfile
+    import os
+    import threading
+    from work_queue import QueueWorker, WorkQueue
+    
+    class OfflineScraper(OfflineMixin, YellowPagesScraper):
+        pass
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queue.db")
+        queue = WorkQueue(path, lease_seconds=60)
+        queue.add_job("dentists", "Toronto+ON", 1, 2)
+        queue.add_job("dentists", "Toronto+ON", 2, 3)  # Page 2 overlaps and is only queued once
+        assert queue.stats() == {'search': {'pending': 3}}
+        
+        # A worker that leases a unit and dies leaves it leased until the lease expires
+        dead = queue.lease("dead-worker")
+        assert dead.kind == 'search' and dead.page == 1
+        queue._conn.execute("UPDATE units SET lease_expires = 0 WHERE id = ?", (dead.id,))
+        
+        workers = [QueueWorker(WorkQueue(path), OfflineScraper(delay_settings=FAST_DELAYS), f"worker-{i}",
+                               poll_interval=0.01) for i in range(2)]
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        
+        # The dead worker's lease was taken over, so its late result is rejected
+        assert not queue.complete_search(dead, "dead-worker", [])
+        stats = queue.stats()
+        assert stats == {'search': {'done': 3}, 'listing': {'done': 2}}, stats
+        assert sum(worker.units_done for worker in workers) == 5
+        records = list(queue.iter_results())
+        assert sorted(record['url'] for record in records) == [
+            "https://www.yellowpages.ca/bus/Ontario/Toronto/Bright-Teeth/1002.html",
+            "https://www.yellowpages.ca/bus/Ontario/Toronto/Smile-Dental/1001.html",
+        ]
+        assert all(record['emails'] for record in records)
+        for worker in workers:
+            worker.queue.close()
+        queue.close()
+
+def test_work_queue_renews_leases_and_shares_adaptive_delays():
+    """Test a worker keeps its lease through long waits and keeps adaptive delays, shared between workers"""
+    import tempfile
+    import os
+    import time
+    from rate_limiter import SharedAdaptiveRateLimiter
+    from work_queue import QueueWorker, WorkQueue, build_parser
+    from cli import delay_settings_from_args
+    
+    args = build_parser().parse_args(["work", "queue.db", "--adaptive", "--listing-delay", "1", "3"])
+    assert delay_settings_from_args(args)['adaptive'] and args.listing_delay == [1.0, 3.0]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queue.db")
+        queue = WorkQueue(path, lease_seconds=0.3)
+        queue.add_job("dentists", "Toronto+ON", 1, 1)
+        stolen = []
+        
+        class SlowScraper(OfflineMixin, YellowPagesScraper):
+            def fetch_search_results(self, category, location, page):
+                # A wait several times the lease, e.g. for a rate budget or an open circuit
+                for _ in range(5):
+                    time.sleep(0.2)
+                    stolen.append(queue.lease("rival-worker"))
+                return super().fetch_search_results(category, location, page)
+        
+        scraper = SlowScraper(delay_settings=dict(FAST_DELAYS, adaptive=True))
+        worker = QueueWorker(WorkQueue(path, lease_seconds=0.3), scraper, "worker")
+        assert isinstance(scraper.rate_limiter, SharedAdaptiveRateLimiter)
+        worker.process(worker.queue.lease(worker.worker_id))
+        assert stolen == [None] * 5
+        assert queue.stats()['search'] == {'done': 1}
+        assert worker.units_done == 1
+        
+        # A 429 seen by one worker slows every worker down
+        budgets = {'search': (1, 3), 'listing': (1, 3), 'website': (1, 3)}
+        first = SharedAdaptiveRateLimiter(path, budgets, yellowpages_host="www.yellowpages.ca")
+        second = SharedAdaptiveRateLimiter(path, budgets, yellowpages_host="www.yellowpages.ca")
+        url = "https://www.yellowpages.ca/bus/Ontario/Toronto/x/1.html"
+        first.reserve(url, 'listing')
+        first.observe(url, 'listing', 429)
+        second.observe(url, 'listing', 200, 0.1)
+        assert second.current_delays()[("www.yellowpages.ca", 'listing')] > 2.5
+        for closable in (first, second, scraper.rate_limiter, worker.queue, queue):
+            closable.close()
+
+def test_batch_jobs_share_engine_and_dedupe_listings():
+    """Test a batch runs several jobs in one engine, scraping listings found by both jobs once"""
+    import tempfile
+    import os
+    from batch import load_jobs, run_batch
+    from sinks import JsonLinesSink
+    
+    class OfflineAsyncScraper(OfflineMixin, AsyncYellowPagesScraper):
+        pass
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs_path = os.path.join(tmp, "jobs.csv")
+        toronto_path = os.path.join(tmp, "toronto.jsonl")
+        with open(jobs_path, 'w', encoding='utf-8') as f:
+            f.write("category,location,start_page,end_page,output\n")
+            f.write(f"dentists,Toronto+ON,1,2,{toronto_path}\n")
+            f.write("dentists,Mississauga+ON,1,,\n")
+        jobs = load_jobs(jobs_path)
+        assert [(job.start_page, job.end_page) for job in jobs] == [(1, 2), (1, None)]
+        
+        scraper = OfflineAsyncScraper(delay_settings=FAST_DELAYS)
+        with JsonLinesSink(os.path.join(tmp, "rest.jsonl")) as rest:
+            records = run_batch(jobs, scraper, sink=rest, keep_records=True)
+        
+        # Both jobs find the same two listings on page 1; they are scraped once, for the first job
+        assert len({record['url'] for record in records}) == len(records) == 2
+        assert [job.listings_scraped for job in jobs] == [2, 0]
+        assert rest.count == 0
+        with open(toronto_path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 2
+        assert scraper.summary.as_dict()['total_listings'] == 2
+
+def test_adaptive_rate_limiter_aimd():
+    """Test adaptive delays speed up on healthy responses and back off on overload, within bounds"""
+    from rate_limiter import AdaptiveRateLimiter
+    
+    messages = []
+    limiter = AdaptiveRateLimiter({'search': (1.0, 2.0), 'listing': (1.0, 2.0), 'website': (1.0, 2.0)},
+                                  yellowpages_host="www.yellowpages.ca", log_callback=messages.append)
+    url = "https://www.yellowpages.ca/search/si/1/dentists/Toronto+ON"
+    key = ("www.yellowpages.ca", "search")
+    assert limiter.reserve(url, 'search') == 0
+    assert abs(limiter.current_delays()[key] - 1.5) < 1e-9
+    
+    # Additive increase up to the floor delay
+    for _ in range(100):
+        limiter.observe(url, 'search', 200, 0.2)
+    assert abs(limiter.current_delays()[key] - 1.0) < 1e-9
+    
+    # Multiplicative decrease, once per burst of failures, down to the ceiling delay
+    limiter.observe(url, 'search', 429, 0.2)
+    assert abs(limiter.current_delays()[key] - 2.0) < 1e-9
+    limiter.observe(url, 'search', 503, 0.2)  # Same burst, ignored
+    limiter._last_decrease.clear()
+    limiter.observe(url, 'search', None)
+    assert abs(limiter.current_delays()[key] - 2.0) < 1e-9
+    assert any("Slowing down www.yellowpages.ca (search): HTTP 429" in message for message in messages)
+    
+    # 404s are neutral, latency spikes back off like errors
+    limiter.observe(url, 'search', 404, 0.2)
+    assert abs(limiter.current_delays()[key] - 2.0) < 1e-9
+    for _ in range(100):
+        limiter.observe(url, 'search', 200, 0.2)
+    limiter._last_decrease.clear()
+    for _ in range(5):
+        limiter.observe(url, 'search', 200, 5.0)
+    assert limiter.current_delays()[key] > 1.0
+    assert any("latency" in message for message in messages)
+    
+    # Other hosts have their own rate
+    limiter.observe("https://smiledental.example.ca/", 'website', 500, 0.2)
+    assert limiter.current_delays("www.yellowpages.ca") == {key: limiter.current_delays()[key]}
+
+def test_retry_policy_retry_after_and_circuit_breaker():
+    """Test Retry-After is honoured, dead hosts fail fast once their circuit opens, and the retry budget"""
+    import requests
+    from retry_policy import RetryBudget, RetryPolicy, parse_retry_after
+    
+    class FakeSession:
+        def __init__(self):
+            self.requests = []
+        
+        def get(self, url, timeout=None, stream=False, headers=None):
+            self.requests.append(url)
+            if 'dead.example.ca' in url:
+                raise requests.exceptions.ConnectionError("Name or service not known")
+            if len(self.requests) == 1:
+                return FakeResponse("", url, status_code=503, headers={'Retry-After': '0'})
+            return FakeResponse(WEBSITE_HTML, url)
+    
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    
+    scraper = YellowPagesScraper(delay_settings=FAST_DELAYS)
+    scraper.retry_policy = RetryPolicy(base_delay=0)
+    session = FakeSession()
+    scraper.get_session = lambda url: session
+    
+    # 503 with Retry-After: 0 is retried right away
+    response = scraper.fetch_page_with_retry("https://smiledental.example.ca/", max_retries=2, page_type='website')
+    assert response is not None and len(session.requests) == 2
+    
+    # Two listings' worth of failures open the dead host's circuit, after that it costs no requests
+    session.requests = []
+    for _ in range(3):
+        contacts = scraper._scrape_website_uncached("https://dead.example.ca/")
+        assert contacts == ({'emails': [], 'social_links': {}}, False)
+    assert len(session.requests) == 3
+    assert scraper.retry_policy.breaker.open_hosts() == ["dead.example.ca"]
+    assert scraper.fetch_page_with_retry("https://smiledental.example.ca/", page_type='website') is not None
+    
+    # After the cool-down one probe goes through, and its failure reopens the circuit
+    scraper.retry_policy.breaker._hosts["dead.example.ca"][1] -= scraper.retry_policy.breaker.cooldown
+    assert scraper.fetch_page_with_retry("https://dead.example.ca/", max_retries=2, page_type='website') is None
+    assert len(session.requests) == 5
+    
+    # An empty retry budget means no retries at all
+    scraper.retry_policy = RetryPolicy(base_delay=0, budget=RetryBudget(initial=0, ratio=0))
+    session.requests = []
+    assert scraper.fetch_page_with_retry("https://dead.example.ca/", max_retries=3) is None
+    assert len(session.requests) == 1
+
+def test_last_page_prediction_plans_page_range():
+    """Test open-ended runs stop at the page count shown on the first page instead of probing"""
+    from extractors import extract_search_totals
+    
+    pager = '<div class="pageCount"><span>1</span> / <span>2</span></div>'
+    assert extract_search_totals(pager.encode()) == (2, None)
+    assert extract_search_totals(b'<h2 class="resultCount"><span>1,234</span> results</h2>') == (None, 1234)
+    assert extract_search_totals(b'<div class="resultCount"><span> 71 r\xc3\xa9sultats</span>') == (None, 71)
+    assert extract_search_totals(SEARCH_PAGE_HTML.encode()) == (None, None)
+    
+    # Counts outside the pager or results header, e.g. a related results box, are not the total
+    sidebar = b'<aside><h3>Nearby</h3><p><b>3</b> results</p></aside>' + b' ' * 400
+    assert extract_search_totals(sidebar + b'<h2 class="resultCount">420 results</h2>') == (None, 420)
+    assert extract_search_totals(sidebar) == (None, None)
+    
+    class PagedScraper(OfflineMixin, YellowPagesScraper):
+        def __init__(self, page_html, **kwargs):
+            super().__init__(**kwargs)
+            self.page_html = page_html
+            self.search_pages = []
+        
+        def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+            if page_type == 'search':
+                self.search_pages.append(url)
+                if '/search/si/1/' in url:
+                    return FakeResponse(self.page_html, url)
+            return super().fetch_page_with_retry(url, timeout, max_retries, page_type, stream)
+    
+    # The pager says 2 pages: page 3 is never requested
+    scraper = PagedScraper(SEARCH_PAGE_HTML.replace('</body>', pager + '</body>'), delay_settings=FAST_DELAYS)
+    assert len(scraper.run_scraper("dentists", "Toronto+ON")) == 2
+    assert len(scraper.search_pages) == 2
+    
+    # 50 results at no more than 2 per page (what page 1 shows) is 25 pages
+    assert scraper.estimate_last_page(b'<b class="resultCount">50 results</b>', 1, ['a', 'b']) == 25
+    
+    # A total smaller than what page 1 already shows is ignored instead of ending the run early
+    assert scraper.estimate_last_page(b'<b class="resultCount">1 result</b>', 1, ['a', 'b']) is None
+    
+    # Without totals on the page the run falls back to probing for empty pages
+    scraper = PagedScraper(SEARCH_PAGE_HTML, delay_settings=FAST_DELAYS)
+    scraper.prefetch_search_pages = False
+    scraper.run_scraper("dentists", "Toronto+ON")
+    assert len(scraper.search_pages) == 1 + scraper.EMPTY_PAGE_THRESHOLD
+
+def test_next_search_page_prefetched_during_listings():
+    """Test page N+1's search results are fetched, on the search budget, while page N's listings are scraped"""
+    import threading
+    
+    def recording(base):
+        class RecordingScraper(OfflineMixin, base):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.next_page_started = threading.Event()
+                self.listing_overlapped = []
+                self.budgets_used = {}
+            
+            def wait_for_rate_limit(self, url, page_type):
+                self.budgets_used[url] = page_type
+                return super().wait_for_rate_limit(url, page_type)
+            
+            def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+                if '/search/si/2/' in url:
+                    self.next_page_started.set()
+                elif page_type == 'listing' and not self.listing_overlapped:
+                    # Hold page 1's first listing until page 2's fetch starts (or give up)
+                    self.listing_overlapped.append(self.next_page_started.wait(timeout=2))
+                return super().fetch_page_with_retry(url, timeout, max_retries, page_type, stream)
+        return RecordingScraper
+    
+    for base in (YellowPagesScraper, AsyncYellowPagesScraper):
+        scraper = recording(base)(delay_settings=FAST_DELAYS)
+        scraper.prefetch_search_pages = True
+        records = scraper.run_scraper("dentists", "Toronto+ON", 1, 2)
+        assert len(records) == 2
+        assert scraper.listing_overlapped == [True], base.__name__
+        page_two = [url for url in scraper.budgets_used if '/search/si/2/' in url]
+        assert [scraper.budgets_used[url] for url in page_two] == ['search']
+    
+    # A prefetch that raises is logged and the page fetched again, as it would be without prefetching
+    for base in (YellowPagesScraper, AsyncYellowPagesScraper):
+        class FailingPrefetchScraper(OfflineMixin, base):
+            def fetch_search_results(self, category, location, page):
+                self.search_calls.append(page)
+                if self.search_calls.count(2) == 1 and page == 2:
+                    raise ValueError("parser blew up")
+                return super().fetch_search_results(category, location, page)
+        
+        messages = []
+        scraper = FailingPrefetchScraper(delay_settings=FAST_DELAYS, log_callback=messages.append)
+        scraper.search_calls = []
+        scraper.prefetch_search_pages = True
+        assert len(scraper.run_scraper("dentists", "Toronto+ON", 1, 2)) == 2
+        assert scraper.search_calls == [1, 2, 2], base.__name__
+        assert any("Prefetch failed (parser blew up)" in message for message in messages)
+    
+    # Without the look-ahead the sequential engine only asks for page 2 after page 1's listings
+    scraper = recording(YellowPagesScraper)(delay_settings=FAST_DELAYS)
+    scraper.prefetch_search_pages = False
+    scraper.next_page_started.wait = lambda timeout=None: scraper.next_page_started.is_set()
+    scraper.run_scraper("dentists", "Toronto+ON", 1, 2)
+    assert scraper.listing_overlapped == [False]
+
+def test_async_listing_failures_dont_abort_run():
+    """Test one failing listing task is logged and skipped instead of failing the whole async run"""
+    class FlakyScraper(OfflineMixin, AsyncYellowPagesScraper):
+        def reuse_fresh_listing(self, listing_url, page_num, min_age=None):
+            raise OSError("listing index unavailable")
+        
+        def new_listing_record(self, listing_url, page_num):
+            if 'Bright-Teeth' in listing_url:
+                raise ValueError("bad listing record")
+            return super().new_listing_record(listing_url, page_num)
+    
+    messages = []
+    scraper = FlakyScraper(delay_settings=FAST_DELAYS, log_callback=messages.append)
+    records = scraper.run_scraper("dentists", "Toronto+ON", 1, 1)
+    assert [record['url'] for record in records] == [
+        "https://www.yellowpages.ca/bus/Ontario/Toronto/Smile-Dental/1001.html"]
+    assert any("listing index unavailable" in message for message in messages)
+    assert any("bad listing record" in message for message in messages)
+
+def test_batch_search_waits_dont_block_listing_fetches():
+    """Test a job waiting on the search budget doesn't hold yellowpages.ca slots other jobs' listings need"""
+    from batch import BatchJob, run_batch
+    
+    class RecordingScraper(OfflineMixin, AsyncYellowPagesScraper):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.fetches = []
+        
+        def fetch_page_with_retry(self, url, timeout=None, max_retries=None, page_type=None, stream=False):
+            response = super().fetch_page_with_retry(url, timeout, max_retries, page_type, stream)
+            self.fetches.append(page_type)
+            return response
+    
+    delays = dict(FAST_DELAYS, search_min=0.3, search_max=0.3)
+    scraper = RecordingScraper(delay_settings=delays)
+    jobs = [BatchJob("dentists", f"City{i}+ON", 1, 1) for i in range(4)]
+    run_batch(jobs, scraper)
+    
+    # The first job's listings are fetched while the other jobs are still waiting for their search pages
+    order = [page_type for page_type in scraper.fetches if page_type != 'website']
+    assert order == ['search', 'listing', 'listing', 'search', 'search', 'search'], order
+
+def test_async_finish_record_runs_off_event_loop():
+    """Test the async engine hands index, journal and sink writes to a writer thread in completion order"""
+    import threading
+    
+    class RecordingScraper(OfflineMixin, AsyncYellowPagesScraper):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.writer_threads = []
+        
+        def finish_record(self, data):
+            self.writer_threads.append(threading.current_thread())
+            super().finish_record(data)
+    
+    scraper = RecordingScraper(delay_settings=FAST_DELAYS)
+    records = scraper.run_scraper("dentists", "Toronto+ON", 1, 2)
+    assert len(records) == 2
+    assert len(scraper.writer_threads) == 2
+    assert len(set(scraper.writer_threads)) == 1
+    assert threading.main_thread() not in scraper.writer_threads
+
+def test_streamed_website_scan_never_reads_whole_body():
+    """Test website scanning takes the <meta> charset from the first chunk and stops at WEBSITE_MAX_BYTES"""
+    from config import Config
+    
+    class StreamedResponse(FakeResponse):
+        """Endless body that fails if anything reads it all at once"""
+        def __init__(self, head):
+            super().__init__("", "https://big.example.ca/", headers={'Content-Type': 'text/html'})
+            self.head = head
+            self.bytes_read = 0
+            self.closed = False
+        
+        @property
+        def content(self):
+            raise AssertionError("streamed body read in full")
+        
+        @content.setter
+        def content(self, value):
+            pass
+        
+        def iter_content(self, chunk_size=1):
+            chunk = self.head
+            while True:
+                self.bytes_read += len(chunk)
+                yield chunk
+                chunk = b' ' * chunk_size
+        
+        def close(self):
+            self.closed = True
+    
+    head = ('<html><head><meta charset="windows-1252"></head><body>'
+            'Caf\xe9 contact: bookings@smiledental.ca '
+            '<a href="https://www.facebook.com/smiledental">f</a>').encode('windows-1252')
+    response = StreamedResponse(head)
+    scraper = YellowPagesScraper(delay_settings=FAST_DELAYS)
+    emails, social_links = scraper.scan_website_response(response)
+    assert 'bookings@smiledental.ca' in emails
+    assert social_links == {'facebook': ['https://www.facebook.com/smiledental']}
+    assert response.closed
+    assert response.bytes_read <= Config.WEBSITE_MAX_BYTES + Config.WEBSITE_SCAN_CHUNK_SIZE + len(head)
+
 if __name__ == "__main__":
     print("Enhanced Yellow Pages Scraper Test Suite")
     print("=" * 50)
@@ -123,6 +1295,91 @@ if __name__ == "__main__":
     # Test delay settings
     test_delay_settings()
     
+    # Test session pooling
+    test_session_pooling()
+    
+    # Test per-host rate limiting
+    test_rate_limiter_per_host()
+    
+    # Test adaptive delays
+    test_adaptive_rate_limiter_aimd()
+    
+    # Test the retry policy and circuit breaker
+    test_retry_policy_retry_after_and_circuit_breaker()
+    
+    # Test targeted parsing
+    test_targeted_parsing_matches_full_parse()
+    
+    # Test and benchmark the zero-DOM search page extractor
+    test_fast_listing_url_extraction_matches_soup()
+    benchmark_listing_url_extraction()
+    
+    # Test streaming contact scanner
+    test_contact_scanner_across_chunks()
+    
+    # Test streamed website scanning stays bounded
+    test_streamed_website_scan_never_reads_whole_body()
+    
+    # Test social platform matching
+    test_social_matcher()
+    
+    # Test the response cache
+    test_response_cache_hit_and_revalidation()
+    
+    # Test the website contact cache
+    test_contact_cache_normalizes_and_coalesces()
+    
+    # Test the listing index used for incremental re-scrapes
+    test_listing_index_reuses_fresh_and_unchanged_listings()
+    
+    # Test checkpoint and resume
+    test_checkpoint_resume_skips_completed_listings()
+    
+    # Test streaming record sinks
+    test_streaming_sinks_match_batch_output()
+    
+    # Test the streaming CSV export
+    test_jsonl_to_csv_export_matches_save_as_csv()
+    
+    # Test the Parquet export
+    test_parquet_export_nested_columns()
+    
+    # Test the SQLite storage backend
+    test_sqlite_store_shared_contact_lookups()
+    
+    # Test the running summary
+    test_running_summary_matches_full_summary()
+    
+    # Test the headless CLI
+    test_cli_streams_results_without_tk()
+    
+    # Test the sharded work queue
+    test_work_queue_shards_jobs_across_workers()
+    
+    # Test work queue lease renewal and shared adaptive delays
+    test_work_queue_renews_leases_and_shares_adaptive_delays()
+    
+    # Test batch mode
+    test_batch_jobs_share_engine_and_dedupe_listings()
+    
+    # Test last page prediction
+    test_last_page_prediction_plans_page_range()
+    
+    # Test the next search page is prefetched while listings are scraped
+    test_next_search_page_prefetched_during_listings()
+    
+    # Test failing async listing tasks are skipped
+    test_async_listing_failures_dont_abort_run()
+    
+    # Test batch jobs interleave search waits with listing fetches
+    test_batch_search_waits_dont_block_listing_fetches()
+    
+    # Test async record writes run off the event loop
+    test_async_finish_record_runs_off_event_loop()
+    
+    # Test asyncio engine against the sequential engine
+    test_async_engine_matches_sequential()
+    
     # Test basic scraping
     success = test_basic_scraping()
     
@@ -0,0 +1,474 @@
+"""Durable SQLite work queue for sharding a crawl across worker processes and machines"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from config import Config
+from rate_limiter import AdaptiveRateLimiter, SharedAdaptiveRateLimiter, SharedRateLimiter
+from sinks import SINK_TYPES, TeeSink, open_sink
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    category TEXT,
+    location TEXT,
+    page INTEGER,
+    end_page INTEGER,
+    empty_pages INTEGER NOT NULL DEFAULT 0,
+    url TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units (status, kind, id);
+"""
+
+
+class WorkUnit:
+    """One leased unit of work: a search page or a listing URL"""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.category = row['category']
+        self.location = row['location']
+        self.page = row['page']
+        self.end_page = row['end_page']
+        self.empty_pages = row['empty_pages']
+        self.url = row['url']
+        self.attempts = row['attempts']
+
+
+class WorkQueue:
+    """Scrape jobs split into search-page and listing units in a shared SQLite file.
+
+    Workers lease one unit at a time. A lease that isn't completed before it expires
+    (the worker died or was cut off) goes back to the queue for another worker, until
+    the unit has been tried max_attempts times. Units are keyed so the same search page
+    or listing URL is only ever queued once, however many jobs or pages point at it.
+    """
+
+    def __init__(self, path, lease_seconds=None, max_attempts=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds or Config.WORK_QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.WORK_QUEUE_MAX_ATTEMPTS
+        self._lock = threading.Lock()
+        # Autocommit mode so transactions are started explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self):
+        return _Transaction(self._conn, self._lock)
+
+    @staticmethod
+    def _search_key(category, location, page):
+        return f"{category}|{location}|{page}"
+
+    def _insert_search(self, category, location, page, end_page, empty_pages=0):
+        self._conn.execute(
+            "INSERT OR IGNORE INTO units (kind, key, category, location, page, end_page, empty_pages) "
+            "VALUES ('search', ?, ?, ?, ?, ?, ?)",
+            (self._search_key(category, location, page), category, location, page, end_page, empty_pages)
+        )
+
+    def add_job(self, category, location, start_page=1, end_page=None):
+        """Queue a category/location job.
+
+        A fixed page range is queued as one unit per page up front. Without end_page,
+        only start_page is queued; it queues the rest of the pages its pager or result
+        count predicts, or else each page queues the next one until
+        EMPTY_PAGE_THRESHOLD consecutive pages come back empty.
+        """
+        with self._transaction():
+            if end_page is None:
+                self._insert_search(category, location, start_page, None)
+            else:
+                for page in range(start_page, end_page + 1):
+                    self._insert_search(category, location, page, end_page)
+
+    def lease(self, worker_id):
+        """Lease the next available unit for worker_id, or return None if there is nothing to do"""
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE units SET status = 'failed', error = 'lease expired too many times', lease_owner = NULL "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            # Listings first, so found work is finished before more search pages are opened
+            row = self._conn.execute(
+                "SELECT * FROM units WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY kind = 'listing' DESC, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE units SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker_id, now + self.lease_seconds, row['id'])
+            )
+            row = self._conn.execute("SELECT * FROM units WHERE id = ?", (row['id'],)).fetchone()
+        return WorkUnit(row)
+
+    def _owned(self, unit_id, worker_id):
+        row = self._conn.execute("SELECT status, lease_owner FROM units WHERE id = ?", (unit_id,)).fetchone()
+        return row is not None and row['status'] == 'leased' and row['lease_owner'] == worker_id
+
+    def renew(self, unit, worker_id):
+        """Extend a lease the worker still holds, returning False if it has lost it"""
+        with self._transaction():
+            if not self._owned(unit.id, worker_id):
+                return False
+            self._conn.execute(
+                "UPDATE units SET lease_expires = ? WHERE id = ?", (time.time() + self.lease_seconds, unit.id)
+            )
+        return True
+
+    def complete_search(self, unit, worker_id, listing_urls, last_page=None):
+        """Finish a search page unit, queueing its listings and (for open-ended jobs) the pages after it.
+
+        When the page predicted its last page, an open-ended job queues every page up to
+        it at once; otherwise it queues just the next page.
+        """
+        with self._transaction():
+            if not self._owned(unit.id, worker_id):
+                return False
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO units (kind, key, category, location, page, url) "
+                "VALUES ('listing', ?, ?, ?, ?, ?)",
+                [(url, unit.category, unit.location, unit.page, url) for url in listing_urls]
+            )
+            if unit.end_page is None and last_page is not None:
+                for page in range(unit.page + 1, last_page + 1):
+                    self._insert_search(unit.category, unit.location, page, last_page)
+            elif unit.end_page is None:
+                empty_pages = 0 if listing_urls else unit.empty_pages + 1
+                if empty_pages < Config.EMPTY_PAGE_THRESHOLD:
+                    self._insert_search(unit.category, unit.location, unit.page + 1, None, empty_pages)
+            self._conn.execute(
+                "UPDATE units SET status = 'done', lease_owner = NULL, result = ? WHERE id = ?",
+                (json.dumps(listing_urls), unit.id)
+            )
+        return True
+
+    def complete_listing(self, unit, worker_id, record):
+        """Finish a listing unit with its scraped record"""
+        with self._transaction():
+            if not self._owned(unit.id, worker_id):
+                return False
+            self._conn.execute(
+                "UPDATE units SET status = 'done', lease_owner = NULL, result = ? WHERE id = ?",
+                (json.dumps(record, ensure_ascii=False), unit.id)
+            )
+        return True
+
+    def fail(self, unit, worker_id, error):
+        """Give a unit back after an error; it is retried until it has been tried max_attempts times"""
+        with self._transaction():
+            if not self._owned(unit.id, worker_id):
+                return False
+            status = 'failed' if unit.attempts >= self.max_attempts else 'pending'
+            self._conn.execute(
+                "UPDATE units SET status = ?, lease_owner = NULL, lease_expires = NULL, error = ? WHERE id = ?",
+                (status, str(error), unit.id)
+            )
+        return True
+
+    def release(self, unit, worker_id):
+        """Hand a unit back untried, e.g. when the worker is stopped mid-unit"""
+        with self._transaction():
+            if not self._owned(unit.id, worker_id):
+                return False
+            self._conn.execute(
+                "UPDATE units SET status = 'pending', lease_owner = NULL, lease_expires = NULL, "
+                "attempts = attempts - 1 WHERE id = ?",
+                (unit.id,)
+            )
+        return True
+
+    def has_open_units(self):
+        """Whether any unit is still pending or leased"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM units WHERE status IN ('pending', 'leased') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def stats(self):
+        """Unit counts by kind and status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, status, COUNT(*) AS count FROM units GROUP BY kind, status"
+            ).fetchall()
+        stats = {}
+        for row in rows:
+            stats.setdefault(row['kind'], {})[row['status']] = row['count']
+        return stats
+
+    def iter_results(self):
+        """Yield the records of completed listing units"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, result FROM units WHERE kind = 'listing' AND status = 'done' AND id > ? "
+                    "ORDER BY id LIMIT 500",
+                    (last_id,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row['result'])
+            last_id = rows[-1]['id']
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent workers never lease the same unit"""
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
+
+
+class QueueWorker:
+    """Leases units from a WorkQueue and scrapes them with one scraper.
+
+    The scraper's rate limiter is replaced with one backed by the queue file, so every
+    worker sharing the queue shares the same per-host request budgets (adaptive ones
+    included). While a unit is being scraped its lease is renewed in the background, so
+    long rate limit or circuit breaker waits don't let it expire.
+    """
+
+    def __init__(self, queue, scraper, worker_id=None, poll_interval=None):
+        self.queue = queue
+        self.scraper = scraper
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval or Config.WORK_QUEUE_POLL_INTERVAL
+        self.units_done = 0
+        self.renew_interval = self.queue.lease_seconds * Config.WORK_QUEUE_RENEW_FRACTION
+        limiter = scraper.rate_limiter
+        if isinstance(limiter, AdaptiveRateLimiter):
+            scraper.rate_limiter = SharedAdaptiveRateLimiter(queue.path, limiter.budgets, limiter.bursts,
+                                                             limiter.yellowpages_host, limiter.log_callback)
+        else:
+            scraper.rate_limiter = SharedRateLimiter(queue.path, limiter.budgets, limiter.bursts,
+                                                     limiter.yellowpages_host)
+
+    def run(self, max_units=None):
+        """Work until the queue is drained (or max_units are done), returning the units completed"""
+        scraper = self.scraper
+        scraper.log_message(f"Worker {self.worker_id} started on {self.queue.path}")
+        try:
+            while not scraper.stop_requested and (max_units is None or self.units_done < max_units):
+                unit = self.queue.lease(self.worker_id)
+                if unit is None:
+                    # Other workers' leases may still add units or expire back into the queue
+                    if not self.queue.has_open_units():
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                self.process(unit)
+        finally:
+            scraper.close_sessions()
+            scraper.rate_limiter.close()
+        scraper.log_message(f"Worker {self.worker_id} finished after {self.units_done} units")
+        return self.units_done
+
+    def process(self, unit):
+        """Scrape one leased unit and report the result to the queue"""
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease, args=(unit, finished), daemon=True)
+        heartbeat.start()
+        try:
+            self._process(unit)
+        finally:
+            finished.set()
+            heartbeat.join()
+
+    def _renew_lease(self, unit, finished):
+        while not finished.wait(self.renew_interval):
+            try:
+                if not self.queue.renew(unit, self.worker_id):
+                    return
+            except sqlite3.Error as e:
+                self.scraper.log_message(f"  Could not renew the lease on unit {unit.id}: {str(e)}")
+
+    def _process(self, unit):
+        scraper = self.scraper
+        try:
+            if unit.kind == 'search':
+                scraper.log_message(f"Page {unit.page}: Scraping search results for "
+                                    f"{unit.category} in {unit.location}...")
+                listing_urls, last_page = scraper.fetch_search_results(unit.category, unit.location, unit.page)
+                if scraper.stop_requested:
+                    self.queue.release(unit, self.worker_id)
+                    return
+                if listing_urls is None:
+                    self.queue.fail(unit, self.worker_id, "failed to load search results")
+                    return
+                scraper.log_message(f"Page {unit.page}: Found {len(listing_urls)} listing URLs")
+                if not scraper.predict_last_page:
+                    last_page = None
+                done = self.queue.complete_search(unit, self.worker_id, listing_urls, last_page)
+            else:
+                scraper.log_message(f"  Processing listing: {unit.url}")
+                record, _ = scraper._extract_listing(unit.url, unit.page, scrape_websites=True)
+                if scraper.stop_requested:
+                    self.queue.release(unit, self.worker_id)
+                    return
+                if record is None:
+                    self.queue.fail(unit, self.worker_id, "failed to load listing")
+                    return
+                done = self.queue.complete_listing(unit, self.worker_id, record)
+                if done:
+                    scraper.listings_scraped += 1
+                    scraper.finish_record(record)
+        except Exception as e:
+            scraper.log_message(f"  Error processing unit {unit.id}: {str(e)}")
+            self.queue.fail(unit, self.worker_id, e)
+            return
+
+        if done:
+            self.units_done += 1
+            if scraper.progress_callback:
+                scraper.progress_callback(unit.page, scraper.listings_scraped)
+        else:
+            scraper.log_message(f"  Lease on unit {unit.id} expired before it finished; result discarded")
+
+
+def build_parser():
+    """Command-line arguments for the coordinator and worker commands"""
+    from cli import add_delay_arguments
+
+    parser = argparse.ArgumentParser(description="Shard a crawl across worker processes through a shared queue.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help="Queue category/location jobs")
+    enqueue.add_argument('queue', help="Queue database shared by the workers")
+    enqueue.add_argument('category')
+    enqueue.add_argument('locations', nargs='+', metavar='location')
+    enqueue.add_argument('--start-page', type=int, default=Config.DEFAULT_START_PAGE)
+    enqueue.add_argument('--end-page', type=int, help="Last page (default: until empty pages)")
+
+    work = commands.add_parser('work', help="Lease and scrape units until the queue is drained")
+    work.add_argument('queue')
+    work.add_argument('--worker-id')
+    work.add_argument('--max-units', type=int)
+    work.add_argument('--listing-index', metavar='PATH')
+    work.add_argument('--cache', metavar='PATH')
+    work.add_argument('--contact-cache', metavar='PATH')
+    work.add_argument('--log-file', metavar='PATH')
+    add_delay_arguments(work)
+
+    status = commands.add_parser('status', help="Show unit counts")
+    status.add_argument('queue')
+
+    export = commands.add_parser('export', help="Write the completed listings to files")
+    export.add_argument('queue')
+    export.add_argument('-o', '--output', action='append', required=True, metavar='PATH',
+                        help=f"Output file ({', '.join(SINK_TYPES)}); repeatable")
+    return parser
+
+
+def main(argv=None):
+    """Run a queue command and return the exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'work':
+        from cli import validate_delay_args
+        validate_delay_args(parser, args)
+    queue = WorkQueue(args.queue)
+    try:
+        if args.command == 'enqueue':
+            for location in args.locations:
+                queue.add_job(args.category, location, args.start_page, args.end_page)
+            print(f"Queued {args.category} in {len(args.locations)} location(s)")
+        elif args.command == 'work':
+            return _work(queue, args)
+        elif args.command == 'status':
+            for kind, counts in sorted(queue.stats().items()):
+                print(f"{kind}: " + ", ".join(f"{status} {count}" for status, count in sorted(counts.items())))
+        elif args.command == 'export':
+            try:
+                sinks = [open_sink(path) for path in args.output]
+            except (ValueError, RuntimeError, OSError) as e:
+                print(f"Error: {str(e)}", file=sys.stderr)
+                return 2
+            with (sinks[0] if len(sinks) == 1 else TeeSink(sinks)) as sink:
+                for record in queue.iter_results():
+                    sink.write(record)
+            for warning in sink.warnings():
+                print(f"Warning: {warning}", file=sys.stderr)
+            print(f"Exported {sink.count} listings to {', '.join(args.output)}")
+    finally:
+        queue.close()
+    return 0
+
+
+def _work(queue, args):
+    import signal
+    from cli import delay_settings_from_args, log_to_file
+    from scraper import YellowPagesScraper
+
+    log_file, log_callback = log_to_file(args.log_file)
+    scraper = YellowPagesScraper(log_callback=log_callback, delay_settings=delay_settings_from_args(args),
+                                 cache_path=args.cache, contact_cache_path=args.contact_cache,
+                                 listing_index_path=args.listing_index)
+    worker = QueueWorker(queue, scraper, args.worker_id)
+
+    def request_stop(signum, frame):
+        scraper.log_message(f"Received signal {signum}, stopping...")
+        scraper.stop_scraping()
+    previous_handlers = {signum: signal.signal(signum, request_stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        worker.run(args.max_units)
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        if log_file:
+            log_file.close()
+    return 130 if scraper.stop_requested else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())